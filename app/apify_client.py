@@ -1,15 +1,145 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+import os
+import threading
+from contextlib import asynccontextmanager
+from tempfile import SpooledTemporaryFile
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Optional, Tuple
 from urllib.parse import quote
 import httpx
 
+from app import metrics
+
+if TYPE_CHECKING:
+    from app.apify_runs import RunTracker
+
 
 class ApifyError(Exception):
-    pass
+    """status_code: Apify가 HTTP 에러로 응답한 경우 그 코드 (재시도 분류용)."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+APIFY_API_BASE = os.getenv("APIFY_API_BASE", "https://api.apify.com/v2").rstrip("/")
+
+# 앱 단위 공유 커넥션 풀 설정
+APIFY_HTTP_MAX_CONNECTIONS = int(os.getenv("APIFY_HTTP_MAX_CONNECTIONS", "64"))
+APIFY_HTTP_MAX_KEEPALIVE = int(os.getenv("APIFY_HTTP_MAX_KEEPALIVE", "32"))
+APIFY_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("APIFY_HTTP_KEEPALIVE_EXPIRY", "60"))
+APIFY_HTTP2 = os.getenv("APIFY_HTTP2", "true").strip().lower() in {"1", "true", "yes"}
+
+# converter 오디오 다운로드: 파일당 메모리 상한(넘으면 디스크로 spill) / 최대 크기
+AUDIO_SPOOL_MAX_MEMORY_BYTES = int(os.getenv("AUDIO_SPOOL_MAX_MEMORY_BYTES", str(4 * 1024 * 1024)))
+# 동시에 받는 spool 전체의 메모리 상한. 예산이 없으면 새 spool은 처음부터 디스크에 씀
+AUDIO_SPOOL_TOTAL_MEMORY_BYTES = int(os.getenv("AUDIO_SPOOL_TOTAL_MEMORY_BYTES", str(32 * 1024 * 1024)))
+# 주의: Cloud Run의 /tmp는 tmpfs(메모리 기반)라 spill된 파일도 인스턴스 메모리를 쓴다.
+# 위 상한은 spool 버퍼만 막으므로, 메모리를 실제로 아끼려면 AUDIO_SPOOL_DIR에 디스크 볼륨 경로 지정
+AUDIO_SPOOL_DIR = os.getenv("AUDIO_SPOOL_DIR", "").strip()
+AUDIO_MAX_BYTES = int(os.getenv("AUDIO_MAX_BYTES", str(512 * 1024 * 1024)))
+AUDIO_DOWNLOAD_CHUNK_BYTES = 256 * 1024
+
+
+class _SpoolBudget:
+    """spool 메모리 예산(bytes). 기다리지 않는 semaphore: 못 잡으면 False -> 호출자가 디스크로."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, n: int) -> bool:
+        with self._lock:
+            if self.used + n > self.total:
+                return False
+            self.used += n
+            return True
+
+    def release(self, n: int) -> None:
+        with self._lock:
+            self.used = max(self.used - n, 0)
+
+
+spool_budget = _SpoolBudget(AUDIO_SPOOL_TOTAL_MEMORY_BYTES)
+metrics.register_collector("audio_spool_memory_bytes", lambda: [({}, float(spool_budget.used))])
+
+
+class _AudioSpool(SpooledTemporaryFile):
+    """
+    spool_budget에서 메모리를 잡은 SpooledTemporaryFile.
+    예산이 없으면 바로 디스크로, 디스크로 넘어가거나(rollover) 닫히면 예산 반납.
+    """
 
+    def __init__(self, budget: _SpoolBudget):
+        reserved = AUDIO_SPOOL_MAX_MEMORY_BYTES if budget.try_acquire(AUDIO_SPOOL_MAX_MEMORY_BYTES) else 0
+        self._budget = budget
+        self._reserved = reserved
+        super().__init__(max_size=reserved, dir=AUDIO_SPOOL_DIR or None)
+        if not reserved:
+            metrics.incr("audio_spool_direct_to_disk_total")
+            self.rollover()
 
-APIFY_API_BASE = "https://api.apify.com/v2"
+    def _release(self) -> None:
+        if self._reserved:
+            self._budget.release(self._reserved)
+            self._reserved = 0
+
+    def rollover(self) -> None:
+        super().rollover()
+        self._release()
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            self._release()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_http_client(
+    *,
+    max_connections: int = APIFY_HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections: int = APIFY_HTTP_MAX_KEEPALIVE,
+    keepalive_expiry: float = APIFY_HTTP_KEEPALIVE_EXPIRY,
+    http2: bool = APIFY_HTTP2,
+) -> httpx.AsyncClient:
+    """
+    Apify 호출용 공유 AsyncClient 생성.
+    - 앱 startup에서 한 번 만들고 shutdown에서 aclose() 해야 함
+    - 요청별 timeout은 각 호출에서 timeout=으로 지정
+    - h2 패키지가 없으면 HTTP/1.1 keep-alive로 동작
+    """
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        http2=http2 and _http2_available(),
+        follow_redirects=True,
+    )
+
+
+@asynccontextmanager
+async def _client_or_temp(
+    client: Optional[httpx.AsyncClient],
+    timeout_sec: float,
+) -> AsyncIterator[httpx.AsyncClient]:
+    # 공유 client가 주어지면 그대로 쓰고(닫지 않음), 없으면 기존처럼 1회용 client 생성
+    if client is not None:
+        yield client
+        return
+    async with httpx.AsyncClient(timeout=timeout_sec, follow_redirects=True) as tmp:
+        yield tmp
 
 
 def _actor_dataset_sync_endpoint(actor_id: str) -> str:
@@ -44,6 +174,7 @@ async def fetch_transcript_and_metadata(
     timeout_sec: float,
     token: str,
     actor_id: str = "starvibe~youtube-video-transcript",
+    client: Optional[httpx.AsyncClient] = None,
 ) -> Dict[str, Any]:
     """
     Apify transcript actor 실행 후 dataset items 반환(JSON array)에서 첫 아이템 뽑아서 표준화 리턴.
@@ -64,11 +195,11 @@ async def fetch_transcript_and_metadata(
         "include_transcript_text": True,
     }
 
-    async with httpx.AsyncClient(timeout=timeout_sec) as client:
-        r = await client.post(endpoint, params=params, json=payload)
+    async with _client_or_temp(client, timeout_sec) as http:
+        r = await http.post(endpoint, params=params, json=payload, timeout=timeout_sec)
 
     if r.status_code >= 400:
-        raise ApifyError(f"Apify HTTP {r.status_code}: {r.text}")
+        raise ApifyError(f"Apify HTTP {r.status_code}: {r.text}", status_code=r.status_code)
 
     data = r.json()
 
@@ -99,28 +230,31 @@ async def fetch_transcript_and_metadata(
     return out
 
 
-async def fetch_audio_bytes_from_converter(
+RUN_TERMINAL_STATUSES = {"SUCCEEDED", "FAILED", "TIMED-OUT", "ABORTED"}
+
+
+def _auth_headers(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def start_converter_run(
+    http: httpx.AsyncClient,
     *,
     youtube_url: str,
-    timeout_sec: float,
     token: str,
+    timeout_sec: float,
     actor_id: str = "tazy~youtube-converter",
     cookies_text: str = "",
+    wait_for_finish_sec: int = 60,
+    webhooks: str = "",
 ) -> Dict[str, Any]:
     """
     tazy/youtube-converter actor 문서 기준:
     - 입력: videoUrl, format, quality, cookiesText 등
     - 결과 파일: default key-value store의 OUTPUT_FILE
+    webhooks: Apify ad-hoc webhook 정의(base64 JSON). 비어있으면 안 붙임.
+    반환: run 객체(data)
     """
-    if not token:
-        raise ApifyError("APIFY_TOKEN is missing")
-
-    runs_endpoint = _actor_runs_endpoint(actor_id)
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-    }
-
     payload: Dict[str, Any] = {
         "videoUrl": youtube_url,
         "format": "mp3",
@@ -130,70 +264,152 @@ async def fetch_audio_bytes_from_converter(
     if cookies_text.strip():
         payload["cookiesText"] = cookies_text.strip()
 
-    async with httpx.AsyncClient(timeout=timeout_sec, follow_redirects=True) as client:
-        # 1) actor run 시작
-        run_resp = await client.post(
-            runs_endpoint,
-            params={"waitForFinish": 60},
-            headers=headers,
-            json=payload,
+    params: Dict[str, Any] = {"waitForFinish": wait_for_finish_sec}
+    if webhooks:
+        params["webhooks"] = webhooks
+
+    run_resp = await http.post(
+        _actor_runs_endpoint(actor_id),
+        params=params,
+        headers={**_auth_headers(token), "Content-Type": "application/json"},
+        json=payload,
+        timeout=timeout_sec,
+    )
+
+    if run_resp.status_code >= 400:
+        raise ApifyError(
+            f"Converter run HTTP {run_resp.status_code}: {run_resp.text}",
+            status_code=run_resp.status_code,
         )
 
-        if run_resp.status_code >= 400:
-            raise ApifyError(f"Converter run HTTP {run_resp.status_code}: {run_resp.text}")
+    run_data = run_resp.json().get("data") or {}
+    if not run_data.get("id"):
+        raise ApifyError("Converter run response missing run id")
+    return run_data
 
-        run_data = run_resp.json().get("data") or {}
-        run_id = run_data.get("id")
-        status = run_data.get("status")
-        kvs_id = run_data.get("defaultKeyValueStoreId")
 
-        if not run_id:
-            raise ApifyError("Converter run response missing run id")
-
-        # 2) 아직 완료 안 됐으면 polling
-        poll_count = 0
-        while status not in {"SUCCEEDED", "FAILED", "TIMED-OUT", "ABORTED"}:
-            poll_count += 1
-            if poll_count > 20:
-                raise ApifyError("Converter run polling exceeded limit")
+async def get_actor_run(
+    http: httpx.AsyncClient,
+    *,
+    run_id: str,
+    token: str,
+    timeout_sec: float,
+    wait_for_finish_sec: int = 0,
+) -> Dict[str, Any]:
+    params = {"waitForFinish": wait_for_finish_sec} if wait_for_finish_sec else None
+    poll_resp = await http.get(
+        _actor_run_endpoint(run_id),
+        params=params,
+        headers=_auth_headers(token),
+        timeout=timeout_sec,
+    )
+    if poll_resp.status_code >= 400:
+        raise ApifyError(
+            f"Converter poll HTTP {poll_resp.status_code}: {poll_resp.text}",
+            status_code=poll_resp.status_code,
+        )
+    return poll_resp.json().get("data") or {}
 
-            poll_resp = await client.get(
-                _actor_run_endpoint(run_id),
-                params={"waitForFinish": 15},
-                headers=headers,
-            )
-            if poll_resp.status_code >= 400:
-                raise ApifyError(f"Converter poll HTTP {poll_resp.status_code}: {poll_resp.text}")
 
-            run_data = poll_resp.json().get("data") or {}
-            status = run_data.get("status")
-            kvs_id = run_data.get("defaultKeyValueStoreId") or kvs_id
+async def fetch_audio_file_from_converter(
+    *,
+    youtube_url: str,
+    timeout_sec: float,
+    token: str,
+    actor_id: str = "tazy~youtube-converter",
+    cookies_text: str = "",
+    client: Optional[httpx.AsyncClient] = None,
+    tracker: Optional["RunTracker"] = None,
+    run_key: str = "",
+) -> Dict[str, Any]:
+    """
+    converter run 실행/대기(RunTracker) 후 OUTPUT_FILE 다운로드.
+    - run_key(보통 video ID)를 주면 이전에 타임아웃 난 run을 새로 띄우지 않고 이어서 기다림
+    OUTPUT_FILE은 청크 스트리밍으로 SpooledTemporaryFile에 받는다.
+    - AUDIO_SPOOL_MAX_MEMORY_BYTES까지만 메모리, 넘으면 디스크(AUDIO_SPOOL_DIR)로 넘어감
+    - 프로세스 전체 메모리 spool은 AUDIO_SPOOL_TOTAL_MEMORY_BYTES까지 (넘으면 처음부터 디스크)
+    - AUDIO_MAX_BYTES 초과 시 중단
+    반환된 file은 호출자가 close() 해야 함.
+    """
+    if not token:
+        raise ApifyError("APIFY_TOKEN is missing")
 
-        if status != "SUCCEEDED":
-            raise ApifyError(f"Converter run did not succeed: status={status}")
+    if tracker is None:
+        from app.apify_runs import default_tracker
+
+        tracker = default_tracker
+
+    async with _client_or_temp(client, timeout_sec) as http:
+        # 1) actor run 시작(또는 재개) + 완료까지 대기
+        with metrics.timed("converter_run"):
+            run_data = await tracker.run_converter(
+                http,
+                run_key=run_key,
+                youtube_url=youtube_url,
+                token=token,
+                timeout_sec=timeout_sec,
+                actor_id=actor_id,
+                cookies_text=cookies_text,
+            )
+        run_id = run_data.get("id")
+        kvs_id = run_data.get("defaultKeyValueStoreId")
 
         if not kvs_id:
             raise ApifyError("Converter run missing defaultKeyValueStoreId")
 
-        # 3) OUTPUT_FILE 다운로드
-        file_resp = await client.get(
-            _kvs_record_endpoint(kvs_id, "OUTPUT_FILE"),
-            headers={"Authorization": f"Bearer {token}"},
-        )
-
-        if file_resp.status_code >= 400:
-            raise ApifyError(f"Failed to fetch OUTPUT_FILE {file_resp.status_code}: {file_resp.text[:300]}")
-
-        content_type = (file_resp.headers.get("content-type") or "").split(";")[0].strip()
-        data = file_resp.content
-
-    if not data:
-        raise ApifyError("OUTPUT_FILE is empty")
+        # 2) OUTPUT_FILE 스트리밍 다운로드
+        with metrics.timed("audio_download"):
+            content_type, spool, size = await _download_to_spool(
+                http,
+                _kvs_record_endpoint(kvs_id, "OUTPUT_FILE"),
+                headers=_auth_headers(token),
+                timeout_sec=timeout_sec,
+            )
+        metrics.observe("audio_download_bytes", size, buckets=metrics.BYTES_BUCKETS)
 
     return {
-        "bytes": data,
+        "file": spool,
         "mime_type": content_type or "audio/mpeg",
-        "size": len(data),
+        "size": size,
         "run_id": run_id,
         "default_key_value_store_id": kvs_id,
     }
+
+
+async def _download_to_spool(
+    http: httpx.AsyncClient,
+    url: str,
+    *,
+    headers: Dict[str, str],
+    timeout_sec: float,
+) -> Tuple[str, SpooledTemporaryFile, int]:
+    spool = _AudioSpool(spool_budget)
+    try:
+        async with http.stream("GET", url, headers=headers, timeout=timeout_sec) as resp:
+            if resp.status_code >= 400:
+                body = await resp.aread()
+                raise ApifyError(
+                    f"Failed to fetch OUTPUT_FILE {resp.status_code}: {body[:300]!r}",
+                    status_code=resp.status_code,
+                )
+
+            declared = int(resp.headers.get("content-length") or 0)
+            if AUDIO_MAX_BYTES and declared > AUDIO_MAX_BYTES:
+                raise ApifyError(f"OUTPUT_FILE too large: {declared} bytes > AUDIO_MAX_BYTES={AUDIO_MAX_BYTES}")
+
+            content_type = (resp.headers.get("content-type") or "").split(";")[0].strip()
+            size = 0
+            async for chunk in resp.aiter_bytes(AUDIO_DOWNLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if AUDIO_MAX_BYTES and size > AUDIO_MAX_BYTES:
+                    raise ApifyError(f"OUTPUT_FILE exceeded AUDIO_MAX_BYTES={AUDIO_MAX_BYTES}")
+                spool.write(chunk)
+
+        if size == 0:
+            raise ApifyError("OUTPUT_FILE is empty")
+
+        spool.seek(0)
+        return content_type, spool, size
+    except BaseException:
+        spool.close()
+        raise
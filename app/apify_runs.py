@@ -0,0 +1,222 @@
+# app/apify_runs.py
+"""
+Apify actor run 추적기 (converter용).
+- 고정 20회 polling 대신: 전체 deadline + 지수 backoff(jitter) polling
+- 타임아웃 나도 run ID를 run_key(video ID)로 기억 -> 다음 요청은 새 run 없이 이어서 대기
+- (옵션) Apify ad-hoc webhook으로 완료 push를 받으면 대기 중인 polling을 즉시 깨움
+- scheduler "apify" 슬롯은 run 시작 요청에만 잡는다 (polling/다운로드 중에는 놓음)
+APIFY_API_BASE를 바꾸면 로컬 가짜 Apify 서버로 테스트 가능.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import os
+import random
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app import metrics, scheduler
+from app.apify_client import (
+    RUN_TERMINAL_STATUSES,
+    ApifyError,
+    get_actor_run,
+    start_converter_run,
+)
+from app.cache import TieredCache
+
+CONVERTER_RUN_DEADLINE_SEC = float(os.getenv("CONVERTER_RUN_DEADLINE_SEC", "900"))
+CONVERTER_POLL_INITIAL_SEC = float(os.getenv("CONVERTER_POLL_INITIAL_SEC", "2"))
+CONVERTER_POLL_MAX_SEC = float(os.getenv("CONVERTER_POLL_MAX_SEC", "30"))
+CONVERTER_POLL_FACTOR = float(os.getenv("CONVERTER_POLL_FACTOR", "2"))
+# run 시작 요청에서 바로 기다릴 시간 (짧은 변환은 polling 없이 끝남)
+CONVERTER_START_WAIT_SEC = int(os.getenv("CONVERTER_START_WAIT_SEC", "30"))
+
+# 설정 시 run 시작할 때 webhook 등록: {APIFY_WEBHOOK_BASE_URL}/webhooks/apify?secret=...
+APIFY_WEBHOOK_BASE_URL = os.getenv("APIFY_WEBHOOK_BASE_URL", "").strip().rstrip("/")
+APIFY_WEBHOOK_SECRET = os.getenv("APIFY_WEBHOOK_SECRET", "").strip()
+
+_WEBHOOK_EVENT_TYPES = [
+    "ACTOR.RUN.SUCCEEDED",
+    "ACTOR.RUN.FAILED",
+    "ACTOR.RUN.TIMED_OUT",
+    "ACTOR.RUN.ABORTED",
+]
+
+
+class RunTracker:
+    def __init__(
+        self,
+        *,
+        run_store: Optional[TieredCache] = None,
+        deadline_sec: float = CONVERTER_RUN_DEADLINE_SEC,
+        poll_initial_sec: float = CONVERTER_POLL_INITIAL_SEC,
+        poll_max_sec: float = CONVERTER_POLL_MAX_SEC,
+        poll_factor: float = CONVERTER_POLL_FACTOR,
+        start_wait_sec: int = CONVERTER_START_WAIT_SEC,
+        webhook_base_url: str = APIFY_WEBHOOK_BASE_URL,
+        webhook_secret: str = APIFY_WEBHOOK_SECRET,
+    ):
+        self.run_store = run_store
+        self.deadline_sec = deadline_sec
+        self.poll_initial_sec = poll_initial_sec
+        self.poll_max_sec = poll_max_sec
+        self.poll_factor = poll_factor
+        self.start_wait_sec = start_wait_sec
+        self.webhook_base_url = webhook_base_url
+        self.webhook_secret = webhook_secret
+        # run_id -> (webhook 깨우기용 event, 기다리는 waiter 수)
+        self._events: Dict[str, asyncio.Event] = {}
+        self._waiters: Dict[str, int] = {}
+
+    # ---- webhook ----------------------------------------------------------
+
+    def webhooks_param(self) -> str:
+        if not self.webhook_base_url:
+            return ""
+        url = f"{self.webhook_base_url}/webhooks/apify"
+        if self.webhook_secret:
+            url += f"?secret={self.webhook_secret}"
+        spec = [{"eventTypes": _WEBHOOK_EVENT_TYPES, "requestUrl": url}]
+        return base64.b64encode(json.dumps(spec).encode("utf-8")).decode("ascii")
+
+    def check_secret(self, secret: Optional[str]) -> bool:
+        return not self.webhook_secret or secret == self.webhook_secret
+
+    def notify(self, run_id: str) -> bool:
+        """webhook 수신 시 호출. 해당 run을 기다리는 중이면 깨우고 True."""
+        ev = self._events.get(run_id)
+        if ev is None:
+            return False
+        metrics.incr("apify_run_webhook_total")
+        ev.set()
+        return True
+
+    # ---- run 재개용 저장 --------------------------------------------------
+
+    async def _remembered(self, run_key: str) -> Optional[str]:
+        if not run_key or self.run_store is None:
+            return None
+        hit = await self.run_store.get(run_key)
+        return hit.get("run_id") if isinstance(hit, dict) else None
+
+    async def _remember(self, run_key: str, run_id: str) -> None:
+        if run_key and self.run_store is not None:
+            await self.run_store.set(run_key, {"run_id": run_id})
+
+    async def _forget(self, run_key: str) -> None:
+        if run_key and self.run_store is not None:
+            await self.run_store.delete(run_key)
+
+    # ---- 실행/대기 ---------------------------------------------------------
+
+    async def run_converter(
+        self,
+        http: httpx.AsyncClient,
+        *,
+        run_key: str,
+        youtube_url: str,
+        token: str,
+        timeout_sec: float,
+        actor_id: str,
+        cookies_text: str,
+    ) -> Dict[str, Any]:
+        """
+        SUCCEEDED run 객체 반환.
+        - run_key로 기억된 run이 아직 진행 중이거나 성공 상태면 그대로 사용
+        - 실패/중단된 run이면 새로 시작
+        """
+        run: Optional[Dict[str, Any]] = None
+
+        prev_id = await self._remembered(run_key)
+        if prev_id:
+            try:
+                run = await get_actor_run(http, run_id=prev_id, token=token, timeout_sec=timeout_sec)
+            except ApifyError:
+                run = None
+            if run and run.get("status") in RUN_TERMINAL_STATUSES - {"SUCCEEDED"}:
+                run = None
+            if run:
+                metrics.incr("apify_run_resumed_total")
+
+        if run is None:
+            async with scheduler.slot("apify"):
+                run = await start_converter_run(
+                    http,
+                    youtube_url=youtube_url,
+                    token=token,
+                    timeout_sec=timeout_sec,
+                    actor_id=actor_id,
+                    cookies_text=cookies_text,
+                    wait_for_finish_sec=self.start_wait_sec,
+                    webhooks=self.webhooks_param(),
+                )
+            metrics.incr("apify_run_started_total")
+            await self._remember(run_key, run["id"])
+
+        run = await self.wait(http, run, token=token, timeout_sec=timeout_sec)
+
+        status = run.get("status")
+        if status != "SUCCEEDED":
+            await self._forget(run_key)
+            raise ApifyError(f"Converter run did not succeed: status={status}")
+        return run
+
+    def _next_sleep(self, delay: float) -> float:
+        # equal jitter: [delay/2, delay]
+        return delay / 2 + random.random() * delay / 2
+
+    async def wait(
+        self,
+        http: httpx.AsyncClient,
+        run: Dict[str, Any],
+        *,
+        token: str,
+        timeout_sec: float,
+    ) -> Dict[str, Any]:
+        """
+        terminal 상태가 될 때까지 backoff polling.
+        deadline을 넘기면 ApifyError (run은 살아있고 run_key로 재개 가능).
+        poll 사이에는 커넥션을 잡지 않고, webhook이 오면 바로 깨어나 확인.
+        """
+        run_id = run["id"]
+        deadline = time.monotonic() + self.deadline_sec
+        delay = self.poll_initial_sec
+        event = self._events.setdefault(run_id, asyncio.Event())
+        self._waiters[run_id] = self._waiters.get(run_id, 0) + 1
+
+        try:
+            while run.get("status") not in RUN_TERMINAL_STATUSES:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    metrics.incr("apify_run_deadline_exceeded_total")
+                    raise ApifyError(
+                        f"Converter run {run_id} still {run.get('status')} after "
+                        f"{self.deadline_sec:.0f}s (kept for resume)"
+                    )
+
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=min(self._next_sleep(delay), remaining))
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+
+                metrics.incr("apify_run_poll_total")
+                run = await get_actor_run(http, run_id=run_id, token=token, timeout_sec=timeout_sec) or run
+                delay = min(delay * self.poll_factor, self.poll_max_sec)
+        finally:
+            # 같은 run을 기다리는 다른 waiter(single-flight 밖 재개 경로)가 있으면 event 유지
+            left = self._waiters.pop(run_id, 1) - 1
+            if left > 0:
+                self._waiters[run_id] = left
+            else:
+                self._events.pop(run_id, None)
+
+        return run
+
+
+# fetch_audio_file_from_converter에 tracker를 안 넘겼을 때 쓰는 기본값 (재개 저장소 없음)
+default_tracker = RunTracker()
@@ -0,0 +1,139 @@
+# app/audio_chunks.py
+"""
+긴 오디오 STT용 분할/이어붙이기 헬퍼.
+- 컨테이너에 ffmpeg가 없으므로 MP3는 프레임 sync 경계에서 바이트 단위로 자른다
+  (CBR 기준 시간 ≈ 바이트 비율, VBR이면 근사치)
+- 겹치는 구간(overlap)의 중복 문장은 토큰 정렬로 제거
+"""
+from __future__ import annotations
+
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional
+
+# MPEG1 / MPEG2(2.5) Layer III 비트레이트 표 (kbps)
+_BITRATES_V1_L3 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0]
+_BITRATES_V2_L3 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0]
+
+_DEFAULT_KBPS = 128
+
+
+def _is_frame_header(b: bytes, i: int) -> bool:
+    if i + 4 > len(b):
+        return False
+    if b[i] != 0xFF or (b[i + 1] & 0xE0) != 0xE0:
+        return False
+    version = (b[i + 1] >> 3) & 0x03
+    layer = (b[i + 1] >> 1) & 0x03
+    bitrate_idx = (b[i + 2] >> 4) & 0x0F
+    sr_idx = (b[i + 2] >> 2) & 0x03
+    return version != 1 and layer != 0 and bitrate_idx not in (0, 15) and sr_idx != 3
+
+
+def find_frame_sync(b: bytes, start: int = 0) -> Optional[int]:
+    """b[start:]에서 첫 MP3 프레임 헤더 위치. 없으면 None."""
+    i = b.find(b"\xff", start)
+    while i != -1:
+        if _is_frame_header(b, i):
+            return i
+        i = b.find(b"\xff", i + 1)
+    return None
+
+
+def mp3_bitrate_kbps(head: bytes) -> int:
+    """파일 앞부분(ID3 태그 포함 가능)에서 첫 Layer III 프레임 비트레이트. 모르면 128."""
+    start = 0
+    if head[:3] == b"ID3" and len(head) >= 10:
+        # ID3v2 크기: synchsafe 28bit
+        size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        start = 10 + size
+
+    i = find_frame_sync(head, start)
+    if i is None:
+        return _DEFAULT_KBPS
+
+    version = (head[i + 1] >> 3) & 0x03
+    layer = (head[i + 1] >> 1) & 0x03
+    if layer != 1:  # Layer III만
+        return _DEFAULT_KBPS
+    table = _BITRATES_V1_L3 if version == 3 else _BITRATES_V2_L3
+    return table[(head[i + 2] >> 4) & 0x0F] or _DEFAULT_KBPS
+
+
+def plan_windows(
+    *,
+    size: int,
+    duration_sec: float,
+    window_sec: float,
+    overlap_sec: float,
+) -> List[Dict[str, Any]]:
+    """
+    바이트 범위 기준 시간 창 목록.
+    각 창: {"start_sec", "end_sec", "byte_start", "byte_end"} (byte_end exclusive)
+    실제 시작 위치는 읽은 뒤 frame sync로 맞춘다.
+    """
+    if duration_sec <= 0 or size <= 0:
+        return [{"start_sec": 0.0, "end_sec": max(duration_sec, 0.0), "byte_start": 0, "byte_end": size}]
+
+    bytes_per_sec = size / duration_sec
+    windows: List[Dict[str, Any]] = []
+    t = 0.0
+    while t < duration_sec:
+        start = max(t - overlap_sec, 0.0) if windows else 0.0
+        end = min(t + window_sec, duration_sec)
+        windows.append(
+            {
+                "start_sec": start,
+                "end_sec": end,
+                "byte_start": int(start * bytes_per_sec),
+                "byte_end": size if end >= duration_sec else int(end * bytes_per_sec),
+            }
+        )
+        t = end
+    return windows
+
+
+def align_chunk(data: bytes, is_first: bool) -> bytes:
+    """첫 창이 아니면 앞쪽 잘린 프레임을 버리고 다음 frame sync부터."""
+    if is_first:
+        return data
+    i = find_frame_sync(data[:64 * 1024])
+    return data[i:] if i is not None else data
+
+
+def _overlap_cut(prev_tokens: List[str], next_tokens: List[str], window: int) -> Optional[tuple]:
+    a = prev_tokens[-window:]
+    b = next_tokens[:window]
+    if not a or not b:
+        return None
+    m = SequenceMatcher(None, a, b, autojunk=False).find_longest_match(0, len(a), 0, len(b))
+    if m.size < 3:
+        return None
+    return len(prev_tokens) - len(a) + m.a + m.size, m.b + m.size
+
+
+def stitch_texts(texts: List[str], overlap_tokens: int = 80) -> Dict[str, Any]:
+    """
+    창별 전사 텍스트를 순서대로 이어붙이며 겹친 구간 중복 제거.
+    반환: {"text", "offsets": [각 창 텍스트가 시작하는 char offset]}
+    """
+    tokens_list = [t.split() for t in texts]
+    kept: List[List[str]] = []
+    for i, toks in enumerate(tokens_list):
+        if i > 0 and kept and kept[-1] and toks:
+            cut = _overlap_cut(kept[-1], toks, overlap_tokens)
+            if cut is not None:
+                prev_end, next_start = cut
+                kept[-1] = kept[-1][:prev_end]
+                toks = toks[next_start:]
+        kept.append(list(toks))
+
+    parts: List[str] = []
+    offsets: List[int] = []
+    pos = 0
+    for toks in kept:
+        offsets.append(pos)
+        s = " ".join(toks)
+        if s:
+            parts.append(s)
+            pos += len(s) + 1
+    return {"text": " ".join(parts), "offsets": offsets}
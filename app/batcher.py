@@ -0,0 +1,99 @@
+# app/batcher.py
+"""
+짧은 작업 여러 개를 모아 한 번에 처리하는 micro-batcher.
+- 같은 group끼리만 묶음 (예: structured/free 출력 모드)
+- 첫 항목이 들어온 뒤 window_sec 동안 모으거나, 항목 수/토큰 예산이 차면 즉시 flush
+- flush_fn(items) -> 항목별 결과 목록 (같은 순서). 예외면 그 배치의 호출자 모두에게 전달
+- 배치 task는 호출자와 분리되어 있어 한 호출자가 취소돼도 나머지는 계속 기다림
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+
+class _Batch:
+    __slots__ = ("items", "futures", "tokens", "timer")
+
+    def __init__(self) -> None:
+        self.items: List[Any] = []
+        self.futures: List["asyncio.Future[Any]"] = []
+        self.tokens = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        name: str,
+        flush_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+        *,
+        max_items: int,
+        max_tokens: int,
+        window_sec: float,
+    ):
+        self.name = name
+        self.max_items = max(1, max_items)
+        self.max_tokens = max_tokens
+        self.window_sec = window_sec
+        self._flush_fn = flush_fn
+        self._pending: Dict[str, _Batch] = {}
+        self._running: Set["asyncio.Task[None]"] = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, group: str, item: Any, tokens: int = 0) -> Any:
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(group)
+        if batch is not None and self.max_tokens > 0 and batch.tokens + tokens > self.max_tokens:
+            self._flush(group, batch)
+            batch = None
+        if batch is None:
+            batch = _Batch()
+            self._pending[group] = batch
+            batch.timer = loop.call_later(self.window_sec, self._flush, group, batch)
+
+        fut: "asyncio.Future[Any]" = loop.create_future()
+        batch.items.append(item)
+        batch.futures.append(fut)
+        batch.tokens += tokens
+        if len(batch.items) >= self.max_items:
+            self._flush(group, batch)
+        return await asyncio.shield(fut)
+
+    def _flush(self, group: str, batch: _Batch) -> None:
+        if self._pending.get(group) is not batch:
+            return  # 이미 flush됨 (timer와 크기 조건이 겹친 경우)
+        del self._pending[group]
+        if batch.timer is not None:
+            batch.timer.cancel()
+        self.batches += 1
+        self.items += len(batch.items)
+        task = asyncio.ensure_future(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: _Batch) -> None:
+        try:
+            results = await self._flush_fn(batch.items)
+        except asyncio.CancelledError:
+            for fut in batch.futures:
+                fut.cancel()
+            raise
+        except Exception as e:
+            for fut in batch.futures:
+                if not fut.done():
+                    fut.set_exception(e)
+                    fut.exception()  # 기다리던 호출자가 취소된 경우 경고 방지
+            return
+        for i, fut in enumerate(batch.futures):
+            if not fut.done():
+                fut.set_result(results[i] if i < len(results) else None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "pending": sum(len(b.items) for b in self._pending.values()),
+            "running": len(self._running),
+        }
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Protocol, Tuple, TypeVar
+
+T = TypeVar("T")
+
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "/tmp/yt_cache.sqlite3").strip()
+
+
+class CacheBackend(Protocol):
+    """캐시 tier 공통 인터페이스 (값은 JSON 직렬화 가능한 객체)."""
+
+    def get(self, key: str) -> Optional[Any]: ...
+
+    def set(self, key: str, value: Any, ttl_sec: Optional[float] = None) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+
+class MemoryLRUCache:
+    """
+    프로세스 메모리 LRU + TTL.
+    - max_items 초과 시 가장 오래 안 쓴 항목부터 제거
+    - 저장된 객체를 그대로 돌려주므로 호출자는 값을 수정하지 말 것
+    """
+
+    def __init__(self, max_items: int = 512, ttl_sec: float = 3600):
+        self.max_items = max_items
+        self.ttl_sec = ttl_sec
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            expires_at, value = hit
+            if expires_at and expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl_sec: Optional[float] = None) -> None:
+        ttl = self.ttl_sec if ttl_sec is None else ttl_sec
+        expires_at = time.time() + ttl if ttl else 0.0
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SqliteCache:
+    """
+    SQLite 파일 기반 디스크 tier. 테이블 하나가 캐시 하나.
+    인스턴스 재시작 후에도 남아있도록 CACHE_DB_PATH에 저장.
+    """
+
+    def __init__(self, path: str, table: str, ttl_sec: float = 7 * 24 * 3600, max_items: int = 20000):
+        if not table.isidentifier():
+            raise ValueError(f"invalid cache table name: {table}")
+        self.path = path
+        self.table = table
+        self.ttl_sec = ttl_sec
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at and expires_at < now:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        try:
+            return json.loads(value)
+        except Exception:
+            return None
+
+    def set(self, key: str, value: Any, ttl_sec: Optional[float] = None) -> None:
+        ttl = self.ttl_sec if ttl_sec is None else ttl_sec
+        now = time.time()
+        expires_at = now + ttl if ttl else 0.0
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, expires_at, now),
+            )
+            self._evict_locked(now)
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _evict_locked(self, now: float) -> None:
+        self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at > 0 AND expires_at < ?", (now,))
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        over = count - self.max_items
+        if over > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                (over,),
+            )
+
+
+class TieredCache:
+    """
+    memory LRU -> disk 순으로 조회하는 2단 캐시.
+    - disk hit이면 memory로 승격
+    - hit/miss 카운터는 stats()로 노출
+    - 디스크 I/O는 스레드로 넘겨 이벤트 루프를 막지 않음
+    """
+
+    def __init__(self, name: str, memory: MemoryLRUCache, disk: Optional[CacheBackend] = None):
+        self.name = name
+        self.memory = memory
+        self.disk = disk
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.sets = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits_memory += 1
+            return value
+
+        if self.disk is not None:
+            try:
+                value = await asyncio.to_thread(self.disk.get, key)
+            except Exception:
+                value = None
+            if value is not None:
+                self.hits_disk += 1
+                self.memory.set(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        self.sets += 1
+        self.memory.set(key, value)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.set, key, value)
+            except Exception:
+                # 디스크 tier 실패는 memory만으로 계속 진행
+                pass
+
+    async def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.delete, key)
+            except Exception:
+                # set과 같이 디스크 tier 실패는 삼킴 (memory에서는 이미 지움)
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.hits_memory + self.hits_disk
+        total = hits + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "sets": self.sets,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "memory_items": len(self.memory),
+            "disk": self.disk is not None,
+        }
+
+
+def build_tiered_cache(
+    name: str,
+    *,
+    memory_max_items: int,
+    memory_ttl_sec: float,
+    disk_ttl_sec: float,
+    db_path: str = CACHE_DB_PATH,
+) -> TieredCache:
+    """db_path가 비어있거나 열 수 없으면 memory tier만 사용."""
+    disk: Optional[CacheBackend] = None
+    if db_path:
+        try:
+            disk = SqliteCache(db_path, table=name, ttl_sec=disk_ttl_sec)
+        except Exception:
+            disk = None
+    return TieredCache(
+        name,
+        memory=MemoryLRUCache(max_items=memory_max_items, ttl_sec=memory_ttl_sec),
+        disk=disk,
+    )
+
+
+class SingleFlight:
+    """
+    같은 key로 동시에 들어온 비싼 작업을 하나로 합친다.
+    - 첫 호출이 task를 띄우고, 이후 호출은 같은 task 결과를 기다림
+    - task는 호출자와 분리되어 있어 한 호출자가 취소돼도 나머지는 계속 기다릴 수 있음
+    - task는 빈 contextvars context에서 실행 -> 첫 호출자의 scheduler flow/영상 timings/재시도 deadline을
+      물려받지 않음 (짧은 deadline의 요청 하나 때문에 합류한 호출자 모두가 실패하지 않도록)
+    - 끝나면(성공/실패) 즉시 목록에서 빠짐 -> 결과 재사용은 캐시 몫
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = 0
+        self.coalesced = 0
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            self.started += 1
+            task = contextvars.Context().run(asyncio.ensure_future, fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # 기다리던 호출자가 모두 취소된 경우 경고 방지
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
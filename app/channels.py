@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Protocol
+
+from app.cache import CACHE_DB_PATH
+
+CHANNEL_STORE = os.getenv("CHANNEL_STORE", "sqlite").strip().lower()
+CHANNEL_DB_PATH = os.getenv("CHANNEL_DB_PATH", CACHE_DB_PATH).strip()
+
+
+def channel_key(name: str) -> str:
+    """채널 이름 -> 저장 키 (대소문자/공백 차이 무시)."""
+    return re.sub(r"\s+", " ", (name or "").strip()).casefold()
+
+
+class ChannelStore(Protocol):
+    """
+    채널별 영상 DNA(슬림 분석 결과)와 마지막 채널 프로필 저장소.
+    - DNA는 video ID 단위로 덮어씀 (같은 영상 재분석 시 최신 것만)
+    - 프로필 레코드에는 반영된 video_ids를 같이 저장 -> 새 영상이 있을 때만 다시 계산
+    """
+
+    def put_dna(self, channel: str, video_id: str, item: Dict[str, Any]) -> None: ...
+
+    def dna(self, channel: str) -> Dict[str, Dict[str, Any]]: ...
+
+    def get_profile(self, channel: str) -> Optional[Dict[str, Any]]: ...
+
+    def put_profile(self, channel: str, record: Dict[str, Any]) -> None: ...
+
+    def delete_profile(self, channel: str) -> None: ...
+
+
+class MemoryChannelStore:
+    """프로세스 메모리 저장소 (재시작하면 사라짐)."""
+
+    def __init__(self) -> None:
+        self._dna: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._profiles: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def put_dna(self, channel: str, video_id: str, item: Dict[str, Any]) -> None:
+        with self._lock:
+            items = self._dna.setdefault(channel_key(channel), {})
+            items.pop(video_id, None)  # 다시 넣어 최신 순서 유지
+            items[video_id] = item
+
+    def dna(self, channel: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return dict(self._dna.get(channel_key(channel)) or {})
+
+    def get_profile(self, channel: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._profiles.get(channel_key(channel))
+            return dict(record) if record else None
+
+    def put_profile(self, channel: str, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._profiles[channel_key(channel)] = {**record, "updated_at": time.time()}
+
+    def delete_profile(self, channel: str) -> None:
+        with self._lock:
+            self._profiles.pop(channel_key(channel), None)
+
+
+class SqliteChannelStore:
+    """SQLite 저장소. 재시작 후에도 채널 DNA/프로필 유지."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS channel_dna ("
+                "channel TEXT NOT NULL, video_id TEXT NOT NULL, item TEXT NOT NULL, "
+                "updated_at REAL NOT NULL, PRIMARY KEY (channel, video_id))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS channel_profiles ("
+                "channel TEXT PRIMARY KEY, record TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def put_dna(self, channel: str, video_id: str, item: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO channel_dna (channel, video_id, item, updated_at) VALUES (?, ?, ?, ?)",
+                (channel_key(channel), video_id, json.dumps(item, ensure_ascii=False), time.time()),
+            )
+            self._conn.commit()
+
+    def dna(self, channel: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video_id, item FROM channel_dna WHERE channel = ? ORDER BY updated_at",
+                (channel_key(channel),),
+            ).fetchall()
+        return {video_id: json.loads(item) for video_id, item in rows}
+
+    def get_profile(self, channel: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record, updated_at FROM channel_profiles WHERE channel = ?",
+                (channel_key(channel),),
+            ).fetchone()
+        if row is None:
+            return None
+        return {**json.loads(row[0]), "updated_at": row[1]}
+
+    def put_profile(self, channel: str, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO channel_profiles (channel, record, updated_at) VALUES (?, ?, ?)",
+                (channel_key(channel), json.dumps(record, ensure_ascii=False), time.time()),
+            )
+            self._conn.commit()
+
+    def delete_profile(self, channel: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM channel_profiles WHERE channel = ?", (channel_key(channel),))
+            self._conn.commit()
+
+
+def build_channel_store() -> ChannelStore:
+    """CHANNEL_STORE=memory|sqlite. sqlite 경로가 없거나 열 수 없으면 memory."""
+    if CHANNEL_STORE == "sqlite" and CHANNEL_DB_PATH:
+        try:
+            return SqliteChannelStore(CHANNEL_DB_PATH)
+        except Exception:
+            pass
+    return MemoryChannelStore()
@@ -0,0 +1,163 @@
+# app/dna_aggregate.py
+"""
+채널 프로필용 DNA 로컬 집계.
+- Gemini에 빈도 세기를 맡기지 않고 여기서 결정적으로 계산 (같은 입력 -> 같은 집계)
+- 비슷한 문구("질문으로 시작" / "질문으로 시작함")는 하나로 묶음
+- 영상 수 기준 core(60% 이상) / options 분리, tone_keywords top 5
+Gemini에는 이 집계 + 소량의 샘플만 넘긴다.
+"""
+from __future__ import annotations
+
+import math
+import re
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+CORE_RATIO = 0.6
+SIMILARITY_THRESHOLD = 0.8
+MAX_OPTIONS = 8
+MAX_SAMPLES = 5
+
+# (출력 키, DNA 경로). 값이 문자열이면 1개짜리 목록으로 취급
+_FIELDS: List[Tuple[str, Tuple[str, str]]] = [
+    ("hook_techniques", ("hook", "techniques")),
+    ("hook_frames", ("hook", "frames")),
+    ("structure_templates", ("structure", "template")),
+    ("structure_beats", ("structure", "beats")),
+    ("pacing", ("structure", "pacing")),
+    ("personas", ("style_tone", "persona")),
+    ("narration_styles", ("style_tone", "narration_style")),
+    ("tone_keywords", ("style_tone", "tone_keywords")),
+    ("punctuation", ("expression_markers", "punctuation")),
+    ("catchphrases", ("expression_markers", "catchphrases")),
+    ("rhythm", ("expression_markers", "rhythm")),
+    ("numbers_style", ("expression_markers", "numbers_style")),
+    ("recurring_devices", ("retention", "recurring_devices")),
+    ("cta_types", ("retention", "cta")),
+]
+
+_WS_RE = re.compile(r"\s+")
+_STRIP_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def _values(dna: Dict[str, Any], path: Tuple[str, str]) -> List[str]:
+    section = dna.get(path[0])
+    v = section.get(path[1]) if isinstance(section, dict) else None
+    if isinstance(v, str):
+        v = [v]
+    if not isinstance(v, list):
+        return []
+    out = []
+    for s in v:
+        s = _WS_RE.sub(" ", str(s)).strip() if s is not None else ""
+        if s:
+            out.append(s)
+    return out
+
+
+def _norm(s: str) -> str:
+    """비교용 정규화. 기호만 있는 문구(punctuation 등)는 기호를 남긴다."""
+    low = s.casefold()
+    stripped = _STRIP_RE.sub("", low)
+    return stripped or low.replace(" ", "")
+
+
+class _Cluster:
+    __slots__ = ("key", "variants", "videos")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.variants: Dict[str, int] = {}
+        self.videos: set = set()
+
+    def label(self) -> str:
+        # 가장 많이 쓰인 표기, 동률이면 짧은 것
+        return min(self.variants.items(), key=lambda kv: (-kv[1], len(kv[0]), kv[0]))[0]
+
+
+def _similar(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    if a in b or b in a:
+        return min(len(a), len(b)) / max(len(a), len(b)) >= SIMILARITY_THRESHOLD - 0.2
+    m = SequenceMatcher(None, a, b, autojunk=False)
+    return m.real_quick_ratio() >= SIMILARITY_THRESHOLD and m.ratio() >= SIMILARITY_THRESHOLD
+
+
+def cluster_values(per_video: List[List[str]]) -> List[_Cluster]:
+    """영상별 문구 목록 -> 비슷한 문구끼리 묶은 cluster (등장 영상 수 내림차순)."""
+    clusters: List[_Cluster] = []
+    exact: Dict[str, _Cluster] = {}
+    for vi, values in enumerate(per_video):
+        for s in values:
+            key = _norm(s)
+            c = exact.get(key)
+            if c is None:
+                c = next((c for c in clusters if _similar(c.key, key)), None)
+                if c is None:
+                    c = _Cluster(key)
+                    clusters.append(c)
+                exact[key] = c
+            c.variants[s] = c.variants.get(s, 0) + 1
+            c.videos.add(vi)
+    clusters.sort(key=lambda c: (-len(c.videos), c.label()))
+    return clusters
+
+
+def core_min_videos(n: int) -> int:
+    """core 채택 최소 영상 수: 60% 이상, 3개 미만이면 2개 이상."""
+    if n < 3:
+        return 2
+    return math.ceil(n * CORE_RATIO)
+
+
+def aggregate_dna(dnas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    슬림 DNA 목록(_slim_analysis의 "dna") -> 집계.
+    각 항목: {"core": [[문구, 영상 수], ...], "options": [...]} (options는 상위 MAX_OPTIONS개)
+    """
+    parsed = [d for d in dnas if isinstance(d, dict) and "raw_text" not in d]
+    n = len(parsed)
+    min_core = core_min_videos(n)
+
+    out: Dict[str, Any] = {
+        "video_count": n,
+        "unparsed_videos": len(dnas) - n,
+        "core_min_videos": min_core,
+    }
+    for name, path in _FIELDS:
+        clusters = cluster_values([_values(d, path) for d in parsed])
+        core = [[c.label(), len(c.videos)] for c in clusters if len(c.videos) >= min_core]
+        options = [[c.label(), len(c.videos)] for c in clusters if len(c.videos) < min_core]
+        if name == "tone_keywords":
+            out["tone_keywords_top5"] = [label for label, _ in (core + options)[:5]]
+        out[name] = {"core": core, "options": options[:MAX_OPTIONS]}
+
+    out["samples"] = {
+        "hook_summaries": _samples(parsed, ("hook", "summary"), 160),
+        "quotes": _quote_samples(parsed, 120),
+    }
+    return out
+
+
+def _samples(parsed: List[Dict[str, Any]], path: Tuple[str, str], max_chars: int) -> List[str]:
+    out: List[str] = []
+    for d in parsed:
+        for s in _values(d, path):
+            out.append(s[:max_chars])
+            break
+        if len(out) >= MAX_SAMPLES:
+            break
+    return out
+
+
+def _quote_samples(parsed: List[Dict[str, Any]], max_chars: int) -> List[str]:
+    out: List[str] = []
+    for d in parsed:
+        items = (d.get("quotes") or {}).get("items") if isinstance(d.get("quotes"), dict) else None
+        first: Optional[Dict[str, Any]] = items[0] if isinstance(items, list) and items else None
+        if isinstance(first, dict) and first.get("text"):
+            out.append(str(first["text"])[:max_chars])
+        if len(out) >= MAX_SAMPLES:
+            break
+    return out
@@ -1,34 +1,66 @@
 from __future__ import annotations
 
+import asyncio
 import os
-from google import genai
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import IO, Any, AsyncIterator, Dict, List, Optional, Tuple
+
 from google.genai import types
 
-LOCATION = os.getenv("GEMINI_LOCATION", "us-central1")
-MODEL_AUDIO = os.getenv("GEMINI_MODEL_AUDIO", os.getenv("GEMINI_MODEL", "gemini-2.5-flash"))
+from app import resilience, scheduler
+from app.audio_chunks import align_chunk, mp3_bitrate_kbps, plan_windows, stitch_texts
+from app.gemini_client import get_client, get_model
 
-_client = None
+# 이 크기 이하만 inline_data로 전송, 넘으면 파일 업로드 경로(Developer API: Files API / Vertex: GCS)
+GEMINI_INLINE_AUDIO_MAX_BYTES = int(os.getenv("GEMINI_INLINE_AUDIO_MAX_BYTES", str(16 * 1024 * 1024)))
+# inline 전송 중인 오디오가 프로세스 전체에서 점유할 수 있는 메모리 상한 (base64/요청 버퍼 포함 추정치)
+GEMINI_INLINE_AUDIO_MEMORY_BUDGET_BYTES = int(
+    os.getenv("GEMINI_INLINE_AUDIO_MEMORY_BUDGET_BYTES", str(256 * 1024 * 1024))
+)
+# Vertex에서 큰 오디오를 넘길 GCS 버킷 (google-cloud-storage 필요, 없으면 inline 시도)
+GEMINI_AUDIO_GCS_BUCKET = os.getenv("GEMINI_AUDIO_GCS_BUCKET", "").strip()
+GEMINI_FILE_ACTIVE_TIMEOUT_SEC = float(os.getenv("GEMINI_FILE_ACTIVE_TIMEOUT_SEC", "120"))
 
+# 긴 오디오 분할 STT: 이 길이(초)를 넘는 mp3만 창 단위로 나눠 병렬 전사
+STT_CHUNK_MIN_SEC = float(os.getenv("STT_CHUNK_MIN_SEC", "900"))
+STT_CHUNK_WINDOW_SEC = float(os.getenv("STT_CHUNK_WINDOW_SEC", "600"))
+STT_CHUNK_OVERLAP_SEC = float(os.getenv("STT_CHUNK_OVERLAP_SEC", "8"))
+STT_CHUNK_CONCURRENCY = int(os.getenv("STT_CHUNK_CONCURRENCY", "4"))
+STT_CHUNK_RETRIES = int(os.getenv("STT_CHUNK_RETRIES", "2"))
 
-def _get_client():
-    global _client
-    if _client is not None:
-        return _client
+# inline 요청은 원본 + base64 + JSON 버퍼로 대략 3배를 잡는다
+_INLINE_MEMORY_FACTOR = 3
 
-    project = os.getenv("GOOGLE_CLOUD_PROJECT") or os.getenv("GCP_PROJECT") or os.getenv("PROJECT_ID")
-    if not project:
-        raise RuntimeError("Missing GOOGLE_CLOUD_PROJECT (or GCP_PROJECT/PROJECT_ID) env var")
 
-    _client = genai.Client(
-        vertexai=True,
-        project=project,
-        location=LOCATION,
-    )
-    return _client
+class _ByteBudget:
+    """바이트 단위 비동기 예약. 한 건이 limit보다 크면 limit만큼 잡고 단독 실행."""
 
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._cond = asyncio.Condition()
 
-def transcribe_audio_bytes(*, audio_bytes: bytes, mime_type: str, language_hint: str = "ko") -> dict:
-    instruction = (
+    @asynccontextmanager
+    async def reserve(self, n: int) -> AsyncIterator[None]:
+        n = min(n, self.limit)
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.used + n <= self.limit)
+            self.used += n
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.used -= n
+                self._cond.notify_all()
+
+
+_inline_budget = _ByteBudget(GEMINI_INLINE_AUDIO_MEMORY_BUDGET_BYTES)
+
+
+def _instruction(language_hint: str) -> str:
+    return (
         "다음 오디오를 가능한 한 정확히 받아쓰기(전사) 하라. "
         "요약/해석/재구성 금지. "
         "말버릇/추임새/반복 표현도 가능한 유지. "
@@ -36,22 +68,268 @@ def transcribe_audio_bytes(*, audio_bytes: bytes, mime_type: str, language_hint:
         "출력은 전사 텍스트만. 마크다운/코드펜스/설명 금지."
     )
 
-    contents = [
+
+def _build_contents(*, audio_bytes: bytes, mime_type: str, language_hint: str) -> list:
+    return _contents_with_part(
+        types.Part(
+            inline_data=types.Blob(
+                data=audio_bytes,
+                mime_type=mime_type,
+            )
+        ),
+        language_hint,
+    )
+
+
+def _stt_config() -> types.GenerateContentConfig:
+    # 전사 결과는 길다: text 모델 기본값이 아니라 audio 모델 출력 한도 사용
+    return types.GenerateContentConfig(max_output_tokens=get_model("audio").max_output_tokens)
+
+
+def _contents_with_part(audio_part: types.Part, language_hint: str) -> list:
+    return [
         types.Content(
             role="user",
             parts=[
-                types.Part(text=instruction),
-                types.Part(
-                    inline_data=types.Blob(
-                        data=audio_bytes,
-                        mime_type=mime_type,
-                    )
-                ),
+                types.Part(text=_instruction(language_hint)),
+                audio_part,
             ],
         )
     ]
 
-    client = _get_client()
-    resp = client.models.generate_content(model=MODEL_AUDIO, contents=contents)
 
-    return {"ok": True, "model": MODEL_AUDIO, "text": (resp.text or "").strip()}
+def transcribe_audio_bytes(*, audio_bytes: bytes, mime_type: str, language_hint: str = "ko") -> dict:
+    contents = _build_contents(audio_bytes=audio_bytes, mime_type=mime_type, language_hint=language_hint)
+
+    model = get_model("audio").name
+    client = get_client()
+    resp = client.models.generate_content(model=model, contents=contents, config=_stt_config())
+
+    return {"ok": True, "model": model, "text": (resp.text or "").strip()}
+
+
+async def transcribe_audio_bytes_async(
+    *,
+    audio_bytes: bytes,
+    mime_type: str,
+    language_hint: str = "ko",
+    max_attempts: int = resilience.RETRY_MAX_ATTEMPTS,
+) -> dict:
+    """
+    transcribe_audio_bytes의 async 버전 (client.aio, scheduler의 gemini_audio 상한으로 제한).
+    429/5xx는 resilience 정책으로 max_attempts까지 재시도.
+    """
+    contents = _build_contents(audio_bytes=audio_bytes, mime_type=mime_type, language_hint=language_hint)
+
+    model = get_model("audio").name
+    client = get_client()
+
+    async def _call() -> Any:
+        async with scheduler.slot("gemini_audio"):
+            return await client.aio.models.generate_content(model=model, contents=contents, config=_stt_config())
+
+    resp = await resilience.call("gemini_audio", _call, max_attempts=max_attempts)
+
+    return {"ok": True, "model": model, "text": (resp.text or "").strip()}
+
+
+async def _upload_to_files_api(file: IO[bytes], mime_type: str) -> Tuple[types.Part, str]:
+    """Developer API Files 업로드 후 ACTIVE까지 대기. (part, 삭제용 name) 반환."""
+    client = get_client()
+    uploaded = await client.aio.files.upload(file=file, config=types.UploadFileConfig(mime_type=mime_type))
+
+    deadline = time.monotonic() + GEMINI_FILE_ACTIVE_TIMEOUT_SEC
+    while uploaded.state == types.FileState.PROCESSING:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Gemini file upload did not become ACTIVE in time")
+        await asyncio.sleep(2)
+        uploaded = await client.aio.files.get(name=uploaded.name)
+
+    if uploaded.state == types.FileState.FAILED:
+        raise RuntimeError(f"Gemini file processing failed: {uploaded.error}")
+
+    return types.Part.from_uri(file_uri=uploaded.uri, mime_type=mime_type), uploaded.name
+
+
+def _upload_to_gcs(file: IO[bytes], mime_type: str) -> Tuple[types.Part, str]:
+    """Vertex용: GCS에 스트리밍 업로드. (part, blob name) 반환."""
+    from google.cloud import storage  # optional dependency
+
+    blob = storage.Client().bucket(GEMINI_AUDIO_GCS_BUCKET).blob(f"yt-audio/{uuid.uuid4().hex}")
+    blob.upload_from_file(file, content_type=mime_type, rewind=True)
+    return types.Part.from_uri(file_uri=f"gs://{GEMINI_AUDIO_GCS_BUCKET}/{blob.name}", mime_type=mime_type), blob.name
+
+
+def _delete_gcs_blob(name: str) -> None:
+    from google.cloud import storage
+
+    storage.Client().bucket(GEMINI_AUDIO_GCS_BUCKET).blob(name).delete()
+
+
+def _can_upload() -> bool:
+    if not get_client().vertexai:
+        return True
+    if not GEMINI_AUDIO_GCS_BUCKET:
+        return False
+    try:
+        from google.cloud import storage  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def transcribe_audio_file_async(
+    *,
+    file: IO[bytes],
+    size: int,
+    mime_type: str,
+    language_hint: str = "ko",
+) -> dict:
+    """
+    스풀 파일 기반 STT.
+    - 작은 파일: inline_data (프로세스 inline 메모리 예산 안에서만 동시 진행)
+    - 큰 파일: Files API(Developer) 또는 GCS(Vertex) 업로드 후 URI로 전달, 끝나면 삭제
+    업로드 경로를 쓸 수 없으면 inline으로 보낸다.
+    """
+    model = get_model("audio").name
+    client = get_client()
+
+    if size > GEMINI_INLINE_AUDIO_MAX_BYTES and _can_upload():
+        file.seek(0)
+        remote_name: Optional[str] = None
+        try:
+            if client.vertexai:
+                part, remote_name = await asyncio.to_thread(_upload_to_gcs, file, mime_type)
+            else:
+                part, remote_name = await _upload_to_files_api(file, mime_type)
+
+            async def _call() -> Any:
+                async with scheduler.slot("gemini_audio"):
+                    return await client.aio.models.generate_content(
+                        model=model,
+                        contents=_contents_with_part(part, language_hint),
+                        config=_stt_config(),
+                    )
+
+            resp = await resilience.call("gemini_audio", _call)
+        finally:
+            if remote_name:
+                try:
+                    if client.vertexai:
+                        await asyncio.to_thread(_delete_gcs_blob, remote_name)
+                    else:
+                        await client.aio.files.delete(name=remote_name)
+                except Exception:
+                    pass
+        return {"ok": True, "model": model, "text": (resp.text or "").strip(), "upload": True}
+
+    async with _inline_budget.reserve(size * _INLINE_MEMORY_FACTOR):
+        file.seek(0)
+        audio_bytes = await asyncio.to_thread(file.read)
+        out = await transcribe_audio_bytes_async(
+            audio_bytes=audio_bytes,
+            mime_type=mime_type,
+            language_hint=language_hint,
+        )
+        del audio_bytes
+    out["upload"] = False
+    return out
+
+
+def _estimate_duration_sec(file: IO[bytes], size: int) -> float:
+    file.seek(0)
+    head = file.read(64 * 1024)
+    return size * 8 / (mp3_bitrate_kbps(head) * 1000)
+
+
+def _read_range(file: IO[bytes], start: int, end: int) -> bytes:
+    file.seek(start)
+    return file.read(end - start)
+
+
+async def transcribe_audio_chunked_async(
+    *,
+    file: IO[bytes],
+    size: int,
+    mime_type: str,
+    language_hint: str = "ko",
+    duration_sec: Optional[float] = None,
+) -> dict:
+    """
+    긴 mp3를 STT_CHUNK_WINDOW_SEC 창(+앞쪽 STT_CHUNK_OVERLAP_SEC 겹침)으로 나눠
+    STT_CHUNK_CONCURRENCY 만큼 병렬 전사 후 순서대로 이어붙인다.
+    - 창 하나가 실패하면 그 창만 STT_CHUNK_RETRIES 번 재시도 (일시 장애/429만, resilience 정책)
+    - 재시도 후에도 실패한 창은 빠지고 failed_chunks에 기록 (전부 실패면 예외)
+    - chunks[]: 창별 시간 범위와 결과 텍스트 내 char 범위 (인용 시각 추정용)
+    짧거나 mp3가 아니면 transcribe_audio_file_async 한 번으로 처리.
+    """
+    if duration_sec is None or duration_sec <= 0:
+        duration_sec = await asyncio.to_thread(_estimate_duration_sec, file, size) if "mpeg" in mime_type else 0.0
+
+    if "mpeg" not in mime_type or duration_sec <= STT_CHUNK_MIN_SEC:
+        out = await transcribe_audio_file_async(file=file, size=size, mime_type=mime_type, language_hint=language_hint)
+        text = out.get("text") or ""
+        out["chunks"] = [{"start_sec": 0.0, "end_sec": duration_sec, "char_start": 0, "char_end": len(text)}]
+        out["failed_chunks"] = []
+        return out
+
+    windows = plan_windows(
+        size=size,
+        duration_sec=duration_sec,
+        window_sec=STT_CHUNK_WINDOW_SEC,
+        overlap_sec=STT_CHUNK_OVERLAP_SEC,
+    )
+    sem = asyncio.Semaphore(STT_CHUNK_CONCURRENCY)
+    read_lock = asyncio.Lock()
+
+    async def one(i: int, w: Dict[str, Any]) -> Optional[str]:
+        async with sem:
+            async with read_lock:
+                data = await asyncio.to_thread(_read_range, file, w["byte_start"], w["byte_end"])
+            data = align_chunk(data, is_first=(i == 0))
+
+            try:
+                async with _inline_budget.reserve(len(data) * _INLINE_MEMORY_FACTOR):
+                    out = await transcribe_audio_bytes_async(
+                        audio_bytes=data,
+                        mime_type=mime_type,
+                        language_hint=language_hint,
+                        max_attempts=STT_CHUNK_RETRIES + 1,
+                    )
+                return out.get("text") or ""
+            except Exception as e:
+                w["error"] = str(e)
+                return None
+
+    texts = await asyncio.gather(*(one(i, w) for i, w in enumerate(windows)))
+
+    ok_windows = [(w, t) for w, t in zip(windows, texts) if t is not None]
+    failed = [
+        {"start_sec": round(w["start_sec"], 1), "end_sec": round(w["end_sec"], 1), "error": w.get("error")}
+        for w, t in zip(windows, texts)
+        if t is None
+    ]
+    if not ok_windows:
+        raise RuntimeError(f"All {len(windows)} STT chunks failed: {failed[0]['error']}")
+
+    stitched = stitch_texts([t for _, t in ok_windows])
+    text = stitched["text"]
+    offsets = stitched["offsets"] + [len(text)]
+    chunks: List[Dict[str, Any]] = [
+        {
+            "start_sec": round(w["start_sec"], 1),
+            "end_sec": round(w["end_sec"], 1),
+            "char_start": offsets[i],
+            "char_end": offsets[i + 1],
+        }
+        for i, (w, _) in enumerate(ok_windows)
+    ]
+
+    return {
+        "ok": True,
+        "model": get_model("audio").name,
+        "text": text,
+        "chunks": chunks,
+        "failed_chunks": failed,
+        "upload": False,
+    }
@@ -0,0 +1,109 @@
+# app/gemini_client.py
+"""
+Gemini 공용 client 레이어.
+- genai.Client는 프로세스에 하나 (gemini_rest / gemini_audio가 같은 커넥션 풀 공유)
+- 생성은 lock으로 한 번만 (to_thread 워커 등 동시 첫 호출 대비)
+- 앱 startup에서 warm_up()으로 미리 생성
+- 모델별 설정(MODEL_REGISTRY)도 여기서 관리 (in-flight/RPM 제한은 app.scheduler)
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from google import genai
+from google.genai import types
+
+LOCATION = os.getenv("GEMINI_LOCATION", "us-central1")
+# 설정 시 Vertex 대신 Gemini Developer API 사용 (로컬 개발/가짜 엔드포인트 테스트용)
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "").strip()
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "").strip()
+GEMINI_WARMUP_PING = os.getenv("GEMINI_WARMUP_PING", "false").strip().lower() in {"1", "true", "yes"}
+
+
+@dataclass(frozen=True)
+class ModelConfig:
+    name: str
+    max_output_tokens: int
+    # 입력 컨텍스트 한도(토큰). 프롬프트 크기 판단용
+    input_token_limit: int
+    # 모델이 받아주는 max_output_tokens 최대값. 넘기면 요청 자체가 400
+    output_token_limit: int
+    # app.scheduler의 upstream 동시 실행 상한으로 사용
+    max_inflight: int
+
+
+_TEXT_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+MODEL_REGISTRY: Dict[str, ModelConfig] = {
+    "text": ModelConfig(
+        name=_TEXT_MODEL,
+        max_output_tokens=int(os.getenv("GEMINI_TEXT_MAX_OUTPUT_TOKENS", "2048")),
+        input_token_limit=int(os.getenv("GEMINI_TEXT_INPUT_TOKEN_LIMIT", "1000000")),
+        output_token_limit=int(os.getenv("GEMINI_TEXT_OUTPUT_TOKEN_LIMIT", "65536")),
+        max_inflight=int(os.getenv("GEMINI_TEXT_MAX_INFLIGHT", "32")),
+    ),
+    "audio": ModelConfig(
+        name=os.getenv("GEMINI_MODEL_AUDIO", _TEXT_MODEL),
+        max_output_tokens=int(os.getenv("GEMINI_AUDIO_MAX_OUTPUT_TOKENS", "16384")),
+        input_token_limit=int(os.getenv("GEMINI_AUDIO_INPUT_TOKEN_LIMIT", "1000000")),
+        output_token_limit=int(os.getenv("GEMINI_AUDIO_OUTPUT_TOKEN_LIMIT", "65536")),
+        max_inflight=int(os.getenv("GEMINI_AUDIO_MAX_INFLIGHT", "8")),
+    ),
+}
+
+_client: Optional[genai.Client] = None
+_client_lock = threading.Lock()
+
+
+def get_model(kind: str) -> ModelConfig:
+    try:
+        return MODEL_REGISTRY[kind]
+    except KeyError:
+        raise KeyError(f"Unknown Gemini model kind: {kind}") from None
+
+
+def _build_client() -> genai.Client:
+    http_options = types.HttpOptions(base_url=GEMINI_BASE_URL) if GEMINI_BASE_URL else None
+
+    if GEMINI_API_KEY:
+        return genai.Client(api_key=GEMINI_API_KEY, http_options=http_options)
+
+    project = os.getenv("GOOGLE_CLOUD_PROJECT") or os.getenv("GCP_PROJECT") or os.getenv("PROJECT_ID")
+    if not project:
+        raise RuntimeError("Missing GOOGLE_CLOUD_PROJECT (or GCP_PROJECT/PROJECT_ID) env var")
+
+    return genai.Client(
+        vertexai=True,
+        project=project,
+        location=LOCATION,
+        http_options=http_options,
+    )
+
+
+def get_client() -> genai.Client:
+    global _client
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None:
+            _client = _build_client()
+    return _client
+
+
+async def warm_up() -> Optional[str]:
+    """
+    startup에서 client 생성(+옵션: 모델 조회 1회로 인증/TLS 예열).
+    실패해도 앱 기동은 막지 않고 에러 문자열만 반환 -> 첫 요청에서 다시 시도.
+    """
+    try:
+        client = await asyncio.to_thread(get_client)
+        if GEMINI_WARMUP_PING:
+            await client.aio.models.get(model=get_model("text").name)
+    except Exception as e:
+        return str(e)
+    return None
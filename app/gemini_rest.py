@@ -1,36 +1,73 @@
 # app/gemini_rest.py
-import os
-from google import genai
+from typing import Any, Dict, Optional
 
-LOCATION = os.getenv("GEMINI_LOCATION", "us-central1")
-MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+from google.genai import types
 
-_client = None
+from app import resilience, scheduler
+from app.gemini_client import get_client, get_model
+from app.utils import estimate_tokens
 
-def _get_client():
-    global _client
-    if _client is not None:
-        return _client
 
-    project = os.getenv("GOOGLE_CLOUD_PROJECT") or os.getenv("GCP_PROJECT") or os.getenv("PROJECT_ID")
-    if not project:
-        raise RuntimeError("Missing GOOGLE_CLOUD_PROJECT (or GCP_PROJECT/PROJECT_ID) env var")
+def _generation_config(
+    max_output_tokens: Optional[int],
+    response_schema: Optional[Dict[str, Any]],
+) -> types.GenerateContentConfig:
+    """
+    max_output_tokens 미지정 시 text 모델 기본값.
+    response_schema가 있으면 structured output(JSON 강제) 모드.
+    """
+    cfg: Dict[str, Any] = {
+        "max_output_tokens": max_output_tokens or get_model("text").max_output_tokens,
+    }
+    if response_schema is not None:
+        cfg["response_mime_type"] = "application/json"
+        cfg["response_schema"] = response_schema
+    return types.GenerateContentConfig(**cfg)
 
-    _client = genai.Client(
-        vertexai=True,
-        project=project,
-        location=LOCATION,
-    )
-    return _client
 
-def analyze_with_gemini(prompt: str, max_output_tokens: int = 2048) -> dict:
-    client = _get_client()
+def analyze_with_gemini(
+    prompt: str,
+    max_output_tokens: Optional[int] = None,
+    response_schema: Optional[Dict[str, Any]] = None,
+) -> dict:
+    model = get_model("text").name
+    client = get_client()
     resp = client.models.generate_content(
-        model=MODEL,
+        model=model,
         contents=prompt,
+        config=_generation_config(max_output_tokens, response_schema),
     )
     return {
         "ok": True,
-        "model": MODEL,
+        "model": model,
+        "text": (resp.text or "").strip(),
+    }
+
+
+async def analyze_with_gemini_async(
+    prompt: str,
+    max_output_tokens: Optional[int] = None,
+    response_schema: Optional[Dict[str, Any]] = None,
+) -> dict:
+    """
+    analyze_with_gemini의 async 버전 (SDK의 client.aio 사용).
+    스레드를 잡지 않으므로 동시성은 scheduler의 gemini_text 상한(동시 실행/RPM/TPM)으로만 제한됨.
+    429/5xx는 resilience 정책으로 재시도.
+    """
+    model = get_model("text").name
+    client = get_client()
+
+    async def _call() -> Any:
+        async with scheduler.slot("gemini_text", tokens=estimate_tokens(prompt)):
+            return await client.aio.models.generate_content(
+                model=model,
+                contents=prompt,
+                config=_generation_config(max_output_tokens, response_schema),
+            )
+
+    resp = await resilience.call("gemini_text", _call)
+    return {
+        "ok": True,
+        "model": model,
         "text": (resp.text or "").strip(),
     }
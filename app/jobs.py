@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Protocol
+
+from app.cache import CACHE_DB_PATH
+
+JOB_STORE = os.getenv("JOB_STORE", "sqlite").strip().lower()
+# 재시작/인스턴스 교체 후 재개하려면 영구 저장소 경로여야 함.
+# 기본값(CACHE_DB_PATH, /tmp)은 Cloud Run에서 인스턴스별 tmpfs라 같은 인스턴스 안 재시작까지만 유지됨
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", CACHE_DB_PATH).strip()
+
+TERMINAL_STATUSES = {"succeeded", "failed", "cancelled"}
+
+
+class JobStore(Protocol):
+    """
+    비동기 job 저장소.
+    - job: id/status/request/결과(channel_profile, warnings) 메타
+    - 영상별 결과는 slot(=영상 index) 단위로 따로 저장 -> 재시작 시 완료된 영상은 재계산 안 함
+    - 실행하는 worker는 lease(owner, lease_until)를 잡고 주기적으로 연장 ->
+      같은 DB를 쓰는 여러 worker가 기동 시 같은 job을 중복 재개하지 않음
+    """
+
+    def create(self, request: Dict[str, Any], total: int) -> Dict[str, Any]: ...
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]: ...
+
+    def update(self, job_id: str, *, unless_status: Iterable[str] = (), **fields: Any) -> bool:
+        """fields 기록. 현재 status가 unless_status 중 하나면(예: cancelled) 건너뛰고 False (compare-and-set)."""
+        ...
+
+    def put_video(self, job_id: str, slot: int, result: Dict[str, Any]) -> None: ...
+
+    def videos(self, job_id: str) -> Dict[int, Dict[str, Any]]: ...
+
+    def list_unfinished(self) -> List[Dict[str, Any]]: ...
+
+    def claim(self, job_id: str, owner: str, lease_sec: float) -> bool:
+        """끝나지 않은 job의 lease를 잡거나 연장. 다른 owner의 lease가 살아있으면 False."""
+        ...
+
+    def release(self, job_id: str, owner: str) -> None:
+        """owner가 잡은 lease를 놓는다 (다음 기동 때 바로 재개 가능)."""
+        ...
+
+
+def _new_job(request: Dict[str, Any], total: int) -> Dict[str, Any]:
+    now = time.time()
+    return {
+        "job_id": uuid.uuid4().hex,
+        "status": "queued",
+        "request": request,
+        "total": total,
+        "created_at": now,
+        "updated_at": now,
+        "channel_profile": None,
+        "warnings": None,
+        "error": None,
+        "owner": None,
+        "lease_until": None,
+    }
+
+
+class MemoryJobStore:
+    """프로세스 메모리 저장소 (재시작하면 사라짐)."""
+
+    def __init__(self) -> None:
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._videos: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, request: Dict[str, Any], total: int) -> Dict[str, Any]:
+        job = _new_job(request, total)
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+            self._videos[job["job_id"]] = {}
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id: str, *, unless_status: Iterable[str] = (), **fields: Any) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] in set(unless_status):
+                return False
+            job.update(fields)
+            job["updated_at"] = time.time()
+            return True
+
+    def put_video(self, job_id: str, slot: int, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._videos.setdefault(job_id, {})[slot] = result
+            if job_id in self._jobs:
+                self._jobs[job_id]["updated_at"] = time.time()
+
+    def videos(self, job_id: str) -> Dict[int, Dict[str, Any]]:
+        with self._lock:
+            return dict(self._videos.get(job_id) or {})
+
+    def list_unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(j) for j in self._jobs.values() if j["status"] not in TERMINAL_STATUSES]
+
+    def claim(self, job_id: str, owner: str, lease_sec: float) -> bool:
+        now = time.time()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] in TERMINAL_STATUSES:
+                return False
+            if job["owner"] not in (None, owner) and (job["lease_until"] or 0) >= now:
+                return False
+            job["owner"] = owner
+            job["lease_until"] = now + lease_sec
+            return True
+
+    def release(self, job_id: str, owner: str) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job["owner"] == owner:
+                job["owner"] = None
+                job["lease_until"] = None
+
+
+class SqliteJobStore:
+    """SQLite 저장소. 워커 재시작 후에도 job/영상별 결과 유지."""
+
+    _JOB_COLUMNS = (
+        "status", "request", "total", "created_at", "updated_at",
+        "channel_profile", "warnings", "error", "owner", "lease_until",
+    )
+    _JSON_COLUMNS = {"request", "channel_profile", "warnings"}
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, request TEXT NOT NULL, "
+                "total INTEGER NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+                "channel_profile TEXT, warnings TEXT, error TEXT, owner TEXT, lease_until REAL)"
+            )
+            # lease 컬럼이 없던 기존 DB
+            existing = {r[1] for r in self._conn.execute("PRAGMA table_info(jobs)")}
+            for col, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+                if col not in existing:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {col} {kind}")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_videos ("
+                "job_id TEXT NOT NULL, slot INTEGER NOT NULL, result TEXT NOT NULL, "
+                "PRIMARY KEY (job_id, slot))"
+            )
+            self._conn.commit()
+
+    def _row_to_job(self, row: Any) -> Dict[str, Any]:
+        job: Dict[str, Any] = {"job_id": row[0]}
+        for col, value in zip(self._JOB_COLUMNS, row[1:]):
+            if col in self._JSON_COLUMNS and value is not None:
+                value = json.loads(value)
+            job[col] = value
+        return job
+
+    def create(self, request: Dict[str, Any], total: int) -> Dict[str, Any]:
+        job = _new_job(request, total)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, request, total, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    job["job_id"],
+                    job["status"],
+                    json.dumps(request, ensure_ascii=False),
+                    total,
+                    job["created_at"],
+                    job["updated_at"],
+                ),
+            )
+            self._conn.commit()
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        cols = ", ".join(("job_id",) + self._JOB_COLUMNS)
+        with self._lock:
+            row = self._conn.execute(f"SELECT {cols} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def update(self, job_id: str, *, unless_status: Iterable[str] = (), **fields: Any) -> bool:
+        fields = {k: v for k, v in fields.items() if k in self._JOB_COLUMNS}
+        fields["updated_at"] = time.time()
+        values = [
+            json.dumps(v, ensure_ascii=False) if k in self._JSON_COLUMNS and v is not None else v
+            for k, v in fields.items()
+        ]
+        sets = ", ".join(f"{k} = ?" for k in fields)
+        where = "job_id = ?"
+        skip = tuple(unless_status)
+        if skip:
+            where += f" AND status NOT IN ({', '.join('?' for _ in skip)})"
+        with self._lock:
+            cur = self._conn.execute(f"UPDATE jobs SET {sets} WHERE {where}", (*values, job_id, *skip))
+            self._conn.commit()
+        return cur.rowcount > 0
+
+    def put_video(self, job_id: str, slot: int, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_videos (job_id, slot, result) VALUES (?, ?, ?)",
+                (job_id, slot, json.dumps(result, ensure_ascii=False)),
+            )
+            self._conn.execute("UPDATE jobs SET updated_at = ? WHERE job_id = ?", (time.time(), job_id))
+            self._conn.commit()
+
+    def videos(self, job_id: str) -> Dict[int, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT slot, result FROM job_videos WHERE job_id = ?", (job_id,)).fetchall()
+        return {slot: json.loads(result) for slot, result in rows}
+
+    def list_unfinished(self) -> List[Dict[str, Any]]:
+        cols = ", ".join(("job_id",) + self._JOB_COLUMNS)
+        marks = ", ".join("?" for _ in TERMINAL_STATUSES)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {cols} FROM jobs WHERE status NOT IN ({marks}) ORDER BY created_at",
+                tuple(TERMINAL_STATUSES),
+            ).fetchall()
+        return [self._row_to_job(r) for r in rows]
+
+    def claim(self, job_id: str, owner: str, lease_sec: float) -> bool:
+        now = time.time()
+        marks = ", ".join("?" for _ in TERMINAL_STATUSES)
+        with self._lock:
+            cur = self._conn.execute(
+                f"UPDATE jobs SET owner = ?, lease_until = ? "
+                f"WHERE job_id = ? AND status NOT IN ({marks}) "
+                f"AND (owner IS NULL OR owner = ? OR lease_until IS NULL OR lease_until < ?)",
+                (owner, now + lease_sec, job_id, *TERMINAL_STATUSES, owner, now),
+            )
+            self._conn.commit()
+        return cur.rowcount > 0
+
+    def release(self, job_id: str, owner: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET owner = NULL, lease_until = NULL WHERE job_id = ? AND owner = ?",
+                (job_id, owner),
+            )
+            self._conn.commit()
+
+
+def build_job_store() -> JobStore:
+    """JOB_STORE=memory|sqlite. sqlite 경로가 없거나 열 수 없으면 memory."""
+    if JOB_STORE == "sqlite" and JOB_DB_PATH:
+        try:
+            return SqliteJobStore(JOB_DB_PATH)
+        except Exception:
+            pass
+    return MemoryJobStore()
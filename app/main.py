@@ -3,32 +3,200 @@ from __future__ import annotations
 import os
 import json
 import asyncio
-from typing import Any, Dict, List, Optional
-
+import logging
+import hashlib
+import time
+import uuid
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
+
+import httpx
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 from app.apify_client import (
+    create_http_client,
     fetch_transcript_and_metadata,
-    fetch_audio_bytes_from_converter,
+    fetch_audio_file_from_converter,
     ApifyError,
 )
-from app.gemini_audio import transcribe_audio_bytes
-from app.gemini_rest import analyze_with_gemini
+from app.apify_runs import RunTracker
+from app.batcher import MicroBatcher
+from app.cache import SingleFlight, build_tiered_cache
+from app.channels import build_channel_store, channel_key
+from app.dna_aggregate import aggregate_dna
+from app.quotes import QuoteIndex, fill_quote_times, verify_quotes
+from app.segments import Segments
+from app.jobs import TERMINAL_STATUSES, build_job_store
+from app.pipeline import Pipeline, Stage, live_stats as pipeline_live_stats
+from app.gemini_client import get_model, warm_up as warm_up_gemini
+from app.gemini_audio import transcribe_audio_chunked_async
+from app.gemini_rest import analyze_with_gemini_async
+from app import metrics, resilience, scheduler
 from app.prompts import (
+    VIDEO_ANALYSIS_SCHEMA,
+    VIDEO_ANALYSIS_BATCH_SCHEMA,
+    VIDEO_ANALYSIS_PROMPT_VERSION,
+    CHANNEL_PROFILE_SCHEMA,
     build_video_analysis_prompt,
+    build_video_analysis_batch_prompt,
     build_channel_profile_prompt,
+    build_channel_profile_from_aggregate_prompt,
+    build_channel_profile_merge_prompt,
+    build_channel_profile_reduce_prompt,
     build_json_repair_prompt,
 )
-from app.utils import normalize_urls, pick_language_priority, compact_text, segments_to_text
+from app.utils import (
+    group_urls_by_video,
+    pick_language_priority,
+    compact_text,
+    compact_transcript,
+    segments_to_text,
+    extract_video_id,
+    estimate_tokens,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Apify 호출은 앱 전체가 하나의 커넥션 풀을 공유 (TLS/DNS 재사용)
+    app.state.apify_http = create_http_client()
+    # Gemini client를 첫 요청이 아니라 기동 시점에 생성
+    app.state.gemini_warmup_error = await warm_up_gemini()
+    if JOB_RESUME_ON_STARTUP:
+        await _resume_unfinished_jobs()
+    try:
+        yield
+    finally:
+        # 실행 중 job은 상태를 그대로 두고 멈춤 -> 다음 기동 때 이어서 실행
+        for t in list(_job_tasks.values()):
+            t.cancel()
+        await asyncio.gather(*_job_tasks.values(), return_exceptions=True)
+        await app.state.apify_http.aclose()
 
-app = FastAPI(title="YouTube Transcript + Channel Profile (Apify + Gemini)")
+
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="YouTube Transcript + Channel Profile (Apify + Gemini)", lifespan=lifespan)
 
 DEFAULT_CONCURRENCY = int(os.getenv("CONCURRENCY", "4"))
 APIFY_TIMEOUT_SEC = float(os.getenv("APIFY_TIMEOUT_SEC", "120"))
-MAX_TRANSCRIPT_CHARS = int(os.getenv("MAX_TRANSCRIPT_CHARS", "18000"))
+# 영상 분석 프롬프트에 넣을 transcript 토큰 예산 (utils.estimate_tokens 기준)
+# 모델 입력 한도의 절반을 넘지 않게 (나머지는 프롬프트 본문/메타 몫)
+MAX_TRANSCRIPT_TOKENS = min(
+    int(os.getenv("MAX_TRANSCRIPT_TOKENS", "12000")),
+    get_model("text").input_token_limit // 2,
+)
 APIFY_TOKEN = os.getenv("APIFY_TOKEN", "").strip()
 APIFY_YOUTUBE_COOKIES = os.getenv("APIFY_YOUTUBE_COOKIES", "").strip()
+DEFAULT_LANGUAGE_STRATEGY = os.getenv("LANGUAGE_STRATEGY", "sequential").strip().lower()
+GEMINI_STRUCTURED_OUTPUT = os.getenv("GEMINI_STRUCTURED_OUTPUT", "true").strip().lower() in {"1", "true", "yes"}
+# 영상 하나당 upstream 재시도에 쓸 수 있는 전체 시간 예산
+VIDEO_DEADLINE_SEC = float(os.getenv("VIDEO_DEADLINE_SEC", "1200"))
+# 영상 단계 파이프라인: fetch/analyze worker 수는 요청 concurrency, 나머지 단계는 아래 값
+PIPELINE_STT_WORKERS = int(os.getenv("PIPELINE_STT_WORKERS", "2"))
+PIPELINE_VALIDATE_WORKERS = int(os.getenv("PIPELINE_VALIDATE_WORKERS", "2"))
+# 단계별 대기열 크기 (worker 수보다 작으면 worker 수로)
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "0"))
+# transcript에서 찾을 수 없는 인용 처리: drop(제거) / flag(match.kind="none" 표시) / off(검증 안 함)
+QUOTE_VERIFY_MODE = os.getenv("QUOTE_VERIFY_MODE", "drop").strip().lower()
+
+# transcript/metadata 캐시 (video ID + language 단위)
+TRANSCRIPT_CACHE_MAX_ITEMS = int(os.getenv("TRANSCRIPT_CACHE_MAX_ITEMS", "1024"))
+TRANSCRIPT_CACHE_TTL_SEC = float(os.getenv("TRANSCRIPT_CACHE_TTL_SEC", "21600"))
+TRANSCRIPT_CACHE_DISK_TTL_SEC = float(os.getenv("TRANSCRIPT_CACHE_DISK_TTL_SEC", "604800"))
+
+transcript_cache = build_tiered_cache(
+    "transcripts",
+    memory_max_items=TRANSCRIPT_CACHE_MAX_ITEMS,
+    memory_ttl_sec=TRANSCRIPT_CACHE_TTL_SEC,
+    disk_ttl_sec=TRANSCRIPT_CACHE_DISK_TTL_SEC,
+)
+
+# 영상 분석 결과 캐시 (transcript/title/description 해시 + 프롬프트 버전 + 모델)
+ANALYSIS_CACHE_MAX_ITEMS = int(os.getenv("ANALYSIS_CACHE_MAX_ITEMS", "1024"))
+ANALYSIS_CACHE_TTL_SEC = float(os.getenv("ANALYSIS_CACHE_TTL_SEC", "86400"))
+ANALYSIS_CACHE_DISK_TTL_SEC = float(os.getenv("ANALYSIS_CACHE_DISK_TTL_SEC", "2592000"))
+
+analysis_cache = build_tiered_cache(
+    "video_analyses",
+    memory_max_items=ANALYSIS_CACHE_MAX_ITEMS,
+    memory_ttl_sec=ANALYSIS_CACHE_TTL_SEC,
+    disk_ttl_sec=ANALYSIS_CACHE_DISK_TTL_SEC,
+)
+
+# 짧은 영상(쇼츠 등) 분석은 여러 개를 한 Gemini 요청으로 묶음 (영상별 key로 응답 분리)
+# 기본 꺼짐: 묶은 호출은 한 번이 길어져 RPM 한도가 병목이 아니면 오히려 느림
+# (bench_analysis_batch 60편/동시 12: 한도 없음 single 4.75s / batched 7.07s, RPM 240: 14.91s / 7.08s)
+ANALYSIS_BATCH = os.getenv("ANALYSIS_BATCH", "false").strip().lower() in {"1", "true", "yes"}
+# 이 토큰 수(utils.estimate_tokens 기준) 이하 transcript만 배치 대상
+ANALYSIS_BATCH_MAX_TRANSCRIPT_TOKENS = int(os.getenv("ANALYSIS_BATCH_MAX_TRANSCRIPT_TOKENS", "1500"))
+ANALYSIS_BATCH_MAX_VIDEOS = int(os.getenv("ANALYSIS_BATCH_MAX_VIDEOS", "6"))
+# 배치 하나의 transcript 토큰 합 상한
+ANALYSIS_BATCH_TOKENS = int(os.getenv("ANALYSIS_BATCH_TOKENS", "6000"))
+ANALYSIS_BATCH_WINDOW_MS = float(os.getenv("ANALYSIS_BATCH_WINDOW_MS", "150"))
+
+analysis_batcher = MicroBatcher(
+    "video_analyses",
+    lambda items: _run_analysis_batch(items),
+    max_items=ANALYSIS_BATCH_MAX_VIDEOS,
+    max_tokens=ANALYSIS_BATCH_TOKENS,
+    window_sec=ANALYSIS_BATCH_WINDOW_MS / 1000,
+)
+
+# STT fallback 결과 캐시 (video ID + audio 모델) + 동시 실행 합치기
+STT_CACHE_MAX_ITEMS = int(os.getenv("STT_CACHE_MAX_ITEMS", "256"))
+STT_CACHE_TTL_SEC = float(os.getenv("STT_CACHE_TTL_SEC", "86400"))
+STT_CACHE_DISK_TTL_SEC = float(os.getenv("STT_CACHE_DISK_TTL_SEC", "2592000"))
+
+stt_cache = build_tiered_cache(
+    "audio_stt",
+    memory_max_items=STT_CACHE_MAX_ITEMS,
+    memory_ttl_sec=STT_CACHE_TTL_SEC,
+    disk_ttl_sec=STT_CACHE_DISK_TTL_SEC,
+)
+stt_flight = SingleFlight("audio_stt")
+
+# converter run ID 기억(video ID 단위) -> 타임아웃 뒤 같은 영상 요청은 기존 run 재개
+CONVERTER_RUN_TTL_SEC = float(os.getenv("CONVERTER_RUN_TTL_SEC", "21600"))
+
+converter_runs = build_tiered_cache(
+    "converter_runs",
+    memory_max_items=1024,
+    memory_ttl_sec=CONVERTER_RUN_TTL_SEC,
+    disk_ttl_sec=CONVERTER_RUN_TTL_SEC,
+)
+run_tracker = RunTracker(run_store=converter_runs)
+
+JOB_RESUME_ON_STARTUP = os.getenv("JOB_RESUME_ON_STARTUP", "true").strip().lower() in {"1", "true", "yes"}
+# 실행 중인 job의 lease 길이. worker가 죽으면 이 시간이 지난 뒤 다른 worker가 재개 가능
+JOB_LEASE_SEC = float(os.getenv("JOB_LEASE_SEC", "60"))
+# 이 프로세스의 lease owner ID (같은 DB를 쓰는 uvicorn worker/인스턴스마다 다름)
+JOB_WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+
+job_store = build_job_store()
+_job_tasks: Dict[str, "asyncio.Task[None]"] = {}
+
+# 채널별 영상 DNA + 마지막 프로필. 새 영상이 있을 때만 (병합 or 전체) 재계산
+CHANNEL_PROFILE_MAX_VIDEOS = int(os.getenv("CHANNEL_PROFILE_MAX_VIDEOS", "200"))
+CHANNEL_PROFILE_MAX_MERGES = int(os.getenv("CHANNEL_PROFILE_MAX_MERGES", "5"))
+# Gemini에 원본 DNA 대신 로컬 집계(app.dna_aggregate)를 넘김
+CHANNEL_DNA_AGGREGATE = os.getenv("CHANNEL_DNA_AGGREGATE", "true").strip().lower() in {"1", "true", "yes"}
+# 프로필 입력 추정 토큰(집계 전 원본 DNA 기준)이 이걸 넘으면 map-reduce: GROUP_SIZE개씩 부분 프로필 -> FANOUT개씩 합치기
+CHANNEL_PROFILE_MAP_REDUCE_TOKENS = int(os.getenv("CHANNEL_PROFILE_MAP_REDUCE_TOKENS", "30000"))
+CHANNEL_PROFILE_GROUP_SIZE = int(os.getenv("CHANNEL_PROFILE_GROUP_SIZE", "20"))
+CHANNEL_PROFILE_REDUCE_FANOUT = int(os.getenv("CHANNEL_PROFILE_REDUCE_FANOUT", "6"))
+
+channel_store = build_channel_store()
+# 갱신 중(lock을 잡았거나 기다리는 요청이 있는) 채널만 남음
+_channel_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _apify_http() -> Optional[httpx.AsyncClient]:
+    # lifespan 밖(스크립트 직접 호출 등)에서는 None -> 호출마다 1회용 client
+    return getattr(app.state, "apify_http", None)
 
 
 class AnalyzeReq(BaseModel):
@@ -36,11 +204,89 @@ class AnalyzeReq(BaseModel):
     languages: List[str] = Field(default_factory=lambda: ["ko", "en"])
     concurrency: int = Field(default=DEFAULT_CONCURRENCY, ge=1, le=20)
     make_channel_profile: bool = True
+    force_refresh: bool = Field(default=False, description="캐시 무시하고 Apify 재호출")
+    language_strategy: Literal["sequential", "race", "first_n"] = Field(
+        default=DEFAULT_LANGUAGE_STRATEGY,
+        description="sequential: 우선순위대로 하나씩 / race: 전부 동시 / first_n: 상위 N개 동시 후 나머지 순차",
+    )
+    language_race_n: int = Field(default=2, ge=1, le=10, description="first_n에서 동시에 시도할 언어 수")
+    structured_output: bool = Field(
+        default=GEMINI_STRUCTURED_OUTPUT,
+        description="Gemini에 response_schema를 넘겨 JSON 출력 강제(repair 호출 감소)",
+    )
+    include_timings: bool = Field(default=True, description="영상 결과에 단계별 소요 시간(ms) timings 포함")
 
 
 @app.get("/health")
 def health():
-    return {"ok": True}
+    return {"ok": True, "circuits": resilience.breaker_states()}
+
+
+def _repair_stats() -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for mode in ("structured", "free"):
+        analyses = metrics.get("gemini_video_analysis_total", mode=mode)
+        repairs = metrics.get("gemini_json_repair_total", mode=mode)
+        out[mode] = {
+            "analyses": analyses,
+            "repairs": repairs,
+            "repair_rate": round(repairs / analyses, 4) if analyses else 0.0,
+        }
+    return out
+
+
+def _cache_samples(field: str) -> List[Tuple[Dict[str, Any], float]]:
+    out: List[Tuple[Dict[str, Any], float]] = []
+    for c in (transcript_cache, analysis_cache, stt_cache, converter_runs):
+        st = c.stats()
+        if field == "requests":
+            out.append(({"cache": c.name, "result": "hit_memory"}, st["hits_memory"]))
+            out.append(({"cache": c.name, "result": "hit_disk"}, st["hits_disk"]))
+            out.append(({"cache": c.name, "result": "miss"}, st["misses"]))
+        else:
+            out.append(({"cache": c.name}, st[field]))
+    return out
+
+
+metrics.register_collector("cache_requests_total", lambda: _cache_samples("requests"), kind="counter")
+metrics.register_collector("cache_hit_ratio", lambda: _cache_samples("hit_rate"))
+metrics.register_collector("cache_memory_items", lambda: _cache_samples("memory_items"))
+metrics.register_collector("single_flight_in_flight", lambda: [({"name": stt_flight.name}, stt_flight.stats()["in_flight"])])
+metrics.register_collector(
+    "batcher_pending", lambda: [({"name": analysis_batcher.name}, analysis_batcher.stats()["pending"])]
+)
+
+
+# /metrics, /stats는 async로 둔다: 동기 def면 threadpool에서 돌면서 event loop가 바꾸는
+# scheduler 대기열/파이프라인 집합을 순회하다 "changed size during iteration"이 날 수 있음
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics() -> PlainTextResponse:
+    """Prometheus text format: counter / 단계별 histogram / in-flight·queue depth·cache hit rate gauge."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "ok": True,
+        "caches": {
+            transcript_cache.name: transcript_cache.stats(),
+            analysis_cache.name: analysis_cache.stats(),
+            stt_cache.name: stt_cache.stats(),
+            converter_runs.name: converter_runs.stats(),
+        },
+        "single_flight": {
+            stt_flight.name: stt_flight.stats(),
+        },
+        "batchers": {
+            analysis_batcher.name: analysis_batcher.stats(),
+        },
+        "gemini": {
+            "json_repair": _repair_stats(),
+        },
+        "scheduler": scheduler.stats(),
+        "pipeline": pipeline_live_stats(),
+    }
 
 
 def _parse_body_allow_string_json(body: Any) -> Dict[str, Any]:
@@ -81,168 +327,600 @@ def _extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-async def _process_one(
-    idx: int,
+def _transcript_cache_key(url: str, language: str) -> str:
+    # 같은 영상의 URL 변형(youtu.be, &t= 등)이 한 키로 모이도록 video ID 우선
+    return f"{extract_video_id(url) or url}:{language}"
+
+
+async def _fetch_transcript_cached(url: str, language: str, force_refresh: bool) -> Dict[str, Any]:
+    """
+    fetch_transcript_and_metadata 앞단 캐시.
+    - force_refresh면 조회는 건너뛰고 새 결과로 덮어씀
+    - 실패(예외)는 캐시하지 않음
+    """
+    key = _transcript_cache_key(url, language)
+    if not force_refresh:
+        cached = await transcript_cache.get(key)
+        if cached is not None:
+            return cached
+
+    async def _call() -> Dict[str, Any]:
+        async with scheduler.slot("apify"):
+            return await fetch_transcript_and_metadata(
+                youtube_url=url,
+                language=language,
+                timeout_sec=APIFY_TIMEOUT_SEC,
+                token=APIFY_TOKEN,
+                actor_id="starvibe~youtube-video-transcript",
+                client=_apify_http(),
+            )
+
+    with metrics.timed("apify_transcript", timing_key=f"apify_transcript.{language}", language=language):
+        data = await resilience.call("apify", _call)
+    await transcript_cache.set(key, data)
+    return data
+
+
+async def _fetch_languages_sequential(
+    url: str,
+    langs: List[str],
+    force_refresh: bool,
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    apify_error: Optional[str] = None
+    for lang in langs:
+        try:
+            return await _fetch_transcript_cached(url, lang, force_refresh), None
+        except Exception as e:
+            apify_error = str(e)
+            # 429/circuit open은 다른 언어로 바꿔도 같은 결과 -> 바로 중단
+            if resilience.classify(e) == resilience.QUOTA or isinstance(e, resilience.CircuitOpenError):
+                break
+    return None, apify_error
+
+
+async def _fetch_languages_race(
+    url: str,
+    langs: List[str],
+    force_refresh: bool,
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    모든 언어를 동시에 요청하고, 성공한 것 중 우선순위가 가장 높은 결과를 채택.
+    - 상위 언어가 아직 진행 중이면 하위 언어가 먼저 성공해도 기다림
+    - 승자가 정해지면 나머지 요청은 취소
+    """
+    if not langs:
+        return None, None
+
+    tasks = [asyncio.create_task(_fetch_transcript_cached(url, lang, force_refresh)) for lang in langs]
+    try:
+        pending = set(tasks)
+        while pending:
+            _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in tasks:
+                if not t.done():
+                    break
+                if t.exception() is None:
+                    return t.result(), None
+            else:
+                break
+
+        errors = [f"{lang}: {t.exception()}" for lang, t in zip(langs, tasks)]
+        return None, " | ".join(errors)
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _fetch_transcript_by_strategy(
     url: str,
     lang_priority: List[str],
-    sem: asyncio.Semaphore,
+    strategy: str,
+    race_n: int,
+    force_refresh: bool,
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """language_strategy에 따라 Apify 비용(동시 run 수) vs tail latency 선택."""
+    if strategy == "race":
+        return await _fetch_languages_race(url, lang_priority, force_refresh)
+
+    if strategy == "first_n":
+        data, err = await _fetch_languages_race(url, lang_priority[:race_n], force_refresh)
+        if data is not None or len(lang_priority) <= race_n:
+            return data, err
+        data, err2 = await _fetch_languages_sequential(url, lang_priority[race_n:], force_refresh)
+        return data, (None if data is not None else (err2 or err))
+
+    return await _fetch_languages_sequential(url, lang_priority, force_refresh)
+
+
+def _as_float(v: Any) -> Optional[float]:
+    try:
+        return float(v) if v is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _check_quotes(
+    analysis_text: str,
+    transcript_text: str,
+    segments: Optional[Segments],
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    분석 결과 인용 로컬 후처리 (JSON 파싱 1회).
+    - 검증: Gemini가 본 transcript_text 기준 exact/normalized/fuzzy 위치, 못 찾으면 QUOTE_VERIFY_MODE대로
+    - 시각: segments 텍스트 기준 위치 -> approx_start_sec
+    """
+    parsed = _extract_json_from_text(analysis_text)
+    if not isinstance(parsed, dict):
+        return analysis_text, None
+
+    t0 = time.perf_counter()
+    index = QuoteIndex(transcript_text)
+    report: Optional[Dict[str, Any]] = None
+    if QUOTE_VERIFY_MODE != "off":
+        report = verify_quotes(parsed, index, mode=QUOTE_VERIFY_MODE)
+        for kind in ("exact", "normalized", "fuzzy", "unverified"):
+            if report[kind]:
+                metrics.incr("quotes_checked_total", report[kind], result=kind)
+    if segments:
+        time_index = index if segments.text == transcript_text else QuoteIndex(segments.text)
+        fill_quote_times(parsed, time_index, segments.time_at)
+    if report is not None:
+        report["ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    return json.dumps(parsed, ensure_ascii=False), report
+
+
+def _stt_cache_key(url: str) -> str:
+    return f"{extract_video_id(url) or url}:{get_model('audio').name}"
+
+
+async def _run_converter_stt(
+    url: str,
+    *,
+    key: str,
+    language_hint: str,
+    duration_sec: Optional[float],
 ) -> Dict[str, Any]:
-    async with sem:
-        # 1) transcript actor (언어 우선순위대로 시도)
-        apify_data: Optional[Dict[str, Any]] = None
-        apify_error: Optional[str] = None
-
-        for lang in lang_priority:
-            try:
-                apify_data = await fetch_transcript_and_metadata(
-                    youtube_url=url,
-                    language=lang,
-                    timeout_sec=APIFY_TIMEOUT_SEC,
-                    token=APIFY_TOKEN,
-                    actor_id="starvibe~youtube-video-transcript",
-                )
-                apify_error = None
-                break
-            except Exception as e:
-                apify_error = str(e)
-                apify_data = None
-
-        if not apify_data:
-            return {
-                "index": idx,
-                "url": url,
-                "ok": False,
-                "stage": "apify",
-                "error": apify_error or "Apify failed",
-            }
-
-        # 2) transcript_text 우선, 없으면 segments join
-        transcript_text = apify_data.get("transcript_text") or ""
-        transcript_text = compact_text(transcript_text, max_chars=MAX_TRANSCRIPT_CHARS)
-
-        if not transcript_text:
-            transcript_text = segments_to_text(
-                apify_data.get("transcript"),
-                max_chars=MAX_TRANSCRIPT_CHARS,
-            )
+    # Apify 슬롯은 run_tracker가 run 시작 요청에만 잡음 (polling/다운로드는 슬롯 밖).
+    # 재시도해도 run_tracker가 기억한 run을 이어서 기다리므로 새 run이 뜨지 않음
+    async def _call() -> Dict[str, Any]:
+        return await fetch_audio_file_from_converter(
+            youtube_url=url,
+            timeout_sec=APIFY_TIMEOUT_SEC,
+            token=APIFY_TOKEN,
+            actor_id="tazy~youtube-converter",
+            cookies_text=APIFY_YOUTUBE_COOKIES,
+            client=_apify_http(),
+            tracker=run_tracker,
+            run_key=extract_video_id(url) or url,
+        )
+
+    conv = await resilience.call("apify", _call)
+
+    with conv["file"] as audio_file, metrics.timed("gemini_stt"):
+        stt = await transcribe_audio_chunked_async(
+            file=audio_file,
+            size=conv["size"],
+            mime_type=conv["mime_type"],
+            language_hint=language_hint,
+            duration_sec=duration_sec,
+        )
+
+    out = {
+        "text": stt.get("text") or "",
+        "model": stt.get("model"),
+        "chunks": stt.get("chunks") or [],
+        "failed_chunks": stt.get("failed_chunks") or [],
+        "audio": {
+            "run_id": conv.get("run_id"),
+            "default_key_value_store_id": conv.get("default_key_value_store_id"),
+            "mime_type": conv.get("mime_type"),
+            "size": conv.get("size"),
+        },
+    }
+    # 일부 창이 빠진 결과는 캐시하지 않음 (다음 요청에서 다시 시도)
+    if out["text"] and not out["failed_chunks"]:
+        await stt_cache.set(key, out)
+    return out
 
-        transcript_source = "apify_transcript"
-
-        # 3) transcript 없으면 fallback: converter -> mp3 bytes -> Gemini STT
-        if not transcript_text:
-            try:
-                conv = await fetch_audio_bytes_from_converter(
-                    youtube_url=url,
-                    timeout_sec=APIFY_TIMEOUT_SEC,
-                    token=APIFY_TOKEN,
-                    actor_id="tazy~youtube-converter",
-                    cookies_text=APIFY_YOUTUBE_COOKIES,
-                )
 
-                stt = await asyncio.to_thread(
-                    transcribe_audio_bytes,
-                    audio_bytes=conv["bytes"],
-                    mime_type=conv["mime_type"],
-                    language_hint=(apify_data.get("language") or lang_priority[0] or "ko"),
-                )
+async def _transcribe_via_converter(
+    url: str,
+    *,
+    language_hint: str,
+    duration_sec: Optional[float],
+    force_refresh: bool,
+) -> Dict[str, Any]:
+    """
+    STT fallback (converter actor -> Gemini STT) 앞단.
+    - stt_cache(video ID + audio 모델) hit이면 converter를 아예 안 띄움
+    - 같은 영상에 대한 동시 요청은 stt_flight로 한 번만 실행하고 결과 공유
+    """
+    key = _stt_cache_key(url)
+    if not force_refresh:
+        cached = await stt_cache.get(key)
+        if cached is not None:
+            return {**cached, "cached": True}
 
-                transcript_text = compact_text(
-                    stt.get("text") or "",
-                    max_chars=MAX_TRANSCRIPT_CHARS,
-                )
-                transcript_source = "gemini_audio_stt"
-
-            except Exception as e:
-                return {
-                    "index": idx,
-                    "url": url,
-                    "ok": False,
-                    "stage": "transcript_fallback",
-                    "meta": {
-                        "title": apify_data.get("title", ""),
-                        "channel": apify_data.get("channel_name", ""),
-                        "published_at": apify_data.get("published_at", ""),
-                        "language": apify_data.get("language"),
-                    },
-                    "error": f"FALLBACK_STT_FAILED: {str(e)}",
-                }
+    return await stt_flight.do(
+        key,
+        lambda: _run_converter_stt(url, key=key, language_hint=language_hint, duration_sec=duration_sec),
+    )
 
-        if not transcript_text:
-            return {
-                "index": idx,
-                "url": url,
-                "ok": False,
-                "stage": "transcript",
-                "meta": {
-                    "title": apify_data.get("title", ""),
-                    "channel": apify_data.get("channel_name", ""),
-                    "published_at": apify_data.get("published_at", ""),
-                    "language": apify_data.get("language"),
-                },
-                "error": "NO_TRANSCRIPT_AFTER_FALLBACK",
-            }
-
-        meta = {
-            "title": apify_data.get("title", ""),
-            "description": apify_data.get("description", ""),
-            "channel": apify_data.get("channel_name", ""),
-            "published_at": apify_data.get("published_at", ""),
-            "duration_seconds": apify_data.get("duration_seconds"),
-            "view_count": apify_data.get("view_count"),
-            "like_count": apify_data.get("like_count"),
-            "comment_count": apify_data.get("comment_count"),
-            "language": apify_data.get("language"),
-        }
 
-        # 4) Gemini 영상별 분석
-        analysis_text = ""
+def _analysis_cache_key(title: str, description: str, transcript_text: str, structured_output: bool) -> str:
+    """
+    영상 분석 입력(transcript/title/description) 해시 + 프롬프트 버전 + 모델 + 출력 모드.
+    video index는 프롬프트에 들어가지만 키에서는 제외 (hit 시 video_index만 교체).
+    """
+    h = hashlib.sha256()
+    for part in (transcript_text, title, description):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    mode = "structured" if structured_output else "free"
+    return f"{VIDEO_ANALYSIS_PROMPT_VERSION}:{get_model('text').name}:{mode}:{h.hexdigest()}"
+
+
+def _with_video_index(analysis_text: str, idx: int) -> str:
+    parsed = _extract_json_from_text(analysis_text)
+    if not isinstance(parsed, dict) or parsed.get("video_index") == idx:
+        return analysis_text
+    parsed["video_index"] = idx
+    return json.dumps(parsed, ensure_ascii=False)
+
+
+async def _run_analysis_batch(items: List[Dict[str, Any]]) -> List[Optional[str]]:
+    """
+    analysis_batcher flush: 짧은 영상 여러 개를 한 번의 Gemini 호출로 분석.
+    영상별 결과 JSON 텍스트 목록(입력 순서) 반환, 응답에서 꺼내지 못한 영상은 None (호출자가 단일 호출로 재시도).
+    """
+    if len(items) < 2:
+        return [None] * len(items)
+
+    structured = bool(items[0]["structured_output"])
+    mode = "structured" if structured else "free"
+    metrics.incr("gemini_video_analysis_total", mode=f"{mode}_batch")
+    metrics.incr("analysis_batch_videos_total", len(items))
+
+    prompt = build_video_analysis_batch_prompt(
+        [{"key": i + 1, **item} for i, item in enumerate(items)]
+    )
+    model = get_model("text")
+    out = await analyze_with_gemini_async(
+        prompt,
+        # 영상 수만큼 늘리되 모델 출력 한도는 넘지 않게 (잘린 영상은 호출자가 단일 호출로 재시도)
+        max_output_tokens=min(model.max_output_tokens * len(items), model.output_token_limit),
+        response_schema=VIDEO_ANALYSIS_BATCH_SCHEMA if structured else None,
+    )
+
+    parsed = _extract_json_from_text(out.get("text") or "")
+    videos = parsed.get("videos") if isinstance(parsed, dict) else None
+    by_key: Dict[int, Dict[str, Any]] = {}
+    for v in videos if isinstance(videos, list) else []:
+        if isinstance(v, dict) and isinstance(v.get("video_index"), int):
+            by_key.setdefault(v["video_index"], v)
+
+    results: List[Optional[str]] = []
+    for i in range(len(items)):
+        v = by_key.get(i + 1)
+        results.append(json.dumps(v, ensure_ascii=False) if v is not None else None)
+    missing = results.count(None)
+    if missing:
+        metrics.incr("analysis_batch_fallback_total", missing, reason="missing")
+    return results
+
+
+async def _analyze_video(
+    idx: int,
+    meta: Dict[str, Any],
+    transcript_text: str,
+    *,
+    structured_output: bool,
+    force_refresh: bool,
+) -> Dict[str, Any]:
+    """
+    영상 1개 Gemini 분석(+필요 시 JSON repair 1회).
+    짧은 transcript는 analysis_batcher로 다른 영상과 묶어 보내고, 실패 시 단일 호출로 fallback.
+    성공 결과만 analysis_cache에 저장, hit이면 Gemini 호출 없이 cached: true.
+    """
+    title = meta.get("title", "") or ""
+    description = (meta.get("description", "") or "")[:300]
+    cache_key = _analysis_cache_key(title, description, transcript_text, structured_output)
+
+    if not force_refresh:
+        cached = await analysis_cache.get(cache_key)
+        if cached is not None:
+            return {"ok": True, "text": _with_video_index(cached["text"], idx), "cached": True}
+
+    transcript_tokens = estimate_tokens(transcript_text)
+    if ANALYSIS_BATCH and transcript_tokens <= ANALYSIS_BATCH_MAX_TRANSCRIPT_TOKENS:
         try:
-            prompt = build_video_analysis_prompt(
-                index=idx,
-                title=meta.get("title", ""),
-                description=(meta.get("description", "") or "")[:300],
-                transcript_text=transcript_text,
+            with metrics.timed("gemini_analysis", mode=f"{'structured' if structured_output else 'free'}_batch"):
+                batched = await analysis_batcher.submit(
+                    "structured" if structured_output else "free",
+                    {
+                        "title": title,
+                        "description": description,
+                        "transcript_text": transcript_text,
+                        "structured_output": structured_output,
+                    },
+                    tokens=transcript_tokens,
+                )
+        except Exception:
+            # 배치 호출 자체가 실패 -> 묶인 영상마다 아래 단일 호출로 다시 시도
+            metrics.incr("analysis_batch_fallback_total", reason="error")
+            batched = None
+        if batched is not None:
+            await analysis_cache.set(cache_key, {"text": batched})
+            return {"ok": True, "text": _with_video_index(batched, idx), "cached": False, "batched": True}
+        # 배치가 1개뿐이었거나 실패했거나 응답에서 이 영상 결과를 못 꺼냄 -> 아래 단일 호출
+
+    analysis_text = ""
+    try:
+        prompt = build_video_analysis_prompt(
+            index=idx,
+            title=title,
+            description=description,
+            transcript_text=transcript_text,
+        )
+
+        mode = "structured" if structured_output else "free"
+        schema = VIDEO_ANALYSIS_SCHEMA if structured_output else None
+        metrics.incr("gemini_video_analysis_total", mode=mode)
+
+        with metrics.timed("gemini_analysis", mode=mode):
+            first = await analyze_with_gemini_async(prompt, response_schema=schema)
+        analysis_text = (first.get("text") or "").strip()
+
+        parsed = _extract_json_from_text(analysis_text)
+
+        if parsed is None:
+            metrics.incr("gemini_json_repair_total", mode=mode)
+            repair_prompt = build_json_repair_prompt(
+                schema_json=json.dumps(VIDEO_ANALYSIS_SCHEMA, ensure_ascii=False),
+                raw_text=analysis_text[:6000],
             )
+            with metrics.timed("gemini_json_repair", mode=mode):
+                second = await analyze_with_gemini_async(repair_prompt, response_schema=schema)
+            analysis_text = (second.get("text") or "").strip()
 
-            first = await asyncio.to_thread(
-                analyze_with_gemini,
-                prompt,
-                max_output_tokens=2048,
-            )
-            analysis_text = (first.get("text") or "").strip()
+            parsed2 = _extract_json_from_text(analysis_text)
+            if parsed2 is None:
+                raise ValueError("Gemini output is not valid JSON even after repair")
 
-            parsed = _extract_json_from_text(analysis_text)
+    except Exception as e:
+        return {"ok": False, "error": str(e), "text": analysis_text[:1200]}
 
-            if parsed is None:
-                repair_prompt = build_json_repair_prompt(
-                    schema_json="video_analysis",
-                    raw_text=analysis_text[:6000],
-                )
-                second = await asyncio.to_thread(
-                    analyze_with_gemini,
-                    repair_prompt,
-                    max_output_tokens=2048,
-                )
-                analysis_text = (second.get("text") or "").strip()
+    await analysis_cache.set(cache_key, {"text": analysis_text})
+    return {"ok": True, "text": analysis_text, "cached": False}
 
-                parsed2 = _extract_json_from_text(analysis_text)
-                if parsed2 is None:
-                    raise ValueError("Gemini output is not valid JSON even after repair")
 
-            analysis = {"ok": True, "text": analysis_text}
+def _meta_brief(apify_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "title": apify_data.get("title", ""),
+        "channel": apify_data.get("channel_name", ""),
+        "published_at": apify_data.get("published_at", ""),
+        "language": apify_data.get("language"),
+    }
 
-        except Exception as e:
-            analysis = {"ok": False, "error": str(e), "text": analysis_text[:1200]}
 
-        return {
-            "index": idx,
-            "url": url,
-            "ok": True,
-            "meta": meta,
-            "transcript_source": transcript_source,
-            "transcript_chars": len(transcript_text),
-            "videoAnalysis": analysis,
+# ---------------------------------------------------------------------------
+# 영상 처리 단계: fetch -> (stt) -> analyze -> validate
+# 각 단계는 영상 state dict를 채우고 다음 단계 이름을 돌려줌 (끝이면 None, 결과는 state["result"])
+# ---------------------------------------------------------------------------
+
+async def _stage_fetch(st: Dict[str, Any]) -> Optional[str]:
+    # 1) transcript actor (language_strategy에 따라 순차/동시 시도)
+    apify_data, apify_error = await _fetch_transcript_by_strategy(
+        st["url"],
+        st["lang_priority"],
+        st["language_strategy"],
+        st["language_race_n"],
+        st["force_refresh"],
+    )
+
+    if not apify_data:
+        st["result"] = {
+            "index": st["idx"],
+            "url": st["url"],
+            "ok": False,
+            "stage": "apify",
+            "error": apify_error or "Apify failed",
+        }
+        return None
+
+    # 2) transcript_text 우선, 없으면 segments join -> 토큰 예산 기준 압축
+    #    시간 정보가 있는 세그먼트는 Segments로 한 번만 만들어 인용 시각 추정에 재사용
+    segments = Segments.from_apify(apify_data.get("transcript"))
+    transcript_text = compact_text(apify_data.get("transcript_text") or "", max_chars=0)
+    if not transcript_text:
+        transcript_text = segments.text if segments else segments_to_text(apify_data.get("transcript"))
+
+    compaction: Optional[Dict[str, Any]] = None
+    if transcript_text:
+        # 긴 자막 압축은 CPU 작업 -> event loop 밖에서
+        transcript_text, compaction = await asyncio.to_thread(compact_transcript, transcript_text, MAX_TRANSCRIPT_TOKENS)
+
+    st.update(
+        apify_data=apify_data,
+        segments=segments,
+        transcript_text=transcript_text,
+        compaction=compaction,
+        transcript_source="apify_transcript",
+        stt=None,
+    )
+    return "analyze" if transcript_text else "stt"
+
+
+async def _stage_stt(st: Dict[str, Any]) -> Optional[str]:
+    # 3) transcript 없으면 fallback: converter -> mp3 스풀 파일 -> Gemini STT
+    apify_data = st["apify_data"]
+    try:
+        stt = await _transcribe_via_converter(
+            st["url"],
+            language_hint=(apify_data.get("language") or st["lang_priority"][0] or "ko"),
+            duration_sec=_as_float(apify_data.get("duration_seconds")),
+            force_refresh=st["force_refresh"],
+        )
+    except Exception as e:
+        st["result"] = {
+            "index": st["idx"],
+            "url": st["url"],
+            "ok": False,
+            "stage": "transcript_fallback",
+            "meta": _meta_brief(apify_data),
+            "error": f"FALLBACK_STT_FAILED: {str(e)}",
         }
+        return None
+
+    transcript_text, compaction = await asyncio.to_thread(
+        compact_transcript, stt.get("text") or "", MAX_TRANSCRIPT_TOKENS
+    )
+    if not transcript_text:
+        st["result"] = {
+            "index": st["idx"],
+            "url": st["url"],
+            "ok": False,
+            "stage": "transcript",
+            "meta": _meta_brief(apify_data),
+            "error": "NO_TRANSCRIPT_AFTER_FALLBACK",
+        }
+        return None
+
+    st.update(
+        stt=stt,
+        transcript_text=transcript_text,
+        compaction=compaction,
+        transcript_source="gemini_audio_stt",
+    )
+    return "analyze"
+
+
+async def _stage_analyze(st: Dict[str, Any]) -> Optional[str]:
+    apify_data = st["apify_data"]
+    st["meta"] = {
+        "title": apify_data.get("title", ""),
+        "description": apify_data.get("description", ""),
+        "channel": apify_data.get("channel_name", ""),
+        "published_at": apify_data.get("published_at", ""),
+        "duration_seconds": apify_data.get("duration_seconds"),
+        "view_count": apify_data.get("view_count"),
+        "like_count": apify_data.get("like_count"),
+        "comment_count": apify_data.get("comment_count"),
+        "language": apify_data.get("language"),
+    }
+
+    # 4) Gemini 영상별 분석 (결과 캐시 우선)
+    st["analysis"] = await _analyze_video(
+        st["idx"],
+        st["meta"],
+        st["transcript_text"],
+        structured_output=st["structured_output"],
+        force_refresh=st["force_refresh"],
+    )
+    return "validate"
+
+
+async def _stage_validate(st: Dict[str, Any]) -> Optional[str]:
+    analysis = st["analysis"]
+    transcript_text = st["transcript_text"]
+    stt = st["stt"]
+    compaction = st["compaction"]
+
+    # 5) 인용 로컬 검증 + 시각(approx_start_sec) 추정: STT면 창별 시간 범위, 아니면 자막 세그먼트 시각
+    segments = st["segments"]
+    if stt:
+        segments = Segments.from_chunks(stt.get("text") or "", stt.get("chunks") or [])
+    quote_check: Optional[Dict[str, Any]] = None
+    if analysis.get("ok"):
+        analysis["text"], quote_check = _check_quotes(analysis["text"], transcript_text, segments)
+
+    result = {
+        "index": st["idx"],
+        "url": st["url"],
+        "ok": True,
+        "meta": st["meta"],
+        "transcript_source": st["transcript_source"],
+        "transcript_chars": len(transcript_text),
+        "videoAnalysis": analysis,
+    }
+    if quote_check:
+        result["quote_check"] = quote_check
+    if compaction:
+        result["transcript_compaction"] = compaction
+        metrics.incr("transcript_tokens_est_total", compaction["orig_tokens_est"], stage="raw")
+        metrics.incr("transcript_tokens_est_total", compaction["tokens_est"], stage="compacted")
+    if st.get("remember_dna"):
+        await _remember_channel_dna(result)
+    if stt:
+        result["stt"] = {
+            "chunks": len(stt.get("chunks") or []),
+            "failed_chunks": stt.get("failed_chunks") or [],
+            "cached": bool(stt.get("cached")),
+        }
+    st["result"] = result
+    return None
+
+
+_VIDEO_STAGES = {
+    "fetch": _stage_fetch,
+    "stt": _stage_stt,
+    "analyze": _stage_analyze,
+    "validate": _stage_validate,
+}
+
+
+def _video_state(
+    idx: int,
+    url: str,
+    lang_priority: List[str],
+    force_refresh: bool,
+    language_strategy: str,
+    language_race_n: int,
+    structured_output: bool,
+    remember_dna: bool = False,
+) -> Dict[str, Any]:
+    return {
+        "idx": idx,
+        "url": url,
+        "lang_priority": lang_priority,
+        "force_refresh": force_refresh,
+        "language_strategy": language_strategy,
+        "language_race_n": language_race_n,
+        "structured_output": structured_output,
+        # 채널 프로필을 만드는 요청만 영상 DNA를 채널 저장소에 기록
+        "remember_dna": remember_dna,
+    }
+
+
+def _with_timings(result: Dict[str, Any], timings: Dict[str, float], t_video: float) -> Dict[str, Any]:
+    """
+    영상 결과에 timings(ms) 부착: 파이프라인 단계(fetch/stt/analyze/validate) +
+    하위 upstream 작업(apify_transcript.<lang>, converter_run, audio_download, gemini_stt, gemini_analysis, gemini_json_repair)
+    + 대기 포함 전체(total).
+    """
+    elapsed = time.perf_counter() - t_video
+    metrics.observe("video_duration_seconds", elapsed, ok=bool(result.get("ok")))
+    result["timings"] = {**timings, "total": round(elapsed * 1000, 1)}
+    return result
+
+
+def _build_video_pipeline(concurrency: int) -> Pipeline:
+    """
+    요청 단위 단계 파이프라인. 단계마다 worker 수만큼만 동시에 처리하고 나머지는 단계 queue에서 대기.
+    analyze는 짧은 영상 배치가 찰 수 있도록 배치 크기만큼은 worker를 둔다.
+    """
+    analyze_workers = max(concurrency, ANALYSIS_BATCH_MAX_VIDEOS) if ANALYSIS_BATCH else concurrency
+    return Pipeline(
+        "videos",
+        [
+            Stage("fetch", _stage_fetch, workers=concurrency, queue_size=PIPELINE_QUEUE_SIZE),
+            Stage("stt", _stage_stt, workers=min(PIPELINE_STT_WORKERS, concurrency), queue_size=PIPELINE_QUEUE_SIZE),
+            Stage("analyze", _stage_analyze, workers=analyze_workers, queue_size=PIPELINE_QUEUE_SIZE),
+            Stage("validate", _stage_validate, workers=PIPELINE_VALIDATE_WORKERS, queue_size=PIPELINE_QUEUE_SIZE),
+        ],
+    )
 
 
 def _build_warnings(videos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -274,117 +952,568 @@ def _build_warnings(videos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return warns
 
 
-async def _analyze_impl(req: AnalyzeReq) -> Dict[str, Any]:
-    urls = normalize_urls(req.urls)
-    if not urls:
+def _attach_inputs(video: Dict[str, Any], group: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    파이프라인은 정규화 URL(fetch_url)로 돌고,
+    응답에는 원래 입력 URL과 그 영상을 가리킨 모든 입력 위치를 붙인다.
+    """
+    video["url"] = group["url"]
+    video["video_id"] = group["video_id"]
+    video["input_indices"] = group["input_indices"]
+    if len(group["input_urls"]) > 1:
+        video["input_urls"] = group["input_urls"]
+    return video
+
+
+def _start_video_tasks(
+    req: AnalyzeReq,
+    skip_indices: Optional[set] = None,
+) -> Tuple[List[Dict[str, Any]], List["asyncio.Task[Dict[str, Any]]"], Pipeline]:
+    """
+    URL 그룹핑 후 영상별 task를 띄운다(입력 순서 유지). 각 task는 요청 단위 단계 파이프라인을 통과.
+    skip_indices: 이미 결과가 있는 영상 index(1-based) -> task 생성 안 함
+    """
+    groups = group_urls_by_video(req.urls)
+    if not groups:
         raise HTTPException(400, "urls is empty")
 
     lang_priority = pick_language_priority(req.languages)
-    sem = asyncio.Semaphore(req.concurrency)
+    # 요청 단위 flow: 이 안에서 만든 task들의 upstream 호출이 같은 공정 대기열/상한을 공유
+    scheduler.set_flow(limit=req.concurrency)
+    pipeline = _build_video_pipeline(req.concurrency)
+
+    async def run(i: int, g: Dict[str, Any]) -> Dict[str, Any]:
+        # 영상 task 단위 재시도 예산 (race 하위 task들도 상속)
+        resilience.start_deadline(VIDEO_DEADLINE_SEC)
+        st = _video_state(
+            i + 1,
+            g["fetch_url"],
+            lang_priority,
+            req.force_refresh,
+            req.language_strategy,
+            req.language_race_n,
+            req.structured_output,
+            req.make_channel_profile,
+        )
+        timings = metrics.start_timings()
+        t_video = time.perf_counter()
+        st = await pipeline.run(st)
+        v = _with_timings(_attach_inputs(st["result"], g), timings, t_video)
+        if not req.include_timings:
+            v.pop("timings", None)
+        return v
+
+    skip = skip_indices or set()
+    tasks = [asyncio.create_task(run(i, g)) for i, g in enumerate(groups) if (i + 1) not in skip]
+    return groups, tasks, pipeline
+
+
+def _dict_section(parsed: Dict[str, Any], key: str) -> Dict[str, Any]:
+    section = parsed.get(key)
+    return section if isinstance(section, dict) else {}
+
+
+def _slim_analysis(v: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """영상 결과 -> 채널 프로필 입력용 슬림 DNA 항목. 분석 실패 영상이면 None."""
+    if not v.get("ok"):
+        return None
 
-    tasks = [_process_one(i + 1, u, lang_priority, sem) for i, u in enumerate(urls)]
-    videos = await asyncio.gather(*tasks)
+    va = v.get("videoAnalysis")
+    if not isinstance(va, dict) or va.get("ok") is False:
+        return None
 
-    channel_profile: Optional[Dict[str, Any]] = None
+    text = (va.get("text") or "").strip()
+    parsed = _extract_json_from_text(text)
+
+    if isinstance(parsed, dict) and parsed.get("ok") is True:
+        # 자유 출력은 섹션이 문자열 등으로 올 수 있음 -> dict가 아니면 빈 섹션
+        hook = _dict_section(parsed, "hook")
+        structure = _dict_section(parsed, "structure")
+        style_tone = _dict_section(parsed, "style_tone")
+        expression_markers = _dict_section(parsed, "expression_markers")
+        retention = _dict_section(parsed, "retention")
+        quotes = _dict_section(parsed, "quotes") or {"items": []}
+
+        slim = {
+            "video_index": parsed.get("video_index"),
+            "hook": {
+                "summary": hook.get("summary"),
+                "techniques": hook.get("techniques") or [],
+                "frames": hook.get("frames") or [],
+            },
+            "structure": {
+                "template": structure.get("template"),
+                "beats": structure.get("beats") or [],
+                "pacing": structure.get("pacing"),
+            },
+            "style_tone": {
+                "persona": style_tone.get("persona"),
+                "narration_style": style_tone.get("narration_style"),
+                "tone_keywords": style_tone.get("tone_keywords") or [],
+            },
+            "expression_markers": {
+                "punctuation": expression_markers.get("punctuation") or [],
+                "catchphrases": expression_markers.get("catchphrases") or [],
+                "rhythm": expression_markers.get("rhythm"),
+                "numbers_style": expression_markers.get("numbers_style"),
+            },
+            "retention": {
+                "recurring_devices": retention.get("recurring_devices") or [],
+                "cta": retention.get("cta"),
+            },
+            "quotes": quotes,
+        }
+    else:
+        slim = {"raw_text": text[:1200]}
 
-    if req.make_channel_profile:
-        analyses: List[Dict[str, Any]] = []
-
-        for v in videos:
-            if not v.get("ok"):
-                continue
-
-            va = v.get("videoAnalysis")
-            if not isinstance(va, dict) or va.get("ok") is False:
-                continue
-
-            text = (va.get("text") or "").strip()
-            parsed = _extract_json_from_text(text)
-
-            if isinstance(parsed, dict) and parsed.get("ok") is True:
-                hook = parsed.get("hook") or {}
-                structure = parsed.get("structure") or {}
-                style_tone = parsed.get("style_tone") or {}
-                expression_markers = parsed.get("expression_markers") or {}
-                retention = parsed.get("retention") or {}
-                quotes = parsed.get("quotes") or {"items": []}
-
-                slim = {
-                    "video_index": parsed.get("video_index"),
-                    "hook": {
-                        "summary": hook.get("summary"),
-                        "techniques": hook.get("techniques") or [],
-                        "frames": hook.get("frames") or [],
-                    },
-                    "structure": {
-                        "template": structure.get("template"),
-                        "beats": structure.get("beats") or [],
-                        "pacing": structure.get("pacing"),
-                    },
-                    "style_tone": {
-                        "persona": style_tone.get("persona"),
-                        "narration_style": style_tone.get("narration_style"),
-                        "tone_keywords": style_tone.get("tone_keywords") or [],
-                    },
-                    "expression_markers": {
-                        "punctuation": expression_markers.get("punctuation") or [],
-                        "catchphrases": expression_markers.get("catchphrases") or [],
-                        "rhythm": expression_markers.get("rhythm"),
-                        "numbers_style": expression_markers.get("numbers_style"),
-                    },
-                    "retention": {
-                        "recurring_devices": retention.get("recurring_devices") or [],
-                        "cta": retention.get("cta"),
-                    },
-                    "quotes": quotes,
-                }
-            else:
-                slim = {"raw_text": text[:1200]}
+    meta = v.get("meta") or {}
+    return {
+        "index": v.get("index"),
+        "url": v.get("url") or "",
+        "meta": {
+            "title": meta.get("title", ""),
+            "channel": meta.get("channel", ""),
+            "published_at": meta.get("published_at", ""),
+            "language": meta.get("language", ""),
+        },
+        "dna": slim,
+    }
 
-            analyses.append(
-                {
-                    "index": v.get("index"),
-                    "url": v.get("url") or "",
-                    "meta": {
-                        "title": (v.get("meta") or {}).get("title", ""),
-                        "channel": (v.get("meta") or {}).get("channel", ""),
-                        "published_at": (v.get("meta") or {}).get("published_at", ""),
-                        "language": (v.get("meta") or {}).get("language", ""),
-                    },
-                    "dna": slim,
-                }
+
+async def _remember_channel_dna(v: Dict[str, Any]) -> None:
+    """분석 끝난 영상 DNA를 채널 저장소에 기록. 실패해도 영상 결과에는 영향 없음 (로그 + 지표만)."""
+    try:
+        item = _slim_analysis(v)
+        video_id = extract_video_id(v.get("url") or "")
+        if item is None or not video_id or not channel_key(item["meta"]["channel"]):
+            return
+        item.pop("index", None)  # 요청마다 다른 값이라 저장 안 함
+        await asyncio.to_thread(channel_store.put_dna, item["meta"]["channel"], video_id, item)
+    except Exception:
+        metrics.incr("channel_dna_store_errors_total")
+        logger.warning("channel DNA store failed for %s", v.get("url"), exc_info=True)
+
+
+def _channel_dna_input(analyses: List[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+    """
+    프로필 프롬프트에 넣을 DNA JSON.
+    CHANNEL_DNA_AGGREGATE면 로컬 집계본(빈도/core 분리 완료)으로 대체하고 크기 절감을 기록.
+    """
+    raw_json = json.dumps(analyses, ensure_ascii=False)
+    report: Dict[str, Any] = {"aggregated": False, "raw_tokens_est": estimate_tokens(raw_json)}
+    if not CHANNEL_DNA_AGGREGATE:
+        report["input_tokens_est"] = report["raw_tokens_est"]
+        return raw_json, report
+
+    t0 = time.perf_counter()
+    aggregate = aggregate_dna([a.get("dna") or {} for a in analyses])
+    aggregate_json = json.dumps(aggregate, ensure_ascii=False, separators=(",", ":"))
+    report.update(
+        aggregated=True,
+        input_tokens_est=estimate_tokens(aggregate_json),
+        aggregate_ms=round((time.perf_counter() - t0) * 1000, 2),
+    )
+    return aggregate_json, report
+
+
+async def _call_channel_profile(prompt: str, report: Dict[str, Any], structured_output: bool) -> Dict[str, Any]:
+    metrics.incr("channel_profile_input_tokens_est_total", report["raw_tokens_est"], kind="raw")
+    metrics.incr("channel_profile_input_tokens_est_total", report["input_tokens_est"], kind="sent")
+    t0 = time.perf_counter()
+    try:
+        with metrics.timed("channel_profile"):
+            out = await analyze_with_gemini_async(
+                prompt,
+                response_schema=CHANNEL_PROFILE_SCHEMA if structured_output else None,
             )
+    except Exception as e:
+        out = {"ok": False, "error": str(e)}
+    report["gemini_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return {**out, "input": report}
+
+
+async def _profile_from_analyses(analyses: List[Dict[str, Any]], structured_output: bool) -> Dict[str, Any]:
+    dna_json, report = _channel_dna_input(analyses)
+    if report["aggregated"]:
+        prompt = build_channel_profile_from_aggregate_prompt(dna_json)
+    else:
+        prompt = build_channel_profile_prompt(dna_json)
+
+    # 집계 결과는 채널 크기와 무관하게 작으므로 원본 DNA 크기로 판단.
+    # 실제 프롬프트가 모델 입력 한도를 넘어도 나눠서 처리
+    too_big = (
+        report["raw_tokens_est"] > CHANNEL_PROFILE_MAP_REDUCE_TOKENS
+        or estimate_tokens(prompt) > get_model("text").input_token_limit
+    )
+    if too_big and len(analyses) > CHANNEL_PROFILE_GROUP_SIZE:
+        return await _profile_map_reduce(analyses, structured_output)
+    return await _call_channel_profile(prompt, report, structured_output)
+
+
+async def _profile_map_reduce(analyses: List[Dict[str, Any]], structured_output: bool) -> Dict[str, Any]:
+    """
+    큰 채널용 계층 모드.
+    - map: CHANNEL_PROFILE_GROUP_SIZE개씩 나눠 부분 프로필을 동시에 생성 (실패 그룹은 제외)
+    - reduce: 부분 프로필을 CHANNEL_PROFILE_REDUCE_FANOUT개씩 합치기를 하나 남을 때까지 반복
+    """
+    t0 = time.perf_counter()
+    size = max(CHANNEL_PROFILE_GROUP_SIZE, 1)
+    fanout = max(CHANNEL_PROFILE_REDUCE_FANOUT, 2)
+    groups = [analyses[i:i + size] for i in range(0, len(analyses), size)]
+
+    mapped = await asyncio.gather(*(_profile_from_analyses(g, structured_output) for g in groups))
+    calls = len(groups)
+    level: List[Tuple[int, Dict[str, Any]]] = [
+        (len(g), out)
+        for g, out in zip(groups, mapped)
+        if out.get("ok") and isinstance(_extract_json_from_text(out.get("text") or ""), dict)
+    ]
+    failed_groups = len(groups) - len(level)
+    metrics.incr("channel_profile_map_reduce_total")
+
+    reduce_levels = 0
+    while len(level) > 1:
+        reduce_levels += 1
+        batches = [level[i:i + fanout] for i in range(0, len(level), fanout)]
+        reduced = await asyncio.gather(*(_reduce_channel_profiles(b, structured_output) for b in batches))
+        calls += sum(1 for b in batches if len(b) > 1)
+        level = [(sum(n for n, _ in b), out) for b, out in zip(batches, reduced)]
+        failed = next((out for _, out in level if not out.get("ok")), None)
+        if failed is not None:
+            level = [(0, failed)]
+
+    report = {
+        "map_reduce": {
+            "groups": len(groups),
+            "group_size": size,
+            "failed_groups": failed_groups,
+            "reduce_levels": reduce_levels,
+            "calls": calls,
+        },
+        "wall_ms": round((time.perf_counter() - t0) * 1000, 1),
+    }
+    if not level:
+        return {"ok": False, "error": "All channel profile map groups failed", "input": report}
+    return {**level[0][1], "input": report}
 
-        if analyses:
-            try:
-                analyses_json = json.dumps(analyses, ensure_ascii=False)
-                prompt = build_channel_profile_prompt(analyses_json)
-                channel_profile = await asyncio.to_thread(
-                    analyze_with_gemini,
-                    prompt,
-                    max_output_tokens=2048,
-                )
-            except Exception as e:
-                channel_profile = {"ok": False, "error": str(e)}
+
+async def _reduce_channel_profiles(
+    batch: List[Tuple[int, Dict[str, Any]]],
+    structured_output: bool,
+) -> Dict[str, Any]:
+    if len(batch) == 1:
+        return batch[0][1]
+    partials = [
+        {"video_count": n, "profile": _extract_json_from_text(out.get("text") or "")}
+        for n, out in batch
+    ]
+    prompt = build_channel_profile_reduce_prompt(
+        json.dumps(partials, ensure_ascii=False, separators=(",", ":")),
+        total_count=sum(n for n, _ in batch),
+    )
+    try:
+        return await analyze_with_gemini_async(
+            prompt,
+            response_schema=CHANNEL_PROFILE_SCHEMA if structured_output else None,
+        )
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+
+async def _merge_channel_profile(
+    previous: Dict[str, Any],
+    new_items: List[Dict[str, Any]],
+    structured_output: bool,
+) -> Dict[str, Any]:
+    dna_json, report = _channel_dna_input(new_items)
+    prompt = build_channel_profile_merge_prompt(
+        previous["profile"]["text"],
+        dna_json,
+        previous_count=len(previous["video_ids"]),
+        new_count=len(new_items),
+    )
+    return await _call_channel_profile(prompt, report, structured_output)
+
+
+async def _update_channel_profile(
+    channel: str,
+    structured_output: bool = True,
+    force_refresh: bool = False,
+) -> Dict[str, Any]:
+    """
+    저장된 DNA 기준으로 채널 프로필을 최신화.
+    - 새 영상이 없으면 저장된 프로필 그대로 (Gemini 호출 없음)
+    - 새 영상이 기존보다 적으면 기존 프로필 + 새 DNA만 병합 (CHANNEL_PROFILE_MAX_MERGES번까지)
+    - 그 외에는 최근 CHANNEL_PROFILE_MAX_VIDEOS개 DNA로 전체 재계산
+    - force_refresh면 저장된 프로필을 지우고 전체 재계산 (재분석된 DNA가 반영되도록)
+    같은 채널 갱신은 lock으로 순서대로 (뒤 요청은 앞 요청 결과에 병합).
+    """
+    lock = _channel_locks.setdefault(channel_key(channel), asyncio.Lock())
+    async with lock:
+        dna = await asyncio.to_thread(channel_store.dna, channel)
+        if not dna:
+            return {"ok": False, "error": "No valid per-video analyses to build channel profile"}
+
+        if force_refresh:
+            await asyncio.to_thread(channel_store.delete_profile, channel)
+            previous = None
         else:
-            channel_profile = {
-                "ok": False,
-                "error": "No valid per-video analyses to build channel profile",
-            }
+            previous = await asyncio.to_thread(channel_store.get_profile, channel)
+        prev_ids = set(previous["video_ids"]) if previous else set()
+        new_ids = [vid for vid in dna if vid not in prev_ids]
+
+        if previous and not new_ids:
+            metrics.incr("channel_profile_total", mode="cached")
+            return {**previous["profile"], "channel": channel, "video_count": len(prev_ids), "mode": "cached"}
+
+        merges = previous.get("merges_since_full", 0) if previous else 0
+        if previous and len(new_ids) < len(prev_ids) and merges < CHANNEL_PROFILE_MAX_MERGES:
+            mode = "merged"
+            profile = await _merge_channel_profile(previous, [dna[vid] for vid in new_ids], structured_output)
+            video_ids = list(previous["video_ids"]) + new_ids
+            merges += 1
+        else:
+            mode = "full"
+            video_ids = list(dna)[-CHANNEL_PROFILE_MAX_VIDEOS:]
+            profile = await _profile_from_analyses([dna[vid] for vid in video_ids], structured_output)
+            merges = 0
+
+        metrics.incr("channel_profile_total", mode=mode)
+        # JSON으로 안 읽히는 결과는 다음 병합의 기준으로 쓸 수 없으므로 저장 안 함
+        if profile.get("ok") and isinstance(_extract_json_from_text(profile.get("text") or ""), dict):
+            await asyncio.to_thread(
+                channel_store.put_profile,
+                channel,
+                {"channel": channel, "profile": profile, "video_ids": video_ids, "merges_since_full": merges},
+            )
+        return {**profile, "channel": channel, "video_count": len(video_ids), "mode": mode}
+
+
+async def _build_channel_profile(
+    videos: List[Dict[str, Any]],
+    structured_output: bool = True,
+    force_refresh: bool = False,
+) -> Dict[str, Any]:
+    """
+    영상별 분석 결과(성공한 것만)로 채널 프로필 생성.
+    전부 같은 채널이면 채널 저장소 기준으로 증분 갱신, 아니면 이번 요청 영상만으로 1회성 생성.
+    """
+    analyses = [a for a in (_slim_analysis(v) for v in videos) if a is not None]
+    if not analyses:
+        return {
+            "ok": False,
+            "error": "No valid per-video analyses to build channel profile",
+        }
+
+    channels = {channel_key(a["meta"]["channel"]) for a in analyses}
+    if len(channels) == 1 and "" not in channels:
+        # 영상별 DNA는 validate 단계(_stage_validate -> _remember_channel_dna)에서 이미 저장됨
+        return await _update_channel_profile(analyses[0]["meta"]["channel"], structured_output, force_refresh)
+
+    return await _profile_from_analyses(analyses, structured_output)
+
+
+async def _analyze_impl(req: AnalyzeReq) -> Dict[str, Any]:
+    groups, tasks, pipeline = _start_video_tasks(req)
+    try:
+        videos = await asyncio.gather(*tasks)
+    finally:
+        for t in tasks:
+            t.cancel()
+
+    channel_profile: Optional[Dict[str, Any]] = None
+    if req.make_channel_profile:
+        channel_profile = await _build_channel_profile(videos, req.structured_output, req.force_refresh)
 
     warnings = _build_warnings(videos)
 
     return {
         "ok": True,
         "count": len(videos),
+        "input_count": sum(len(g["input_indices"]) for g in groups),
         "videos": videos,
         "channelProfile": channel_profile,
         "warnings": warnings,
+        "pipeline": pipeline.stats(),
     }
 
 
-@app.post("/analyze_and_profile")
-async def analyze_and_profile(request: Request) -> Dict[str, Any]:
+def _format_event(fmt: str, event: str, data: Any) -> str:
+    payload = json.dumps(data, ensure_ascii=False)
+    if fmt == "sse":
+        return f"event: {event}\ndata: {payload}\n\n"
+    return json.dumps({"event": event, "data": data}, ensure_ascii=False) + "\n"
+
+
+async def _analyze_stream(req: AnalyzeReq, fmt: str) -> StreamingResponse:
+    """
+    영상 하나가 끝날 때마다 바로 내보내는 스트리밍 버전.
+    이벤트 순서: start -> video(완료 순) ... -> warnings -> channelProfile(마지막)
+    클라이언트가 끊으면 남은 영상 task는 취소.
+    """
+    groups, tasks, _ = _start_video_tasks(req)
+
+    async def gen() -> AsyncIterator[str]:
+        try:
+            yield _format_event(
+                fmt,
+                "start",
+                {
+                    "count": len(groups),
+                    "input_count": sum(len(g["input_indices"]) for g in groups),
+                },
+            )
+
+            videos: List[Dict[str, Any]] = []
+            for fut in asyncio.as_completed(tasks):
+                v = await fut
+                videos.append(v)
+                yield _format_event(fmt, "video", v)
+
+            videos.sort(key=lambda v: v.get("index") or 0)
+            yield _format_event(fmt, "warnings", _build_warnings(videos))
+
+            channel_profile: Optional[Dict[str, Any]] = None
+            if req.make_channel_profile:
+                channel_profile = await _build_channel_profile(videos, req.structured_output, req.force_refresh)
+            yield _format_event(fmt, "channelProfile", channel_profile)
+        finally:
+            for t in tasks:
+                t.cancel()
+
+    media_type = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    return StreamingResponse(gen(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
+async def _run_job(job_id: str, req: AnalyzeReq) -> None:
+    """
+    /analyze와 같은 파이프라인을 백그라운드로 실행.
+    영상 하나 끝날 때마다 store에 저장하므로 재시작 후에는 남은 영상만 돈다.
+    먼저 job lease를 잡고(다른 worker가 실행 중이면 그냥 종료), 실행하는 동안 연장.
+    """
+    if not await asyncio.to_thread(job_store.claim, job_id, JOB_WORKER_ID, JOB_LEASE_SEC):
+        _job_tasks.pop(job_id, None)
+        return
+    heartbeat = asyncio.create_task(_renew_job_lease(job_id))
+    try:
+        done = await asyncio.to_thread(job_store.videos, job_id)
+        # DELETE가 먼저 끝난 job은 cancelled 유지 (상태 기록은 모두 compare-and-set)
+        await asyncio.to_thread(job_store.update, job_id, status="running", unless_status=TERMINAL_STATUSES)
+
+        _, tasks, _ = _start_video_tasks(req, skip_indices=set(done))
+        try:
+            for fut in asyncio.as_completed(tasks):
+                v = await fut
+                done[v["index"]] = v
+                await asyncio.to_thread(job_store.put_video, job_id, v["index"], v)
+        finally:
+            for t in tasks:
+                t.cancel()
+
+        videos = [done[k] for k in sorted(done)]
+        channel_profile: Optional[Dict[str, Any]] = None
+        if req.make_channel_profile:
+            channel_profile = await _build_channel_profile(videos, req.structured_output, req.force_refresh)
+
+        await asyncio.to_thread(
+            job_store.update,
+            job_id,
+            status="succeeded",
+            channel_profile=channel_profile,
+            warnings=_build_warnings(videos),
+            unless_status=("cancelled",),
+        )
+    except asyncio.CancelledError:
+        # DELETE면 이미 cancelled로 기록됨, shutdown이면 running 유지(재개 대상)
+        raise
+    except Exception as e:
+        await asyncio.to_thread(job_store.update, job_id, status="failed", error=str(e), unless_status=("cancelled",))
+    finally:
+        heartbeat.cancel()
+        _job_tasks.pop(job_id, None)
+        # shutdown으로 멈춘 job은 다음 기동(다른 인스턴스 포함) 때 lease 만료를 기다리지 않고 재개
+        try:
+            await asyncio.to_thread(job_store.release, job_id, JOB_WORKER_ID)
+        except Exception:
+            pass
+
+
+async def _renew_job_lease(job_id: str) -> None:
+    """lease 연장. 다른 worker에게 넘어갔으면(만료 후 재claim) 이쪽 실행을 멈춘다."""
+    while True:
+        await asyncio.sleep(JOB_LEASE_SEC / 3)
+        try:
+            ok = await asyncio.to_thread(job_store.claim, job_id, JOB_WORKER_ID, JOB_LEASE_SEC)
+        except Exception:
+            continue  # 일시적인 저장소 오류는 다음 주기에 다시
+        if not ok:
+            job = await asyncio.to_thread(job_store.get, job_id)
+            # 방금 이쪽이 끝낸(succeeded/failed) job이 아니면 중단 (다른 worker 소유 또는 cancelled)
+            task = _job_tasks.get(job_id)
+            if task is not None and (job is None or job["status"] not in {"succeeded", "failed"}):
+                task.cancel()
+            return
+
+
+def _spawn_job(job_id: str, req: AnalyzeReq) -> None:
+    _job_tasks[job_id] = asyncio.create_task(_run_job(job_id, req))
+
+
+async def _resume_unfinished_jobs() -> None:
+    """끝나지 않은 job 재개. lease가 살아있는 job(다른 worker가 실행 중)은 _run_job에서 claim 실패로 건너뜀."""
+    now = time.time()
+    for job in await asyncio.to_thread(job_store.list_unfinished):
+        if job.get("owner") and (job.get("lease_until") or 0) >= now:
+            continue
+        try:
+            req = AnalyzeReq(**job["request"])
+        except Exception as e:
+            await asyncio.to_thread(job_store.update, job["job_id"], status="failed", error=f"Invalid stored request: {e}")
+            continue
+        _spawn_job(job["job_id"], req)
+
+
+def _job_view(job: Dict[str, Any], videos: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "ok": True,
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "total": job["total"],
+        "completed": len(videos),
+        "videos": [videos[k] for k in sorted(videos)],
+        "channelProfile": job.get("channel_profile"),
+        "warnings": job.get("warnings"),
+        "error": job.get("error"),
+    }
+
+
+@app.post("/webhooks/apify")
+async def apify_webhook(request: Request, secret: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Apify ad-hoc webhook 수신 (APIFY_WEBHOOK_BASE_URL 설정 시 converter run에 자동 등록).
+    payload.resource.id의 run을 기다리는 polling을 즉시 깨운다. 상태 확인은 polling이 직접 함.
+    """
+    if not run_tracker.check_secret(secret):
+        raise HTTPException(403, "invalid webhook secret")
+    try:
+        body = await request.json()
+    except Exception:
+        raise HTTPException(400, "Invalid JSON body")
+
+    if not isinstance(body, dict):
+        raise HTTPException(400, "Body must be a JSON object")
+
+    resource = body.get("resource") or {}
+    run_id = resource.get("id") or (body.get("eventData") or {}).get("actorRunId")
+    if not run_id:
+        raise HTTPException(400, "webhook payload missing run id")
+
+    return {"ok": True, "run_id": run_id, "waiting": run_tracker.notify(run_id)}
+
+
+async def _read_analyze_req(request: Request) -> AnalyzeReq:
     try:
         body = await request.json()
     except Exception:
@@ -396,13 +1525,96 @@ async def analyze_and_profile(request: Request) -> Dict[str, Any]:
         body["languages"] = body.get("languages_priority")
 
     try:
-        req = AnalyzeReq(**body)
+        return AnalyzeReq(**body)
     except Exception as e:
         raise HTTPException(422, f"Invalid request schema: {str(e)}")
 
+
+@app.post("/analyze_and_profile")
+async def analyze_and_profile(request: Request) -> Dict[str, Any]:
+    req = await _read_analyze_req(request)
     return await _analyze_impl(req)
 
 
+@app.post("/analyze_and_profile/stream")
+async def analyze_and_profile_stream(request: Request, format: Optional[str] = None) -> StreamingResponse:
+    """
+    format=ndjson(기본) | sse
+    format이 없고 Accept: text/event-stream이면 SSE.
+    """
+    fmt = (format or "").strip().lower()
+    if not fmt:
+        fmt = "sse" if "text/event-stream" in (request.headers.get("accept") or "") else "ndjson"
+    if fmt not in {"ndjson", "sse"}:
+        raise HTTPException(400, "format must be ndjson or sse")
+
+    req = await _read_analyze_req(request)
+    return await _analyze_stream(req, fmt)
+
+
 @app.post("/analyze")
 async def analyze(request: Request) -> Dict[str, Any]:
     return await analyze_and_profile(request)
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: Request) -> Dict[str, Any]:
+    """대용량 배치용: job ID를 바로 돌려주고 백그라운드에서 실행."""
+    req = await _read_analyze_req(request)
+    groups = group_urls_by_video(req.urls)
+    if not groups:
+        raise HTTPException(400, "urls is empty")
+
+    job = await asyncio.to_thread(job_store.create, req.model_dump(), len(groups))
+    _spawn_job(job["job_id"], req)
+    return {"ok": True, "job_id": job["job_id"], "status": job["status"], "total": job["total"]}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(404, "job not found")
+    videos = await asyncio.to_thread(job_store.videos, job_id)
+    return _job_view(job, videos)
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str) -> Dict[str, Any]:
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(404, "job not found")
+
+    if job["status"] not in TERMINAL_STATUSES:
+        await asyncio.to_thread(job_store.update, job_id, status="cancelled", unless_status=TERMINAL_STATUSES)
+        task = _job_tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+
+    job = await asyncio.to_thread(job_store.get, job_id)
+    videos = await asyncio.to_thread(job_store.videos, job_id)
+    return _job_view(job, videos)
+
+
+@app.get("/channels/{channel}/profile")
+async def get_channel_profile(
+    channel: str,
+    structured_output: bool = GEMINI_STRUCTURED_OUTPUT,
+    force_refresh: bool = False,
+) -> Dict[str, Any]:
+    """
+    저장된 DNA 기준 채널 프로필. 마지막 계산 이후 분석된 영상이 있으면 그 자리에서 갱신.
+    channel: 영상 메타의 채널 이름 (대소문자/공백 차이 무시)
+    force_refresh: 저장된 프로필을 버리고 전체 재계산
+    """
+    dna = await asyncio.to_thread(channel_store.dna, channel)
+    if not dna:
+        raise HTTPException(404, "channel not found")
+
+    profile = await _update_channel_profile(channel, structured_output, force_refresh)
+    return {
+        "ok": True,
+        "channel": channel,
+        "videos": [{"video_id": vid, "title": item["meta"].get("title", "")} for vid, item in dna.items()],
+        "channelProfile": profile,
+    }
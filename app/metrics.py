@@ -0,0 +1,174 @@
+# app/metrics.py
+"""
+프로세스 내 간단한 지표 모음 (/stats, /metrics에서 조회).
+- counter: incr("gemini_json_repair_total", mode="structured")
+- histogram: observe("stage_duration_seconds", 1.2, stage="gemini_stt") / with timed("gemini_stt"): ...
+- 현재값(in-flight, queue depth, cache hit rate 등)은 register_collector로 조회 시점에 계산
+labels는 키워드 인자로.
+
+영상 단위 timings: start_timings()로 현재 context에 dict를 걸어두면
+그 안(하위 task 포함)의 timed()/add_timing()이 단계별 소요 시간(ms)을 누적.
+"""
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# 초 단위 기본 bucket (Apify run/STT처럼 수 분 걸리는 단계까지)
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BYTES_BUCKETS: Tuple[float, ...] = tuple(float(2 ** p) for p in range(16, 30, 2))  # 64KiB ~ 256MiB
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[LabelKey, float]] = {}
+# name -> (buckets, {labels: [bucket별 count..., +Inf count, sum]})
+_histograms: Dict[str, Tuple[Tuple[float, ...], Dict[LabelKey, List[float]]]] = {}
+# name -> (type, fn() -> [(labels, value)])
+_collectors: Dict[str, Tuple[str, Callable[[], List[Tuple[Dict[str, Any], float]]]]] = {}
+
+_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("metrics_timings", default=None)
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def incr(name: str, value: float = 1, **labels: Any) -> None:
+    key = _label_key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+
+
+def get(name: str, **labels: Any) -> float:
+    """labels 조건에 맞는 시리즈 합계 (labels 생략 시 전체 합)."""
+    want = _label_key(labels)
+    with _lock:
+        series = _counters.get(name) or {}
+        return sum(v for k, v in series.items() if set(want) <= set(k))
+
+
+def observe(name: str, value: float, *, buckets: Sequence[float] = DEFAULT_BUCKETS, **labels: Any) -> None:
+    """histogram에 값 하나 기록. bucket 경계는 이름별로 처음 기록할 때 고정."""
+    key = _label_key(labels)
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = (tuple(sorted(buckets)), {})
+            _histograms[name] = hist
+        bounds, series = hist
+        row = series.get(key)
+        if row is None:
+            row = [0.0] * (len(bounds) + 2)
+            series[key] = row
+        for i, b in enumerate(bounds):
+            if value <= b:
+                row[i] += 1
+                break
+        else:
+            row[len(bounds)] += 1
+        row[-1] += value
+
+
+def register_collector(
+    name: str,
+    fn: Callable[[], List[Tuple[Dict[str, Any], float]]],
+    kind: str = "gauge",
+) -> None:
+    """조회 시점에 값을 계산하는 지표 (kind: gauge/counter). 같은 이름이면 교체."""
+    with _lock:
+        _collectors[name] = (kind, fn)
+
+
+def start_timings() -> Dict[str, float]:
+    """현재 context에 영상 단위 timings dict를 건다 (하위 task도 같은 dict에 누적)."""
+    timings: Dict[str, float] = {}
+    _timings.set(timings)
+    return timings
+
+
+def add_timing(key: str, seconds: float) -> None:
+    timings = _timings.get()
+    if timings is not None:
+        timings[key] = round(timings.get(key, 0.0) + seconds * 1000, 1)
+
+
+@contextmanager
+def timed(stage: str, *, timing_key: Optional[str] = None, **labels: Any) -> Iterator[None]:
+    """
+    블록 소요 시간 -> stage_duration_seconds{stage, outcome, ...labels} + 현재 영상 timings[timing_key or stage].
+    """
+    t0 = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - t0
+        observe("stage_duration_seconds", elapsed, stage=stage, outcome=outcome, **labels)
+        add_timing(timing_key or stage, elapsed)
+
+
+# ---------------------------------------------------------------------------
+# Prometheus text exposition (0.0.4)
+# ---------------------------------------------------------------------------
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    with _lock:
+        counters = {name: dict(series) for name, series in _counters.items()}
+        histograms = {name: (bounds, {k: list(r) for k, r in series.items()}) for name, (bounds, series) in _histograms.items()}
+        collectors = dict(_collectors)
+
+    for name in sorted(counters):
+        lines.append(f"# TYPE {name} counter")
+        for key, v in sorted(counters[name].items()):
+            lines.append(f"{name}{_fmt_labels(key)} {_fmt_value(v)}")
+
+    for name in sorted(histograms):
+        bounds, series = histograms[name]
+        lines.append(f"# TYPE {name} histogram")
+        for key, row in sorted(series.items()):
+            cum = 0.0
+            for b, n in zip(bounds, row):
+                cum += n
+                lines.append(f"{name}_bucket{_fmt_labels(key, (('le', _fmt_value(b)),))} {_fmt_value(cum)}")
+            cum += row[len(bounds)]
+            lines.append(f"{name}_bucket{_fmt_labels(key, (('le', '+Inf'),))} {_fmt_value(cum)}")
+            lines.append(f"{name}_sum{_fmt_labels(key)} {_fmt_value(row[-1])}")
+            lines.append(f"{name}_count{_fmt_labels(key)} {_fmt_value(cum)}")
+
+    for name in sorted(collectors):
+        kind, fn = collectors[name]
+        try:
+            samples = fn()
+        except Exception:
+            continue
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, v in samples:
+            lines.append(f"{name}{_fmt_labels(_label_key(labels))} {_fmt_value(v)}")
+
+    return "\n".join(lines) + "\n"
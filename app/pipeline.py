@@ -0,0 +1,185 @@
+# app/pipeline.py
+"""
+영상 처리 단계 파이프라인.
+- 단계(Stage)마다 크기 제한 queue + 고정 수 worker -> 단계끼리 영상 단위로 겹쳐 실행
+  (한 영상이 Gemini 분석을 기다리는 동안 다른 영상의 Apify fetch가 진행)
+- 단계 함수는 state dict를 받아 다음 단계 이름(끝이면 None)을 돌려준다
+- 다음 queue가 차 있으면 put에서 기다림 (backpressure). 단계는 앞으로만 진행하므로 교착 없음
+- 항목은 제출 시점 contextvars(context)를 그대로 들고 다님 (scheduler flow / 재시도 deadline)
+- 처리 중 항목이 없어지면 worker는 스스로 종료
+
+stats(): 단계별 workers / busy / queue_depth / processed / utilization(바쁜 시간 비율)
+/metrics: pipeline_stage_seconds / pipeline_queue_wait_seconds histogram + 단계별 busy/queue depth gauge
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app import metrics
+
+StageFn = Callable[[Dict[str, Any]], Awaitable[Optional[str]]]
+
+# 진행 중인 파이프라인 (/stats 집계용)
+_live: "weakref.WeakSet[Pipeline]" = weakref.WeakSet()
+
+
+class _Item:
+    __slots__ = ("state", "context", "fut", "task", "enqueued_at")
+
+    def __init__(self, state: Dict[str, Any], context: contextvars.Context, fut: "asyncio.Future[Dict[str, Any]]"):
+        self.state = state
+        self.context = context
+        self.fut = fut
+        self.task: Optional["asyncio.Future[Optional[str]]"] = None
+        self.enqueued_at = time.monotonic()
+
+
+class Stage:
+    def __init__(self, name: str, fn: StageFn, *, workers: int, queue_size: int = 0):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.queue: "asyncio.Queue[_Item]" = asyncio.Queue(maxsize=max(queue_size, self.workers))
+        self.busy = 0
+        self.busy_sec = 0.0
+        self.wait_sec = 0.0
+        self.processed = 0
+        self.failed = 0
+
+    def stats(self, elapsed_sec: float) -> Dict[str, Any]:
+        capacity = self.workers * elapsed_sec
+        return {
+            "workers": self.workers,
+            "busy": self.busy,
+            "queue_depth": self.queue.qsize(),
+            "queue_max": self.queue.maxsize,
+            "processed": self.processed,
+            "failed": self.failed,
+            "queue_wait_avg_sec": round(self.wait_sec / self.processed, 4) if self.processed else 0.0,
+            "utilization": round(min(self.busy_sec / capacity, 1.0), 4) if capacity > 0 else 0.0,
+        }
+
+
+class Pipeline:
+    def __init__(self, name: str, stages: List[Stage]):
+        self.name = name
+        self.stages = {s.name: s for s in stages}
+        self.first = stages[0].name
+        self.started_at = time.monotonic()
+        self._pending = 0
+        self._closed = False
+        self._workers: List["asyncio.Task[None]"] = []
+
+    async def run(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """state를 첫 단계에 넣고 마지막 단계가 끝난 state를 돌려준다. 취소되면 진행 중인 단계 작업도 취소."""
+        if not self._workers:
+            self._start()
+        loop = asyncio.get_running_loop()
+        item = _Item(state, contextvars.copy_context(), loop.create_future())
+        self._pending += 1
+        try:
+            await self.stages[self.first].queue.put(item)
+            return await asyncio.shield(item.fut)
+        except asyncio.CancelledError:
+            item.fut.cancel()
+            if item.task is not None:
+                item.task.cancel()
+            raise
+        finally:
+            self._pending -= 1
+            if self._pending == 0:
+                self.close()
+
+    def _start(self) -> None:
+        self._closed = False
+        _live.add(self)
+        for stage in self.stages.values():
+            for _ in range(stage.workers):
+                self._workers.append(asyncio.ensure_future(self._worker(stage)))
+
+    def close(self) -> None:
+        self._closed = True
+        for w in self._workers:
+            w.cancel()
+        self._workers = []
+        _live.discard(self)
+
+    async def _worker(self, stage: Stage) -> None:
+        while True:
+            item = await stage.queue.get()
+            if item.fut.done():
+                continue  # 기다리던 호출자가 취소됨
+
+            waited = time.monotonic() - item.enqueued_at
+            stage.wait_sec += waited
+            stage.busy += 1
+            t0 = time.monotonic()
+            try:
+                # 항목의 context 안에서 task 생성 -> flow/deadline contextvar 유지
+                item.task = item.context.run(asyncio.ensure_future, stage.fn(item.state))
+                nxt = await item.task
+            except asyncio.CancelledError:
+                if self._closed:
+                    raise
+                continue  # 이 항목만 취소됨 (run()에서 task.cancel)
+            except Exception as e:
+                stage.failed += 1
+                if not item.fut.done():
+                    item.fut.set_exception(e)
+                    item.fut.exception()  # 호출자가 먼저 취소된 경우 경고 방지
+                continue
+            finally:
+                busy = time.monotonic() - t0
+                stage.busy -= 1
+                stage.busy_sec += busy
+                stage.processed += 1
+                item.task = None
+                metrics.observe("pipeline_stage_seconds", busy, stage=stage.name)
+                metrics.observe("pipeline_queue_wait_seconds", waited, stage=stage.name)
+                # 영상 timings는 항목 context의 dict에 누적
+                item.context.run(metrics.add_timing, stage.name, busy)
+
+            if nxt is None:
+                if not item.fut.done():
+                    item.fut.set_result(item.state)
+                continue
+            item.enqueued_at = time.monotonic()
+            await self.stages[nxt].queue.put(item)
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "elapsed_sec": round(elapsed, 3),
+            "pending": self._pending,
+            "stages": {name: s.stats(elapsed) for name, s in self.stages.items()},
+        }
+
+
+def _stage_gauge(field: str) -> List[Tuple[Dict[str, Any], float]]:
+    stages = live_stats()["stages"]
+    return [({"stage": name}, agg[field]) for name, agg in sorted(stages.items())]
+
+
+metrics.register_collector("pipeline_stage_busy", lambda: _stage_gauge("busy"))
+metrics.register_collector("pipeline_stage_queue_depth", lambda: _stage_gauge("queue_depth"))
+metrics.register_collector("pipeline_stage_workers", lambda: _stage_gauge("workers"))
+metrics.register_collector(
+    "pipeline_videos_in_flight", lambda: [({}, float(sum(p._pending for p in list(_live))))]
+)
+
+
+def live_stats() -> Dict[str, Any]:
+    """진행 중인 파이프라인 전체의 단계별 합계 (workers / busy / queue_depth)."""
+    out: Dict[str, Dict[str, int]] = {}
+    pipelines = list(_live)
+    for p in pipelines:
+        for name, s in p.stages.items():
+            agg = out.setdefault(name, {"workers": 0, "busy": 0, "queue_depth": 0})
+            agg["workers"] += s.workers
+            agg["busy"] += s.busy
+            agg["queue_depth"] += s.queue.qsize()
+    return {"pipelines": len(pipelines), "stages": out}
@@ -0,0 +1,225 @@
+# app/quotes.py
+"""
+영상 분석 결과 인용(quotes.items[].text) 로컬 검증.
+- transcript마다 QuoteIndex 한 번 생성: 정규화 텍스트(글자/숫자만, 소문자) + 원문 offset 매핑
+- 찾기 순서: 원문 그대로 -> 정규화(공백/기호 무시) -> 3-gram 투표 후보 구간 fuzzy 비교
+- 찾은 인용에는 원문 char 범위/일치 방식/점수를 붙이고, 못 찾은 인용은 버리거나 표시
+n-gram 색인은 fuzzy 단계가 처음 필요할 때만 만든다.
+"""
+from __future__ import annotations
+
+import bisect
+import os
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+QUOTE_FUZZY_MIN_SCORE = float(os.getenv("QUOTE_FUZZY_MIN_SCORE", "0.8"))
+
+_NGRAM = 3
+# 너무 흔한 n-gram은 후보 투표에서 제외 (조사/어미 등)
+_MAX_POSTINGS = 256
+_MAX_PROBES = 24
+_KEEP_RE = re.compile(r"[^\W_]+")
+
+
+def _normalize(text: str) -> Tuple[str, List[int], List[int]]:
+    """
+    글자/숫자만 남긴 소문자 문자열 + 원문 위치 매핑.
+    매핑은 글자마다가 아니라 연속 구간(단어)마다: (정규화 시작 위치 목록, 원문 시작 위치 목록)
+    """
+    parts: List[str] = []
+    norm_starts: List[int] = []
+    orig_starts: List[int] = []
+    n = 0
+    for m in _KEEP_RE.finditer(text):
+        w = m.group()
+        parts.append(w)
+        norm_starts.append(n)
+        orig_starts.append(m.start())
+        n += len(w)
+    norm = "".join(parts)
+    low = norm.lower()
+    return (low if len(low) == len(norm) else norm), norm_starts, orig_starts
+
+
+class QuoteIndex:
+    __slots__ = ("text", "norm", "_norm_starts", "_orig_starts", "_grams", "_hits")
+
+    def __init__(self, text: str):
+        self.text = text or ""
+        self.norm, self._norm_starts, self._orig_starts = _normalize(self.text)
+        self._grams: Optional[Dict[str, List[int]]] = None
+        # 같은 인용을 검증/시각 채우기에서 다시 찾지 않도록
+        self._hits: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def _ngram_index(self) -> Dict[str, List[int]]:
+        if self._grams is None:
+            grams: Dict[str, List[int]] = defaultdict(list)
+            norm = self.norm
+            for i in range(len(norm) - _NGRAM + 1):
+                grams[norm[i:i + _NGRAM]].append(i)
+            self._grams = grams
+        return self._grams
+
+    def _orig(self, pos: int) -> int:
+        i = bisect.bisect_right(self._norm_starts, pos) - 1
+        return self._orig_starts[i] + (pos - self._norm_starts[i])
+
+    def _span(self, start: int, end: int) -> Tuple[int, int]:
+        """정규화 범위 [start, end) -> 원문 범위."""
+        return self._orig(start), self._orig(end - 1) + 1
+
+    def _fuzzy(self, q: str) -> Optional[Tuple[int, int, float]]:
+        grams = self._ngram_index()
+        n_probes = len(q) - _NGRAM + 1
+        step = max(1, n_probes // _MAX_PROBES)
+        votes: Dict[int, int] = defaultdict(int)
+        for k in range(0, n_probes, step):
+            postings = grams.get(q[k:k + _NGRAM])
+            if not postings or len(postings) > _MAX_POSTINGS:
+                continue
+            for p in postings:
+                votes[(p - k) // 4] += 1
+        if not votes:
+            return None
+
+        best: Optional[Tuple[int, int, float]] = None
+        slack = max(len(q) // 5, 4)
+        for bucket, _ in sorted(votes.items(), key=lambda kv: -kv[1])[:3]:
+            lo = max(bucket * 4 - slack, 0)
+            window = self.norm[lo:lo + len(q) + 2 * slack]
+            sm = SequenceMatcher(None, q, window, autojunk=False)
+            blocks = [b for b in sm.get_matching_blocks() if b.size]
+            if not blocks:
+                continue
+            score = sum(b.size for b in blocks) / len(q)
+            if best is None or score > best[2]:
+                start = lo + blocks[0].b
+                end = lo + blocks[-1].b + blocks[-1].size
+                best = (start, end, score)
+        return best
+
+    def locate(self, quote: str) -> Optional[Dict[str, Any]]:
+        """
+        인용 위치. {"char_start", "char_end", "kind": exact|normalized|fuzzy, "score"} 또는 None.
+        fuzzy는 QUOTE_FUZZY_MIN_SCORE 이상일 때만.
+        """
+        quote = (quote or "").strip()
+        if not quote or not self.text:
+            return None
+        if quote not in self._hits:
+            self._hits[quote] = self._locate(quote)
+        hit = self._hits[quote]
+        return dict(hit) if hit is not None else None
+
+    def _locate(self, quote: str) -> Optional[Dict[str, Any]]:
+        pos = self.text.find(quote)
+        if pos >= 0:
+            return {"char_start": pos, "char_end": pos + len(quote), "kind": "exact", "score": 1.0}
+
+        q = _normalize(quote)[0]
+        if not q:
+            return None
+        pos = self.norm.find(q)
+        if pos >= 0:
+            start, end = self._span(pos, pos + len(q))
+            return {"char_start": start, "char_end": end, "kind": "normalized", "score": 1.0}
+
+        if len(q) < _NGRAM * 2:
+            return None
+        hit = self._fuzzy(q)
+        if hit is None or hit[2] < QUOTE_FUZZY_MIN_SCORE:
+            return None
+        start, end = self._span(hit[0], hit[1])
+        return {"char_start": start, "char_end": end, "kind": "fuzzy", "score": round(hit[2], 3)}
+
+
+def _quote_items(parsed: Dict[str, Any]) -> Optional[List[Any]]:
+    quotes = parsed.get("quotes")
+    items = quotes.get("items") if isinstance(quotes, dict) else None
+    return items if isinstance(items, list) else None
+
+
+def _quote_text(item: Any) -> Tuple[bool, Optional[str]]:
+    """
+    (검증 대상 여부, 인용 문자열). dict가 아니거나 text가 없/빈 항목은 대상 아님.
+    text가 문자열이 아니면(자유 출력의 숫자/배열 등) 대상이지만 문자열은 None -> 미검증.
+    """
+    if not isinstance(item, dict):
+        return False, None
+    text = item.get("text")
+    if text is None or (isinstance(text, str) and not text.strip()):
+        return False, None
+    return True, text if isinstance(text, str) else None
+
+
+def verify_quotes(parsed: Dict[str, Any], index: QuoteIndex, mode: str = "drop") -> Dict[str, int]:
+    """
+    parsed(videoAnalysis JSON)의 인용을 index 원문과 대조.
+    - 찾은 인용: item["match"] = locate 결과
+    - 못 찾은 인용(text가 문자열이 아닌 항목 포함): mode=drop이면 목록에서 제거, flag면 item["match"] = {"kind": "none"}
+    집계 반환: total / exact / normalized / fuzzy / unverified / dropped
+    """
+    report = {"total": 0, "exact": 0, "normalized": 0, "fuzzy": 0, "unverified": 0, "dropped": 0}
+    items = _quote_items(parsed)
+    if not items:
+        return report
+
+    kept: List[Any] = []
+    for item in items:
+        checkable, text = _quote_text(item)
+        if not checkable:
+            kept.append(item)
+            continue
+        report["total"] += 1
+        hit = index.locate(text) if text is not None else None
+        if hit is not None:
+            report[hit["kind"]] += 1
+            item["match"] = hit
+            kept.append(item)
+            continue
+        report["unverified"] += 1
+        if mode == "drop":
+            report["dropped"] += 1
+            continue
+        item["match"] = {"kind": "none"}
+        kept.append(item)
+
+    parsed["quotes"]["items"] = kept
+    return report
+
+
+def fill_quote_times(
+    parsed: Dict[str, Any],
+    index: QuoteIndex,
+    time_at: Callable[[int], Optional[float]],
+) -> int:
+    """
+    quotes.items[].evidence.approx_start_sec를 index 원문 안 인용 위치 -> time_at(offset)으로 채운다.
+    이미 0이 아닌 값은 유지. 채운 개수 반환.
+    """
+    items = _quote_items(parsed)
+    if not items:
+        return 0
+
+    filled = 0
+    for item in items:
+        _, text = _quote_text(item)
+        if text is None:
+            continue
+        evidence = item.get("evidence")
+        if not isinstance(evidence, dict):
+            evidence = {}
+            item["evidence"] = evidence
+        if evidence.get("approx_start_sec"):
+            continue
+        hit = index.locate(text)
+        if hit is None:
+            continue
+        sec = time_at(hit["char_start"])
+        if sec is not None:
+            evidence["approx_start_sec"] = sec
+            filled += 1
+    return filled
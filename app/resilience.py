@@ -0,0 +1,211 @@
+# app/resilience.py
+"""
+Apify / Gemini 호출 공용 재시도 + circuit breaker.
+- 에러 분류: retryable(일시 장애) / quota(429) / permanent(나머지)
+- retryable/quota만 jitter 지수 backoff로 재시도, 영상별 deadline 예산 안에서만
+- upstream별 breaker: 연속 실패가 쌓이면 open -> reset 시간 동안 즉시 실패,
+  이후 half_open에서 probe 1건 성공하면 closed
+- breaker 상태는 /health에서 조회
+
+재시도 대기 중에는 scheduler 슬롯을 잡지 않도록 fn 안에서 slot을 잡을 것.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+from google.genai import errors as genai_errors
+
+from app import metrics
+from app.apify_client import ApifyError
+
+T = TypeVar("T")
+
+RETRYABLE = "retryable"
+QUOTA = "quota"
+PERMANENT = "permanent"
+
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_SEC = float(os.getenv("RETRY_BASE_SEC", "1"))
+RETRY_MAX_SEC = float(os.getenv("RETRY_MAX_SEC", "20"))
+# 429는 더 길게 쉰다
+RETRY_QUOTA_BASE_SEC = float(os.getenv("RETRY_QUOTA_BASE_SEC", "5"))
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SEC = float(os.getenv("BREAKER_RESET_SEC", "30"))
+
+# 영상 하나에 쓸 수 있는 전체 시간 (monotonic 절대 시각). 0이면 제한 없음
+_deadline: contextvars.ContextVar[float] = contextvars.ContextVar("resilience_deadline", default=0.0)
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, upstream: str, retry_in_sec: float):
+        super().__init__(f"{upstream} circuit open (retry in {retry_in_sec:.0f}s)")
+        self.upstream = upstream
+
+
+def start_deadline(budget_sec: float) -> None:
+    """현재 context(영상 task)의 재시도 예산 시작. 하위 task들이 상속."""
+    _deadline.set(time.monotonic() + budget_sec if budget_sec > 0 else 0.0)
+
+
+def remaining_sec() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if not deadline else deadline - time.monotonic()
+
+
+def _classify_status(code: Optional[int]) -> str:
+    if code is None:
+        return PERMANENT
+    if code == 429:
+        return QUOTA
+    if code in (408, 409) or code >= 500:
+        return RETRYABLE
+    return PERMANENT
+
+
+def upstream_status(exc: BaseException) -> Optional[int]:
+    """upstream이 HTTP 에러로 응답한 경우 그 status code. 로컬 예외/전송 실패면 None."""
+    if isinstance(exc, ApifyError):
+        return exc.status_code
+    if isinstance(exc, genai_errors.APIError):
+        return exc.code
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code
+    return None
+
+
+def classify(exc: BaseException) -> str:
+    if isinstance(exc, CircuitOpenError):
+        return PERMANENT
+    if isinstance(exc, (ApifyError, genai_errors.APIError, httpx.HTTPStatusError)):
+        return _classify_status(upstream_status(exc))
+    if isinstance(exc, (httpx.TimeoutException, httpx.TransportError, asyncio.TimeoutError, ConnectionError)):
+        return RETRYABLE
+    return PERMANENT
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, *, failure_threshold: int, reset_sec: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_sec = reset_sec
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened_total = 0
+        self._probe_in_flight = False
+
+    def before_call(self) -> bool:
+        """호출 허용 여부 확인. open이면 CircuitOpenError, half_open probe면 True 반환."""
+        if self.state == "closed":
+            return False
+        elapsed = time.monotonic() - self.opened_at
+        if self.state == "open" and elapsed >= self.reset_sec:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        metrics.incr("upstream_circuit_rejected_total", upstream=self.name)
+        raise CircuitOpenError(self.name, max(self.reset_sec - elapsed, 0.0))
+
+    def on_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+
+    def on_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened_total += 1
+                metrics.incr("upstream_circuit_opened_total", upstream=self.name)
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def end_probe(self) -> None:
+        self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened_total": self.opened_total,
+        }
+        if self.state == "open":
+            out["retry_in_sec"] = round(max(self.reset_sec - (time.monotonic() - self.opened_at), 0.0), 1)
+        return out
+
+
+_breakers: Dict[str, CircuitBreaker] = {
+    name: CircuitBreaker(name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_sec=BREAKER_RESET_SEC)
+    for name in ("apify", "gemini_text", "gemini_audio")
+}
+metrics.register_collector(
+    "circuit_open", lambda: [({"upstream": n}, 1.0 if b.state == "open" else 0.0) for n, b in _breakers.items()]
+)
+
+
+def breaker(upstream: str) -> CircuitBreaker:
+    return _breakers[upstream]
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    return {name: b.stats() for name, b in _breakers.items()}
+
+
+def _backoff(attempt: int, kind: str) -> float:
+    base = RETRY_QUOTA_BASE_SEC if kind == QUOTA else RETRY_BASE_SEC
+    delay = min(base * (2 ** attempt), RETRY_MAX_SEC)
+    # equal jitter: [delay/2, delay]
+    return delay / 2 + random.random() * delay / 2
+
+
+async def call(
+    upstream: str,
+    fn: Callable[[], Awaitable[T]],
+    *,
+    max_attempts: int = RETRY_MAX_ATTEMPTS,
+) -> T:
+    """
+    fn()을 breaker/재시도 정책 아래 실행.
+    permanent 에러, 시도 횟수 소진, deadline 예산 부족이면 마지막 예외를 그대로 올린다.
+    """
+    b = _breakers[upstream]
+    attempt = 0
+    while True:
+        probe = b.before_call()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            kind = classify(e)
+            if kind != PERMANENT:
+                b.on_failure()
+            elif 400 <= (upstream_status(e) or 0) < 500:
+                # 4xx: upstream은 정상 응답함 (요청 쪽 문제)
+                b.on_success()
+            # 그 외 permanent(로컬 예외, status 없는 ApifyError 등)는 upstream 상태를 알 수 없으므로 breaker 그대로
+            metrics.incr("upstream_errors_total", upstream=upstream, kind=kind)
+
+            attempt += 1
+            if kind == PERMANENT or attempt >= max_attempts:
+                raise
+            delay = _backoff(attempt - 1, kind)
+            left = remaining_sec()
+            if left is not None and left < delay:
+                metrics.incr("upstream_retry_budget_exhausted_total", upstream=upstream)
+                raise
+            metrics.incr("upstream_retries_total", upstream=upstream, kind=kind)
+            await asyncio.sleep(delay)
+        else:
+            b.on_success()
+            return result
+        finally:
+            if probe:
+                b.end_probe()
@@ -0,0 +1,244 @@
+# app/scheduler.py
+"""
+프로세스 전역 upstream 스케줄러.
+- upstream(apify / gemini_text / gemini_audio)마다 동시 실행 상한 + token bucket(RPM, TPM)
+- 대기열은 요청(flow)별로 나누고 round-robin으로 꺼냄 -> 큰 배치 하나가 작은 요청을 굶기지 않음
+- flow별 동시 실행 상한(AnalyzeReq.concurrency)도 여기서 적용
+- queue depth / 대기 시간 / in-flight를 stats()로 노출
+
+flow는 contextvar로 전달: 요청 진입점에서 set_flow() 하면 그 안에서 만든 task들이 상속.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+from app import metrics
+from app.gemini_client import get_model
+
+# (flow_id, flow별 동시 실행 상한)
+_current_flow: contextvars.ContextVar[Tuple[str, int]] = contextvars.ContextVar(
+    "scheduler_flow", default=("default", 0)
+)
+
+
+def set_flow(limit: int = 0, flow_id: Optional[str] = None) -> str:
+    """현재 context를 새 flow로 지정. limit=0이면 flow별 상한 없음."""
+    flow_id = flow_id or uuid.uuid4().hex[:12]
+    _current_flow.set((flow_id, limit))
+    return flow_id
+
+
+class TokenBucket:
+    """rate_per_sec로 채워지고 capacity까지 쌓이는 버킷. rate<=0이면 무제한."""
+
+    def __init__(self, rate_per_sec: float, capacity: float):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost: float) -> float:
+        """지금 cost를 꺼낼 수 있으면 0, 아니면 필요한 대기 초."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(time.monotonic())
+        cost = min(cost, self.capacity)
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def take(self, cost: float) -> None:
+        if self.rate > 0:
+            self.tokens -= min(cost, self.capacity)
+
+
+class _Waiter:
+    __slots__ = ("fut", "tokens", "enqueued_at")
+
+    def __init__(self, fut: "asyncio.Future[None]", tokens: float):
+        self.fut = fut
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+
+
+class FairLimiter:
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_concurrency: int,
+        requests_per_min: float = 0,
+        tokens_per_min: float = 0,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.rpm = TokenBucket(requests_per_min / 60, max(requests_per_min / 6, 1))
+        self.tpm = TokenBucket(tokens_per_min / 60, max(tokens_per_min / 6, 1))
+        self.in_flight = 0
+        self._flow_in_flight: Dict[str, int] = {}
+        self._flow_limits: Dict[str, int] = {}
+        self._queues: Dict[str, Deque[_Waiter]] = {}
+        self._rr: Deque[str] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # 통계
+        self.granted = 0
+        self.wait_total_sec = 0.0
+        self.wait_max_sec = 0.0
+
+    def queue_depth(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def _flow_has_room(self, flow: str) -> bool:
+        limit = self._flow_limits.get(flow) or 0
+        return not limit or self._flow_in_flight.get(flow, 0) < limit
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        while self.in_flight < self.max_concurrency and self._rr:
+            picked: Optional[str] = None
+            for _ in range(len(self._rr)):
+                flow = self._rr[0]
+                self._rr.rotate(-1)
+                if self._queues.get(flow) and self._flow_has_room(flow):
+                    picked = flow
+                    break
+            if picked is None:
+                return
+
+            waiter = self._queues[picked][0]
+            delay = max(self.rpm.wait_time(1), self.tpm.wait_time(waiter.tokens))
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+
+            self._queues[picked].popleft()
+            self._drop_flow_if_idle(picked)
+            self.rpm.take(1)
+            self.tpm.take(waiter.tokens)
+            self.in_flight += 1
+            self._flow_in_flight[picked] = self._flow_in_flight.get(picked, 0) + 1
+
+            waited = time.monotonic() - waiter.enqueued_at
+            self.granted += 1
+            self.wait_total_sec += waited
+            self.wait_max_sec = max(self.wait_max_sec, waited)
+            metrics.incr("scheduler_granted_total", upstream=self.name)
+            metrics.incr("scheduler_wait_seconds_total", waited, upstream=self.name)
+            waiter.fut.set_result(None)
+
+    def _drop_flow_if_idle(self, flow: str) -> None:
+        if not self._queues.get(flow):
+            self._queues.pop(flow, None)
+            if flow in self._rr:
+                self._rr.remove(flow)
+
+    def _release(self, flow: str) -> None:
+        self.in_flight -= 1
+        left = self._flow_in_flight.get(flow, 1) - 1
+        if left > 0:
+            self._flow_in_flight[flow] = left
+        else:
+            self._flow_in_flight.pop(flow, None)
+            if flow not in self._queues:
+                self._flow_limits.pop(flow, None)
+        if self._timer is None:
+            self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, tokens: float = 0) -> AsyncIterator[None]:
+        flow, limit = _current_flow.get()
+        self._flow_limits[flow] = limit
+
+        fut: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        waiter = _Waiter(fut, tokens)
+        if flow not in self._queues:
+            self._queues[flow] = deque()
+            self._rr.append(flow)
+        self._queues[flow].append(waiter)
+        if self._timer is None:
+            self._dispatch()
+
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release(flow)
+            else:
+                q = self._queues.get(flow)
+                if q and waiter in q:
+                    q.remove(waiter)
+                    self._drop_flow_if_idle(flow)
+            raise
+
+        try:
+            yield
+        finally:
+            self._release(flow)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth(),
+            "queued_flows": len(self._queues),
+            "granted": self.granted,
+            "wait_avg_sec": round(self.wait_total_sec / self.granted, 4) if self.granted else 0.0,
+            "wait_max_sec": round(self.wait_max_sec, 4),
+        }
+
+
+def _env_num(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+_limiters: Dict[str, FairLimiter] = {
+    # Apify actor run (transcript/converter 시작, polling/다운로드는 제외)
+    "apify": FairLimiter(
+        "apify",
+        max_concurrency=int(_env_num("SCHED_APIFY_MAX_CONCURRENCY", 16)),
+        requests_per_min=_env_num("SCHED_APIFY_RUNS_PER_MIN", 120),
+    ),
+    "gemini_text": FairLimiter(
+        "gemini_text",
+        max_concurrency=get_model("text").max_inflight,
+        requests_per_min=_env_num("SCHED_GEMINI_TEXT_RPM", 600),
+        tokens_per_min=_env_num("SCHED_GEMINI_TEXT_TPM", 2_000_000),
+    ),
+    "gemini_audio": FairLimiter(
+        "gemini_audio",
+        max_concurrency=get_model("audio").max_inflight,
+        requests_per_min=_env_num("SCHED_GEMINI_AUDIO_RPM", 120),
+    ),
+}
+
+
+metrics.register_collector(
+    "scheduler_in_flight", lambda: [({"upstream": n}, lim.in_flight) for n, lim in _limiters.items()]
+)
+metrics.register_collector(
+    "scheduler_queue_depth", lambda: [({"upstream": n}, lim.queue_depth()) for n, lim in _limiters.items()]
+)
+
+
+def limiter(upstream: str) -> FairLimiter:
+    return _limiters[upstream]
+
+
+def slot(upstream: str, tokens: float = 0):
+    """async with slot("gemini_text", tokens=n): ... 형태로 upstream 호출을 감싼다."""
+    return _limiters[upstream].slot(tokens)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {name: lim.stats() for name, lim in _limiters.items()}
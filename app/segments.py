@@ -0,0 +1,138 @@
+# app/segments.py
+"""
+시간 정보가 있는 transcript의 압축 표현.
+- segment dict 목록 대신 텍스트 버퍼 하나 + 병렬 배열(char offset / 시작 초 / 끝 초)
+- char offset -> 시각은 bisect + 세그먼트 안 선형 보간
+Apify transcript 세그먼트와 STT 창(chunks) 모두 같은 방식으로 다룬다.
+"""
+from __future__ import annotations
+
+import bisect
+import re
+from array import array
+from typing import Any, Dict, List, Optional
+
+_START_KEYS = ("start", "startTime", "start_time", "offset", "begin")
+_START_MS_KEYS = ("startMs", "start_ms", "tStartMs", "offsetMs")
+_DUR_KEYS = ("dur", "duration")
+_DUR_MS_KEYS = ("durationMs", "duration_ms", "dDurationMs")
+_END_KEYS = ("end", "endTime", "end_time")
+
+
+def _to_sec(v: Any) -> Optional[float]:
+    """12.5 / "12.5" / "00:01:02.5" / "1:02" -> 초."""
+    if v is None or isinstance(v, bool):
+        return None
+    if isinstance(v, (int, float)):
+        return float(v)
+    s = str(v).strip()
+    if not s:
+        return None
+    try:
+        if ":" in s:
+            sec = 0.0
+            for part in s.split(":"):
+                sec = sec * 60 + float(part)
+            return sec
+        return float(s)
+    except ValueError:
+        return None
+
+
+def _first(seg: Dict[str, Any], keys: tuple, scale: float = 1.0) -> Optional[float]:
+    for k in keys:
+        if k in seg:
+            v = _to_sec(seg[k])
+            if v is not None:
+                return v * scale
+    return None
+
+
+class Segments:
+    __slots__ = ("text", "offsets", "starts", "ends")
+
+    def __init__(self, text: str, offsets: "array[int]", starts: "array[float]", ends: "array[float]"):
+        self.text = text
+        self.offsets = offsets
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @classmethod
+    def from_apify(cls, transcript: Any) -> Optional["Segments"]:
+        """
+        Apify transcript 세그먼트 목록 -> Segments. 시작 시각이 하나도 없으면 None.
+        텍스트는 세그먼트마다 공백 정리 후 줄바꿈으로 이어붙임 (segments_to_text와 같은 모양).
+        """
+        if not isinstance(transcript, list):
+            return None
+
+        parts: List[str] = []
+        offsets = array("l")
+        starts = array("d")
+        ends = array("d")
+        pos = 0
+        for seg in transcript:
+            if not isinstance(seg, dict):
+                continue
+            txt = seg.get("text") or seg.get("caption") or seg.get("value") or ""
+            txt = re.sub(r"\s+", " ", str(txt)).strip()
+            start = _first(seg, _START_KEYS)
+            if start is None:
+                start = _first(seg, _START_MS_KEYS, 0.001)
+            if not txt or start is None:
+                continue
+
+            end = _first(seg, _END_KEYS)
+            if end is None:
+                dur = _first(seg, _DUR_KEYS)
+                if dur is None:
+                    dur = _first(seg, _DUR_MS_KEYS, 0.001)
+                end = start + dur if dur is not None else start
+
+            if parts:
+                pos += 1  # "\n"
+            parts.append(txt)
+            offsets.append(pos)
+            starts.append(start)
+            ends.append(max(end, start))
+            pos += len(txt)
+
+        if not parts:
+            return None
+        # 길이 정보가 없던 세그먼트는 다음 세그먼트 시작까지로
+        for i in range(len(starts) - 1):
+            if ends[i] <= starts[i]:
+                ends[i] = max(starts[i + 1], starts[i])
+        return cls("\n".join(parts), offsets, starts, ends)
+
+    @classmethod
+    def from_chunks(cls, text: str, chunks: List[Dict[str, Any]]) -> Optional["Segments"]:
+        """STT 창 목록({"char_start", "start_sec", "end_sec"}) + 이어붙인 텍스트 -> Segments."""
+        rows = sorted(
+            (c for c in chunks or [] if isinstance(c, dict) and "char_start" in c),
+            key=lambda c: c["char_start"],
+        )
+        if not rows:
+            return None
+        return cls(
+            text,
+            array("l", (int(c["char_start"]) for c in rows)),
+            array("d", (float(c.get("start_sec") or 0.0) for c in rows)),
+            array("d", (float(c.get("end_sec") or c.get("start_sec") or 0.0) for c in rows)),
+        )
+
+    def index_at(self, offset: int) -> int:
+        return max(bisect.bisect_right(self.offsets, offset) - 1, 0)
+
+    def time_at(self, offset: int) -> Optional[float]:
+        """텍스트 char offset -> 대략 시각(초). 세그먼트 안에서는 글자 수 비율로 선형 보간."""
+        if not len(self.offsets) or offset < 0:
+            return None
+        i = self.index_at(offset)
+        seg_start = self.offsets[i]
+        seg_end = self.offsets[i + 1] if i + 1 < len(self.offsets) else len(self.text)
+        frac = min(max((offset - seg_start) / max(seg_end - seg_start, 1), 0.0), 1.0)
+        return round(self.starts[i] + frac * (self.ends[i] - self.starts[i]), 1)
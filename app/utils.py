@@ -1,15 +1,18 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
 import re
+import time
 
 
-def normalize_urls(urls: Any) -> List[str]:
+def split_urls(urls: Any) -> List[str]:
     """
     urls가 아래 형태로 올 수 있음:
     - ["https://...","https://..."]
     - "https://...\nhttps://...\n"
     - " https://... , https://... "
+    http(s)로 시작하는 것만 입력 순서대로 반환 (중복 제거 안 함)
     """
     if urls is None:
         return []
@@ -33,16 +36,100 @@ def normalize_urls(urls: Any) -> List[str]:
         p = p.strip()
         if p.startswith("http://") or p.startswith("https://"):
             cleaned.append(p)
+    return cleaned
 
-    # 중복 제거(순서 유지)
-    seen = set()
-    out = []
-    for u in cleaned:
-        if u in seen:
-            continue
-        seen.add(u)
-        out.append(u)
-    return out
+
+_VIDEO_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_YOUTUBE_HOSTS = {
+    "youtube.com",
+    "m.youtube.com",
+    "music.youtube.com",
+    "gaming.youtube.com",
+    "youtube-nocookie.com",
+}
+# /shorts/ID, /live/ID, /embed/ID, /v/ID, /e/ID
+_PATH_ID_PREFIXES = ("shorts", "live", "embed", "v", "e")
+
+
+def _valid_video_id(s: Optional[str]) -> Optional[str]:
+    if s and _VIDEO_ID_RE.match(s):
+        return s
+    return None
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """
+    YouTube URL에서 11자리 video ID 추출. 못 찾으면 None.
+    지원: watch?v=, youtu.be/ID, /shorts/, /live/, /embed/, /v/, /e/,
+    playlist?list=..&v=ID, attribution_link?u=/watch%3Fv%3DID
+    정규식 하나로 훑지 않고 urlsplit 후 host/path별로 분기 (오탐 방지)
+    """
+    if not url:
+        return None
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return None
+
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+
+    if host == "youtu.be":
+        return _valid_video_id(parts.path.lstrip("/").split("/", 1)[0])
+
+    if host not in _YOUTUBE_HOSTS:
+        return None
+
+    query = parse_qs(parts.query)
+    vid = _valid_video_id((query.get("v") or [None])[0])
+    if vid:
+        return vid
+
+    segs = [x for x in parts.path.split("/") if x]
+    if len(segs) >= 2 and segs[0] in _PATH_ID_PREFIXES:
+        return _valid_video_id(segs[1])
+
+    if segs[:1] == ["attribution_link"]:
+        inner = (query.get("u") or [""])[0]
+        if inner.startswith("/"):
+            return extract_video_id(f"https://www.youtube.com{inner}")
+
+    return None
+
+
+def canonical_video_url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def group_urls_by_video(urls: Any) -> List[Dict[str, Any]]:
+    """
+    입력 URL들을 video ID 기준으로 묶는다(첫 등장 순서 유지).
+    - url: 해당 영상의 첫 입력 URL
+    - fetch_url: Apify에 넘길 정규화 URL (ID를 못 뽑으면 원본 그대로)
+    - input_indices: 원본 입력 위치(1-based) 전부
+    YouTube가 아닌 URL은 문자열 그대로 중복 제거.
+    """
+    groups: List[Dict[str, Any]] = []
+    by_key: Dict[str, Dict[str, Any]] = {}
+
+    for pos, u in enumerate(split_urls(urls), start=1):
+        vid = extract_video_id(u)
+        key = vid or u
+        g = by_key.get(key)
+        if g is None:
+            g = {
+                "url": u,
+                "video_id": vid,
+                "fetch_url": canonical_video_url(vid) if vid else u,
+                "input_indices": [],
+                "input_urls": [],
+            }
+            by_key[key] = g
+            groups.append(g)
+        g["input_indices"].append(pos)
+        g["input_urls"].append(u)
+    return groups
 
 
 def pick_language_priority(languages: Optional[List[str]]) -> List[str]:
@@ -65,6 +152,24 @@ def pick_language_priority(languages: Optional[List[str]]) -> List[str]:
     return uniq or ["ko", "en"]
 
 
+_HANGUL_RE = re.compile(r"[\uac00-\ud7a3\u3131-\u318e]")
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u4e00-\u9fff]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    대략 토큰 수 (로컬 추정, TPM/프롬프트 예산용).
+    한글은 글자당 토큰이 영문보다 훨씬 많으므로 문자 종류별로 따로 센다:
+    한글 ≈ 1.5자/토큰, 한자·가나 ≈ 1자/토큰, 그 외(영문/숫자/공백/기호) ≈ 4자/토큰.
+    """
+    if not text:
+        return 1
+    hangul = len(_HANGUL_RE.findall(text))
+    cjk = len(_CJK_RE.findall(text))
+    other = len(text) - hangul - cjk
+    return int(hangul / 1.5 + cjk + other / 4) + 1
+
+
 def compact_text(text: str, max_chars: int) -> str:
     if not text:
         return ""
@@ -96,3 +201,176 @@ def segments_to_text(segments: Any, max_chars: int = 0) -> str:
     if not joined:
         return ""
     return compact_text(joined, max_chars=max_chars if max_chars else len(joined))
+
+
+# 자막 태그([음악], [Music] 등)와 단독 추임새. 문장 중간 단어는 건드리지 않도록 토큰 단위로만 제거
+_CAPTION_TAG_RE = re.compile(r"[\[(](?:음악|박수|웃음|music|applause|laughter|laughs|inaudible)[\])]", re.IGNORECASE)
+_FILLER_RE = re.compile(r"(?<!\S)(?:음+|어+|아+|흠+|에+|uh+|um+|erm+|hmm+|ah+)(?:[,.…]+)?(?!\S)", re.IGNORECASE)
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?…])\s+")
+_OMITTED = "[…]"
+
+TRANSCRIPT_HEAD_RATIO = 0.35
+TRANSCRIPT_TAIL_RATIO = 0.2
+TRANSCRIPT_MIDDLE_SAMPLES = 6
+# 이보다 긴 줄은 잘라서 샘플링 (구두점 없는 한 덩어리 자동 자막 대비): 예산의 1/24
+TRANSCRIPT_PIECE_RATIO = 1 / (TRANSCRIPT_MIDDLE_SAMPLES * 4)
+
+
+def _transcript_lines(text: str) -> List[str]:
+    """줄 단위 자막이면 그대로, 한 덩어리 텍스트면 문장 단위로 나눔."""
+    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    if len(lines) >= 8:
+        return lines
+    out: List[str] = []
+    for ln in lines:
+        out.extend(p for p in _SENTENCE_SPLIT_RE.split(ln) if p.strip())
+    return out
+
+
+def _split_long_line(line: str, cost: int, max_tokens: int) -> List[str]:
+    """토큰 추정치가 max_tokens를 넘는 줄 -> 대략 max_tokens 크기 조각들 (가능하면 공백에서 자름)."""
+    if cost <= max_tokens:
+        return [line]
+    step = max(int(len(line) * max_tokens / cost), 1)
+    pieces: List[str] = []
+    pos = 0
+    while pos < len(line):
+        end = min(pos + step, len(line))
+        if end < len(line):
+            cut = line.rfind(" ", pos + step // 2, end)
+            if cut > pos:
+                end = cut
+        piece = line[pos:end].strip()
+        if piece:
+            pieces.append(piece)
+        pos = end
+    return pieces
+
+
+def _truncate_to_tokens(text: str, token_budget: int) -> str:
+    """estimate_tokens(결과) <= token_budget이 되는 가장 긴 앞부분 (이진 탐색)."""
+    if estimate_tokens(text) <= token_budget:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) <= token_budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+
+def _take_within(lines: List[str], costs: List[int], budget: int) -> int:
+    """앞에서부터 budget 안에 들어가는 줄 수."""
+    used = 0
+    for i, c in enumerate(costs):
+        if used + c > budget:
+            return i
+        used += c
+    return len(lines)
+
+
+def _clean_lines(text: str, *, strip_tags: bool) -> Tuple[List[str], int]:
+    """줄 단위 정리: (strip_tags면) 자막 태그/단독 추임새 제거 + 연속 중복 줄 제거. (줄 목록, 제거한 중복 수)."""
+    lines: List[str] = []
+    removed_dupes = 0
+    prev_norm = ""
+    for ln in _transcript_lines(text):
+        if strip_tags:
+            ln = _FILLER_RE.sub(" ", _CAPTION_TAG_RE.sub(" ", ln))
+        ln = re.sub(r"[ \t]+", " ", ln).strip(" ,")
+        if not ln:
+            continue
+        norm = re.sub(r"\W+", "", ln.casefold())
+        # 자동 자막은 같은 줄/앞 줄에 이어붙은 줄이 반복되는 경우가 많음
+        if norm and prev_norm and (norm == prev_norm or (len(norm) >= 10 and norm in prev_norm)):
+            removed_dupes += 1
+            continue
+        lines.append(ln)
+        prev_norm = norm
+    return lines, removed_dupes
+
+
+def compact_transcript(text: str, token_budget: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    토큰 예산 기준 transcript 압축. (압축 텍스트, 리포트) 반환.
+    1) 자막 태그/단독 추임새 제거, 연속 중복 자막 줄 제거 (제거 후 비면 태그/추임새는 남김)
+    2) 그래도 예산을 넘으면 앞부분(HEAD) + 끝부분(TAIL, CTA 보존) + 중간에서 고르게 뽑은 구간만 남김
+       빠진 자리는 "[…]"로 표시. 너무 긴 줄(구두점 없는 자동 자막 등)은 먼저 조각으로 나눔
+    3) 마지막에 token_budget으로 한 번 더 잘라 예산 초과는 없음
+    """
+    t0 = time.perf_counter()
+    text = str(text or "")
+    orig_tokens = estimate_tokens(text)
+
+    lines, removed_dupes = _clean_lines(text, strip_tags=True)
+    kept_tags = False
+    if not lines and text.strip():
+        # 태그/추임새뿐인 자막(음악 영상 등)은 비우지 않고 그대로 둠 -> 자막 없음으로 보고 STT로 가지 않도록
+        lines, removed_dupes = _clean_lines(text, strip_tags=False)
+        kept_tags = True
+
+    costs = [estimate_tokens(ln) for ln in lines]
+    cleaned_tokens = sum(costs)
+    sampled = False
+
+    if token_budget and cleaned_tokens > token_budget:
+        max_piece = max(int(token_budget * TRANSCRIPT_PIECE_RATIO), 1)
+        if any(c > max_piece for c in costs):
+            pieces: List[str] = []
+            for ln, c in zip(lines, costs):
+                pieces.extend(_split_long_line(ln, c, max_piece))
+            lines = pieces
+            costs = [estimate_tokens(ln) for ln in lines]
+
+    if token_budget and cleaned_tokens > token_budget and len(lines) > 2:
+        sampled = True
+        head_n = _take_within(lines, costs, int(token_budget * TRANSCRIPT_HEAD_RATIO))
+        tail_n = _take_within(lines[::-1], costs[::-1], int(token_budget * TRANSCRIPT_TAIL_RATIO))
+        tail_start = max(len(lines) - tail_n, head_n)
+
+        middle_budget = token_budget - sum(costs[:head_n]) - sum(costs[tail_start:])
+        mid_lo, mid_hi = head_n, tail_start
+        keep = [False] * len(lines)
+        for i in range(head_n):
+            keep[i] = True
+        for i in range(tail_start, len(lines)):
+            keep[i] = True
+
+        # 중간 구간을 TRANSCRIPT_MIDDLE_SAMPLES 등분해 각 구간 가운데부터 연속 줄을 채움
+        if mid_hi > mid_lo and middle_budget > 0:
+            k = min(TRANSCRIPT_MIDDLE_SAMPLES, mid_hi - mid_lo)
+            share = middle_budget // k
+            span = (mid_hi - mid_lo) / k
+            for j in range(k):
+                start = int(mid_lo + j * span + span / 4)
+                used = 0
+                for i in range(start, min(int(mid_lo + (j + 1) * span), mid_hi)):
+                    if used + costs[i] > share:
+                        break
+                    keep[i] = True
+                    used += costs[i]
+
+        out_lines: List[str] = []
+        for i, ln in enumerate(lines):
+            if keep[i]:
+                out_lines.append(ln)
+            elif out_lines and out_lines[-1] != _OMITTED:
+                out_lines.append(_OMITTED)
+        lines = out_lines
+
+    out = "\n".join(lines)
+    if token_budget:
+        out = _truncate_to_tokens(out, token_budget)
+    tokens = estimate_tokens(out)
+    report = {
+        "orig_tokens_est": orig_tokens,
+        "tokens_est": tokens,
+        "ratio": round(tokens / orig_tokens, 4) if orig_tokens else 1.0,
+        "removed_duplicate_lines": removed_dupes,
+        "kept_tags": kept_tags,
+        "sampled": sampled,
+        "ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+    return out, report
@@ -0,0 +1,86 @@
+# bench/_stub_server.py
+"""
+벤치마크용 로컬 스텁 서버(uvicorn + 순수 ASGI 앱).
+실제 Apify/Gemini 대신 127.0.0.1에서 고정 응답을 돌려준다.
+"""
+from __future__ import annotations
+
+import json
+import socket
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Tuple, Union
+
+import uvicorn
+
+# payload가 bytes면 한 번에, async iterator면 청크 스트리밍으로 전송
+Payload = Union[bytes, AsyncIterator[bytes]]
+Handler = Callable[[Dict[str, Any], bytes], Awaitable[Tuple[int, Dict[str, str], Payload]]]
+
+
+def json_response(obj: Any, status: int = 200) -> Tuple[int, Dict[str, str], bytes]:
+    return status, {"content-type": "application/json"}, json.dumps(obj).encode("utf-8")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _make_asgi(handler: Handler):
+    async def asgi(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            msg = await receive()
+            body += msg.get("body", b"")
+            if not msg.get("more_body"):
+                break
+        status, headers, payload = await handler(scope, body)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(k.encode(), v.encode()) for k, v in headers.items()],
+            }
+        )
+        if isinstance(payload, bytes):
+            await send({"type": "http.response.body", "body": payload})
+            return
+        async for chunk in payload:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    return asgi
+
+
+class StubServer:
+    """with StubServer(handler) as base_url: ... 형태로 사용."""
+
+    def __init__(self, handler: Handler):
+        self.port = _free_port()
+        config = uvicorn.Config(
+            _make_asgi(handler),
+            host="127.0.0.1",
+            port=self.port,
+            log_level="warning",
+            lifespan="off",
+        )
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> str:
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self.base_url
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
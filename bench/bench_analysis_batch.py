@@ -0,0 +1,119 @@
+# bench/bench_analysis_batch.py
+"""
+짧은 영상 분석: 영상마다 단일 호출 vs analysis_batcher 묶음 호출 (로컬 가짜 Gemini 엔드포인트).
+
+    python -m bench.bench_analysis_batch --videos 60 --concurrency 12 --latency 0.8
+
+가짜 서버는 프롬프트 안 [영상 N] 구간 수만큼 영상별 JSON을 돌려준다.
+지연 = --latency + 영상당 --per-video 초 (출력이 길어지는 만큼).
+- calls/video     : 영상 하나당 Gemini 호출 수
+- prompt_tok/video: 영상 하나당 프롬프트 토큰 (utils.estimate_tokens 기준)
+동시성만 막혀 있으면 배치가 더 오래 걸린다(한 호출이 길어짐). 이득은 RPM/TPM 한도가 병목일 때:
+--rpm으로 scheduler gemini_text RPM을 걸어 비교.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import time
+
+from google import genai
+from google.genai import types
+
+from app import gemini_client, main as app_main, scheduler
+from app.utils import estimate_tokens
+from bench._stub_server import StubServer, json_response
+
+_LATENCY = 0.8
+_PER_VIDEO = 0.1
+_SECTION_RE = re.compile(r"^\[영상 (\d+)\]$", re.MULTILINE)
+
+_calls = 0
+_prompt_tokens = 0
+
+
+def _analysis(index: int) -> dict:
+    return {"ok": True, "video_index": index, "hook": {"summary": "질문으로 시작", "techniques": [], "frames": []}}
+
+
+async def _handler(scope, body):
+    global _calls, _prompt_tokens
+    req = json.loads(body or b"{}")
+    prompt = "".join(
+        part.get("text", "") for c in req.get("contents", []) for part in c.get("parts", [])
+    )
+    _calls += 1
+    _prompt_tokens += estimate_tokens(prompt)
+
+    keys = [int(k) for k in _SECTION_RE.findall(prompt)]
+    await asyncio.sleep(_LATENCY + _PER_VIDEO * max(len(keys), 1))
+    if keys:
+        text = json.dumps({"videos": [_analysis(k) for k in keys]}, ensure_ascii=False)
+    else:
+        text = json.dumps(_analysis(1))
+    return json_response({"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]})
+
+
+def _short_transcript(i: int) -> str:
+    return f"여러분 이거 아세요? 쇼츠 {i}번 영상입니다. 결론부터 말하면 90%가 모릅니다. 구독 부탁드려요!" * 4
+
+
+async def _run(videos: int, concurrency: int, batch: bool) -> tuple:
+    global _calls, _prompt_tokens
+    _calls = 0
+    _prompt_tokens = 0
+    app_main.ANALYSIS_BATCH = batch
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> bool:
+        async with sem:
+            out = await app_main._analyze_video(
+                i + 1,
+                {"title": f"쇼츠 {i}", "description": ""},
+                _short_transcript(i),
+                structured_output=False,
+                force_refresh=True,
+            )
+            return bool(out.get("ok"))
+
+    t0 = time.perf_counter()
+    oks = await asyncio.gather(*(one(i) for i in range(videos)))
+    return time.perf_counter() - t0, sum(oks)
+
+
+async def main(videos: int, concurrency: int, rpm: float) -> None:
+    lim = scheduler.limiter("gemini_text")
+    lim.max_concurrency = max(concurrency, lim.max_concurrency)
+    lim.tpm.rate = 0
+    for name, batch in (("single", False), ("batched", True)):
+        # 이전 실행이 버킷을 비워둔 상태로 시작하지 않도록 매번 새로 채움
+        lim.rpm.rate = rpm / 60
+        lim.rpm.capacity = max(rpm / 60, 1.0) if rpm else 0
+        lim.rpm.tokens = lim.rpm.capacity
+        lim.rpm.updated = time.monotonic()
+        elapsed, ok = await _run(videos, concurrency, batch)
+        print(
+            f"{name:<8} videos={videos} ok={ok} calls/video={_calls / videos:5.2f} "
+            f"prompt_tok/video={_prompt_tokens / videos:7.1f} wall={elapsed:6.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--videos", type=int, default=60)
+    ap.add_argument("--concurrency", type=int, default=12)
+    ap.add_argument("--latency", type=float, default=0.8)
+    ap.add_argument("--per-video", type=float, default=0.1)
+    ap.add_argument("--rpm", type=float, default=0, help="gemini_text RPM 한도 (0이면 없음)")
+    args = ap.parse_args()
+    _LATENCY = args.latency
+    _PER_VIDEO = args.per_video
+
+    with StubServer(_handler) as base_url:
+        gemini_client._client = genai.Client(
+            api_key="bench",
+            http_options=types.HttpOptions(base_url=base_url),
+        )
+        asyncio.run(main(args.videos, args.concurrency, args.rpm))
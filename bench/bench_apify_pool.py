@@ -0,0 +1,88 @@
+# bench/bench_apify_pool.py
+"""
+공유 커넥션 풀 전/후 Apify 호출 지연 비교 (로컬 스텁 서버).
+
+    python -m bench.bench_apify_pool --requests 200 --concurrency 20
+
+- before: 호출마다 새 httpx.AsyncClient (기존 동작)
+- after : app.apify_client.create_http_client() 공유 풀
+로컬 평문 HTTP라 TLS 핸드셰이크 비용은 빠져 있음 -> 실서버에서는 차이가 더 커진다.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Optional
+
+import httpx
+
+from app import apify_client
+from bench._stub_server import StubServer, json_response
+
+
+async def _handler(scope, body):
+    await asyncio.sleep(0.002)  # actor 처리 시간 흉내
+    return json_response(
+        [
+            {
+                "title": "stub",
+                "channel_name": "stub",
+                "language": "ko",
+                "transcript_text": "안녕하세요 " * 50,
+            }
+        ]
+    )
+
+
+async def _run(n: int, concurrency: int, client: Optional[httpx.AsyncClient]) -> List[float]:
+    sem = asyncio.Semaphore(concurrency)
+    lat: List[float] = []
+
+    async def one(i: int) -> None:
+        async with sem:
+            t0 = time.perf_counter()
+            await apify_client.fetch_transcript_and_metadata(
+                youtube_url=f"https://www.youtube.com/watch?v=stub{i:07d}",
+                language="ko",
+                timeout_sec=30,
+                token="stub",
+                client=client,
+            )
+            lat.append((time.perf_counter() - t0) * 1000)
+
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return lat
+
+
+def _report(name: str, lat: List[float]) -> None:
+    lat = sorted(lat)
+    p95 = lat[int(len(lat) * 0.95) - 1]
+    print(
+        f"{name:<8} n={len(lat):<5} mean={statistics.mean(lat):7.2f}ms "
+        f"p50={statistics.median(lat):7.2f}ms p95={p95:7.2f}ms"
+    )
+
+
+async def main(n: int, concurrency: int) -> None:
+    before = await _run(n, concurrency, client=None)
+    shared = apify_client.create_http_client()
+    try:
+        await _run(min(n, concurrency), concurrency, client=shared)  # 풀 워밍업
+        after = await _run(n, concurrency, client=shared)
+    finally:
+        await shared.aclose()
+    _report("before", before)
+    _report("after", after)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=20)
+    args = ap.parse_args()
+
+    with StubServer(_handler) as base_url:
+        apify_client.APIFY_API_BASE = base_url
+        asyncio.run(main(args.requests, args.concurrency))
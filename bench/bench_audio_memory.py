@@ -0,0 +1,108 @@
+# bench/bench_audio_memory.py
+"""
+STT fallback 오디오 다운로드 메모리 비교: 10개 동시, 60분 mp3(128kbps ≈ 57.6MB).
+
+    python -m bench.bench_audio_memory --concurrency 10 --minutes 60
+
+- before: OUTPUT_FILE 전체를 resp.content로 들고 있음 (기존 동작)
+- after : fetch_audio_file_from_converter (청크 스트리밍 + SpooledTemporaryFile)
+스텁 서버는 별도 프로세스에서 돌려 측정 프로세스의 할당에 섞이지 않게 한다.
+측정값은 tracemalloc peak (파이썬 힙 기준).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing as mp
+import time
+import tracemalloc
+
+import httpx
+
+from app import apify_client
+from bench._stub_server import StubServer, json_response
+
+_AUDIO_BYTES = 0
+_CHUNK = 256 * 1024
+
+
+async def _audio_stream():
+    chunk = b"\xff\xfb\x90\x00" * (_CHUNK // 4)
+    sent = 0
+    while sent < _AUDIO_BYTES:
+        n = min(_CHUNK, _AUDIO_BYTES - sent)
+        sent += n
+        yield chunk[:n]
+
+
+async def _handler(scope, body):
+    path = scope["path"]
+    if path.endswith("/runs"):
+        return json_response({"data": {"id": "run1", "status": "SUCCEEDED", "defaultKeyValueStoreId": "kvs1"}})
+    if "/records/OUTPUT_FILE" in path:
+        headers = {"content-type": "audio/mpeg", "content-length": str(_AUDIO_BYTES)}
+        return 200, headers, _audio_stream()
+    return json_response({"error": "not found"}, status=404)
+
+
+def _serve(audio_bytes: int, q: "mp.Queue[str]") -> None:
+    global _AUDIO_BYTES
+    _AUDIO_BYTES = audio_bytes
+    with StubServer(_handler) as base_url:
+        q.put(base_url)
+        while True:
+            time.sleep(3600)
+
+
+async def _before(client: httpx.AsyncClient) -> int:
+    # 기존 방식과 동일: resp.content 전체를 메모리에 보유한 채 STT 호출 대기
+    r = await client.get(f"{apify_client.APIFY_API_BASE}/key-value-stores/kvs1/records/OUTPUT_FILE", timeout=300)
+    data = r.content
+    await asyncio.sleep(0.5)  # STT 대기 흉내
+    return len(data)
+
+
+async def _after(client: httpx.AsyncClient) -> int:
+    conv = await apify_client.fetch_audio_file_from_converter(
+        youtube_url="https://www.youtube.com/watch?v=stub0000000",
+        timeout_sec=300,
+        token="stub",
+        client=client,
+    )
+    with conv["file"]:
+        await asyncio.sleep(0.5)
+    return conv["size"]
+
+
+async def _measure(fn, concurrency: int) -> None:
+    async with apify_client.create_http_client() as client:
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        sizes = await asyncio.gather(*(fn(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    mb = 1024 * 1024
+    print(
+        f"{fn.__name__.strip('_'):<7} concurrency={concurrency} file={sizes[0] / mb:6.1f}MB "
+        f"peak_heap={peak / mb:8.1f}MB wall={elapsed:5.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=10)
+    ap.add_argument("--minutes", type=float, default=60)
+    ap.add_argument("--kbps", type=int, default=128)
+    args = ap.parse_args()
+
+    audio_bytes = int(args.minutes * 60 * args.kbps * 1000 / 8)
+    q: "mp.Queue[str]" = mp.Queue()
+    server = mp.Process(target=_serve, args=(audio_bytes, q), daemon=True)
+    server.start()
+    try:
+        apify_client.APIFY_API_BASE = q.get(timeout=30)
+        asyncio.run(_measure(_before, args.concurrency))
+        asyncio.run(_measure(_after, args.concurrency))
+    finally:
+        server.terminate()
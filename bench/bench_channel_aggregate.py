@@ -0,0 +1,109 @@
+# bench/bench_channel_aggregate.py
+"""
+채널 프로필 입력 크기: 원본 슬림 DNA JSON vs 로컬 집계(app.dna_aggregate).
+
+    python -m bench.bench_channel_aggregate --videos 30 --repeat 20
+
+영상마다 조금씩 다른 표기(조사/기호 차이)의 DNA를 합성해 넣는다.
+- tokens_est: utils.estimate_tokens 기준 프롬프트 전체 크기
+- build_ms  : 프롬프트 만드는 데 든 로컬 시간 (집계 포함)
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+
+from app.dna_aggregate import aggregate_dna
+from app.prompts import build_channel_profile_from_aggregate_prompt, build_channel_profile_prompt
+from app.utils import estimate_tokens
+
+_TECHNIQUES = ["질문으로 시작", "충격적인 숫자 제시", "반전 예고", "공포 자극", "비교 제시", "밈 활용"]
+_FRAMES = ["질문형: 'OOO 아세요?'", "숫자형: 'OOO의 90%가...'", "반전형: '다들 OO인 줄 아는데 사실은...'"]
+_TEMPLATES = ["문제→근거2→예시→전환→정리", "질문→답변→사례→정리", "반전→배경→근거→결론"]
+_KEYWORDS = ["친근함", "빠른 템포", "유머", "단호함", "정보 밀도", "공감", "도발", "차분함"]
+_CATCH = ["자 그럼 시작해볼게요", "결론부터 말하면", "여기서 중요한 건", "믿기 어렵겠지만"]
+_CTA = ["댓글 유도", "구독 요청", "다음 편 예고", "좋아요 요청"]
+_SUFFIX = ["", "함", "!", " ", "기"]
+
+
+def _vary(s: str, rnd: random.Random) -> str:
+    return s + rnd.choice(_SUFFIX)
+
+
+def _pick(pool, k, rnd):
+    return [_vary(s, rnd) for s in rnd.sample(pool, k)]
+
+
+def _fake_item(i: int, rnd: random.Random) -> dict:
+    return {
+        "index": i + 1,
+        "url": f"https://www.youtube.com/watch?v=vid{i:08d}",
+        "meta": {"title": f"영상 제목 {i}", "channel": "벤치 채널", "published_at": "2024-01-01", "language": "ko"},
+        "dna": {
+            "video_index": i + 1,
+            "hook": {
+                "summary": "첫 5초에 질문을 던지고 숫자로 긴장감을 만든 뒤 반전을 예고하는 방식" + "." * (i % 3),
+                "techniques": _pick(_TECHNIQUES, 3, rnd),
+                "frames": _pick(_FRAMES, 2, rnd),
+            },
+            "structure": {
+                "template": _vary(rnd.choice(_TEMPLATES), rnd),
+                "beats": ["도입 질문", "근거 1", "근거 2", "사례", "전환", "정리"],
+                "pacing": "짧은 문장 위주로 빠르게 전개",
+            },
+            "style_tone": {
+                "persona": _vary("친구 같은 해설자", rnd),
+                "narration_style": "반말과 존댓말을 섞은 구어체",
+                "tone_keywords": _pick(_KEYWORDS, 5, rnd),
+            },
+            "expression_markers": {
+                "punctuation": ["...", "?!"],
+                "catchphrases": _pick(_CATCH, 2, rnd),
+                "rhythm": "짧게 끊고 강조할 때 반복",
+                "numbers_style": "퍼센트와 비교 숫자를 먼저 제시",
+            },
+            "retention": {"recurring_devices": ["중간 퀴즈", "마지막 반전"], "cta": _pick(_CTA, 2, rnd)},
+            "quotes": {
+                "items": [
+                    {"text": f"여기서 중요한 건 바로 이 부분인데요 {i}", "evidence": {"approx_start_sec": 0, "near_keywords": ["중요"]}}
+                ]
+            },
+        },
+    }
+
+
+def _time(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) * 1000 / repeat
+
+
+def main(videos: int, repeat: int) -> None:
+    rnd = random.Random(0)
+    items = [_fake_item(i, rnd) for i in range(videos)]
+
+    def raw() -> str:
+        return build_channel_profile_prompt(json.dumps(items, ensure_ascii=False))
+
+    def agg() -> str:
+        aggregate = aggregate_dna([it["dna"] for it in items])
+        return build_channel_profile_from_aggregate_prompt(
+            json.dumps(aggregate, ensure_ascii=False, separators=(",", ":"))
+        )
+
+    raw_tokens = estimate_tokens(raw())
+    agg_tokens = estimate_tokens(agg())
+    for name, tokens, ms in (("raw", raw_tokens, _time(raw, repeat)), ("aggregate", agg_tokens, _time(agg, repeat))):
+        print(f"{name:<10} videos={videos} tokens_est={tokens:7d} build_ms={ms:7.2f}")
+    print(f"token reduction: {1 - agg_tokens / raw_tokens:.1%}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--videos", type=int, default=30)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+    main(args.videos, args.repeat)
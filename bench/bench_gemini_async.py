@@ -0,0 +1,87 @@
+# bench/bench_gemini_async.py
+"""
+Gemini 동시 분석 처리량: asyncio.to_thread(sync) vs native async (로컬 가짜 Gemini 엔드포인트).
+
+    python -m bench.bench_gemini_async --analyses 200 --concurrency 50 --latency 0.5
+
+가짜 서버는 generateContent 요청마다 --latency 초 지연 후 고정 JSON을 돌려준다.
+to_thread 경로는 기본 스레드풀 크기(min(32, cpu+4))에 막혀 동시성이 잘린다.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from google import genai
+from google.genai import types
+
+from app import gemini_client, gemini_rest, scheduler
+from bench._stub_server import StubServer, json_response
+
+_LATENCY = 0.5
+
+
+async def _handler(scope, body):
+    await asyncio.sleep(_LATENCY)
+    return json_response(
+        {
+            "candidates": [
+                {"content": {"role": "model", "parts": [{"text": '{"ok": true, "video_index": 1}'}]}}
+            ]
+        }
+    )
+
+
+async def _sync_via_threads(n: int, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with sem:
+            await asyncio.to_thread(gemini_rest.analyze_with_gemini, "bench prompt")
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    return time.perf_counter() - t0
+
+
+async def _native_async(n: int, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with sem:
+            await gemini_rest.analyze_with_gemini_async("bench prompt")
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    return time.perf_counter() - t0
+
+
+async def main(n: int, concurrency: int) -> None:
+    # scheduler 상한(동시 실행/RPM/TPM)이 벤치 동시성보다 작으면 그게 병목이 되므로 풀어줌
+    lim = scheduler.limiter("gemini_text")
+    lim.max_concurrency = max(concurrency, lim.max_concurrency)
+    lim.rpm.rate = 0
+    lim.tpm.rate = 0
+    for name, fn in (("to_thread", _sync_via_threads), ("async", _native_async)):
+        elapsed = await fn(n, concurrency)
+        print(
+            f"{name:<10} analyses={n} concurrency={concurrency} "
+            f"wall={elapsed:6.2f}s throughput={n / elapsed:7.1f}/s"
+        )
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--analyses", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--latency", type=float, default=0.5)
+    args = ap.parse_args()
+    _LATENCY = args.latency
+
+    with StubServer(_handler) as base_url:
+        gemini_client._client = genai.Client(
+            api_key="bench",
+            http_options=types.HttpOptions(base_url=base_url),
+        )
+        asyncio.run(main(args.analyses, args.concurrency))
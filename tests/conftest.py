@@ -0,0 +1,6 @@
+import os
+
+# app 모듈 import 전에: 저장소/캐시는 프로세스 메모리만 사용
+os.environ.setdefault("CACHE_DB_PATH", "")
+os.environ.setdefault("CHANNEL_STORE", "memory")
+os.environ.setdefault("JOB_STORE", "memory")
@@ -0,0 +1,79 @@
+import asyncio
+import dataclasses
+import json
+
+import app.main as app_main
+from app.cache import MemoryLRUCache, TieredCache
+from app.gemini_client import get_model
+
+META = {"title": "제목", "description": "설명"}
+
+
+def _key(**overrides) -> str:
+    args = {"title": "제목", "description": "설명", "transcript_text": "본문", "structured_output": True}
+    args.update(overrides)
+    return app_main._analysis_cache_key(**args)
+
+
+def test_cache_key_includes_prompt_version_model_and_mode(monkeypatch):
+    base = _key()
+    assert base.startswith(f"{app_main.VIDEO_ANALYSIS_PROMPT_VERSION}:{get_model('text').name}:structured:")
+    assert _key() == base
+    assert _key(structured_output=False) != base
+    assert _key(transcript_text="다른 본문") != base
+
+    monkeypatch.setattr(app_main, "VIDEO_ANALYSIS_PROMPT_VERSION", "next")
+    assert _key() != base
+
+    monkeypatch.undo()
+    other = dataclasses.replace(get_model("text"), name="other-model")
+    monkeypatch.setattr(app_main, "get_model", lambda kind: other)
+    assert _key() != base
+
+
+def test_cache_key_fields_do_not_collide():
+    # 구분자 없이 이어붙이면 같은 해시가 되는 조합
+    assert _key(title="ab", description="c") != _key(title="a", description="bc")
+
+
+def test_second_call_is_cached_with_own_video_index(monkeypatch):
+    calls = []
+
+    async def fake_gemini(prompt, response_schema=None):
+        calls.append(prompt)
+        return {"text": json.dumps({"ok": True, "video_index": 1, "hook": {"summary": "질문"}})}
+
+    monkeypatch.setattr(app_main, "analyze_with_gemini_async", fake_gemini)
+    monkeypatch.setattr(app_main, "ANALYSIS_BATCH", False)
+    monkeypatch.setattr(app_main, "analysis_cache", TieredCache("t", memory=MemoryLRUCache(max_items=8, ttl_sec=60)))
+
+    async def go(idx, force_refresh=False):
+        return await app_main._analyze_video(
+            idx, META, "본문", structured_output=True, force_refresh=force_refresh
+        )
+
+    first = asyncio.run(go(1))
+    second = asyncio.run(go(3))
+    refreshed = asyncio.run(go(3, force_refresh=True))
+
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert json.loads(second["text"])["video_index"] == 3
+    assert json.loads(second["text"])["hook"] == {"summary": "질문"}
+    assert refreshed["cached"] is False
+    assert len(calls) == 2
+
+
+def test_failed_analysis_is_not_cached(monkeypatch):
+    async def fake_gemini(prompt, response_schema=None):
+        return {"text": "not json"}
+
+    monkeypatch.setattr(app_main, "analyze_with_gemini_async", fake_gemini)
+    monkeypatch.setattr(app_main, "ANALYSIS_BATCH", False)
+    cache = TieredCache("t", memory=MemoryLRUCache(max_items=8, ttl_sec=60))
+    monkeypatch.setattr(app_main, "analysis_cache", cache)
+
+    res = asyncio.run(app_main._analyze_video(1, META, "본문", structured_output=True, force_refresh=False))
+
+    assert res["ok"] is False
+    assert asyncio.run(cache.get(_key())) is None
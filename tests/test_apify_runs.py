@@ -0,0 +1,148 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from app.apify_client import ApifyError
+from app.apify_runs import RunTracker
+from app.cache import build_tiered_cache
+
+
+class FakeApify:
+    """run 시작/조회만 흉내내는 가짜 Apify. statuses[run_id]는 조회할 때마다 하나씩 꺼내는 상태 목록."""
+
+    def __init__(self, *scripts):
+        self.scripts = list(scripts)  # 새 run마다 쓸 상태 목록
+        self.statuses = {}
+        self.started = []
+        self.polls = 0
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "POST" and request.url.path.endswith("/runs"):
+            run_id = f"run{len(self.started) + 1}"
+            self.started.append(run_id)
+            self.statuses[run_id] = list(self.scripts.pop(0))
+            return httpx.Response(201, json={"data": self._run(run_id, peek=True)})
+        if request.method == "GET" and "/actor-runs/" in request.url.path:
+            self.polls += 1
+            return httpx.Response(200, json={"data": self._run(request.url.path.rsplit("/", 1)[-1])})
+        return httpx.Response(404, json={})
+
+    def _run(self, run_id: str, peek: bool = False) -> dict:
+        seq = self.statuses[run_id]
+        status = seq[0] if peek or len(seq) == 1 else seq.pop(0)
+        return {"id": run_id, "status": status, "defaultKeyValueStoreId": f"kvs-{run_id}"}
+
+
+def _tracker(**kw) -> RunTracker:
+    store = build_tiered_cache("runs", memory_max_items=16, memory_ttl_sec=60, disk_ttl_sec=60, db_path="")
+    opts = dict(run_store=store, deadline_sec=1.0, poll_initial_sec=0.01, poll_max_sec=0.05, start_wait_sec=0)
+    opts.update(kw)
+    return RunTracker(**opts)
+
+
+def _run_converter(tracker: RunTracker, fake: FakeApify) -> dict:
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(fake.handler)) as http:
+            return await tracker.run_converter(
+                http,
+                run_key="vid1",
+                youtube_url="https://youtu.be/vid1",
+                token="t",
+                timeout_sec=5,
+                actor_id="a~b",
+                cookies_text="",
+            )
+
+    return asyncio.run(go())
+
+
+def test_polls_with_backoff_until_succeeded():
+    fake = FakeApify(["RUNNING", "RUNNING", "RUNNING", "SUCCEEDED"])
+    run = _run_converter(_tracker(), fake)
+    assert run["status"] == "SUCCEEDED"
+    assert fake.started == ["run1"]
+    assert fake.polls == 4
+
+
+def test_deadline_keeps_run_for_resume():
+    fake = FakeApify(["RUNNING"])
+    tracker = _tracker(deadline_sec=0.1)
+    with pytest.raises(ApifyError, match="kept for resume"):
+        _run_converter(tracker, fake)
+
+    # 다음 요청: 새 run 없이 기억된 run을 이어서 기다림
+    fake.statuses["run1"] = ["SUCCEEDED"]
+    run = _run_converter(tracker, fake)
+    assert run["id"] == "run1"
+    assert fake.started == ["run1"]
+
+
+def test_failed_run_is_restarted():
+    fake = FakeApify(["RUNNING", "FAILED"], ["SUCCEEDED"])
+    tracker = _tracker()
+    with pytest.raises(ApifyError, match="status=FAILED"):
+        _run_converter(tracker, fake)
+
+    run = _run_converter(tracker, fake)
+    assert run["id"] == "run2"
+    assert fake.started == ["run1", "run2"]
+
+
+def test_webhook_wakes_all_waiters():
+    tracker = _tracker(deadline_sec=10.0, poll_initial_sec=5.0, poll_max_sec=5.0)
+    done = {"status": "RUNNING"}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"data": {"id": "run1", "status": done["status"]}})
+
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            waiters = [
+                asyncio.create_task(tracker.wait(http, {"id": "run1", "status": "RUNNING"}, token="t", timeout_sec=5))
+                for _ in range(2)
+            ]
+            await asyncio.sleep(0.05)
+            done["status"] = "SUCCEEDED"
+            t0 = time.monotonic()
+            assert tracker.notify("run1")
+            runs = await asyncio.wait_for(asyncio.gather(*waiters), timeout=2)
+            return runs, time.monotonic() - t0
+
+    runs, elapsed = asyncio.run(go())
+    assert [r["status"] for r in runs] == ["SUCCEEDED", "SUCCEEDED"]
+    assert elapsed < 1.0  # poll 간격(2.5s 이상)을 기다리지 않음
+    assert tracker._events == {} and tracker._waiters == {}
+
+
+def test_second_waiter_keeps_event_after_first_leaves():
+    tracker = _tracker(deadline_sec=10.0, poll_initial_sec=5.0, poll_max_sec=5.0)
+    status = {"run1": "RUNNING"}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"data": {"id": "run1", "status": status["run1"]}})
+
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            first = asyncio.create_task(tracker.wait(http, {"id": "run1", "status": "RUNNING"}, token="t", timeout_sec=5))
+            second = asyncio.create_task(tracker.wait(http, {"id": "run1", "status": "RUNNING"}, token="t", timeout_sec=5))
+            await asyncio.sleep(0.05)
+            first.cancel()
+            await asyncio.gather(first, return_exceptions=True)
+
+            status["run1"] = "SUCCEEDED"
+            assert tracker.notify("run1")  # 남은 waiter를 여전히 깨울 수 있음
+            return await asyncio.wait_for(second, timeout=2)
+
+    assert asyncio.run(go())["status"] == "SUCCEEDED"
+
+
+def test_webhooks_param_encodes_callback_url():
+    import base64
+
+    tracker = _tracker(webhook_base_url="https://svc.example", webhook_secret="s3")
+    spec = json.loads(base64.b64decode(tracker.webhooks_param()))
+    assert spec[0]["requestUrl"] == "https://svc.example/webhooks/apify?secret=s3"
+    assert "ACTOR.RUN.SUCCEEDED" in spec[0]["eventTypes"]
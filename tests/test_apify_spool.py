@@ -0,0 +1,25 @@
+from app.apify_client import AUDIO_SPOOL_MAX_MEMORY_BYTES, _AudioSpool, _SpoolBudget
+
+
+def test_spools_share_process_memory_budget():
+    budget = _SpoolBudget(2 * AUDIO_SPOOL_MAX_MEMORY_BYTES)
+    first, second, third = _AudioSpool(budget), _AudioSpool(budget), _AudioSpool(budget)
+    try:
+        assert budget.used == 2 * AUDIO_SPOOL_MAX_MEMORY_BYTES
+        assert not first._rolled and not second._rolled
+        assert third._rolled  # 예산 초과 -> 처음부터 디스크
+    finally:
+        for spool in (first, second, third):
+            spool.close()
+    assert budget.used == 0
+
+
+def test_rollover_returns_budget():
+    budget = _SpoolBudget(AUDIO_SPOOL_MAX_MEMORY_BYTES)
+    with _AudioSpool(budget) as spool:
+        spool.write(b"x" * (AUDIO_SPOOL_MAX_MEMORY_BYTES + 1))
+        assert spool._rolled
+        assert budget.used == 0
+        spool.seek(0)
+        assert len(spool.read()) == AUDIO_SPOOL_MAX_MEMORY_BYTES + 1
+
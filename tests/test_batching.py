@@ -0,0 +1,131 @@
+import asyncio
+import json
+from dataclasses import replace
+
+import pytest
+
+import app.main as app_main
+from app.batcher import MicroBatcher
+from app.gemini_client import get_model
+
+BATCH_MARK = "[배치 규칙]"
+
+
+def test_micro_batcher_groups_and_flushes_on_size():
+    flushed = []
+
+    async def flush(items):
+        flushed.append(list(items))
+        return [f"r-{x}" for x in items]
+
+    async def go():
+        b = MicroBatcher("t", flush, max_items=2, max_tokens=0, window_sec=10)
+        return await asyncio.gather(b.submit("a", 1), b.submit("b", 2), b.submit("a", 3), b.submit("b", 4))
+
+    assert asyncio.run(go()) == ["r-1", "r-2", "r-3", "r-4"]
+    assert sorted(flushed) == [[1, 3], [2, 4]]
+
+
+def test_micro_batcher_flushes_on_window_and_token_budget():
+    flushed = []
+
+    async def flush(items):
+        flushed.append(list(items))
+        return items
+
+    async def go():
+        b = MicroBatcher("t", flush, max_items=10, max_tokens=100, window_sec=0.01)
+        return await asyncio.gather(b.submit("g", "x", tokens=60), b.submit("g", "y", tokens=60), b.submit("g", "z"))
+
+    assert asyncio.run(go()) == ["x", "y", "z"]
+    assert flushed == [["x"], ["y", "z"]]
+
+
+def test_micro_batcher_propagates_flush_error():
+    async def flush(items):
+        raise RuntimeError("boom")
+
+    async def go():
+        b = MicroBatcher("t", flush, max_items=2, max_tokens=0, window_sec=10)
+        return await asyncio.gather(b.submit("g", 1), b.submit("g", 2), return_exceptions=True)
+
+    assert [str(e) for e in asyncio.run(go())] == ["boom", "boom"]
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    calls = []
+    reply = {"videos": None, "error": None}
+
+    async def fake(prompt, max_output_tokens=None, response_schema=None):
+        batch = BATCH_MARK in prompt
+        calls.append(("batch" if batch else "single", max_output_tokens))
+        if not batch:
+            return {"ok": True, "text": json.dumps({"ok": True, "video_index": 99})}
+        if reply["error"]:
+            raise reply["error"]
+        return {"ok": True, "text": json.dumps({"videos": reply["videos"]})}
+
+    monkeypatch.setattr(app_main, "analyze_with_gemini_async", fake)
+    return calls, reply
+
+
+def _items(n):
+    return [
+        {"title": f"t{i}", "description": "", "transcript_text": f"짧은 영상 {i}", "structured_output": False}
+        for i in range(n)
+    ]
+
+
+def test_batch_split_by_video_index(fake_gemini):
+    calls, reply = fake_gemini
+    reply["videos"] = [{"ok": True, "video_index": 3}, {"ok": True, "video_index": 1}, "junk"]
+
+    results = asyncio.run(app_main._run_analysis_batch(_items(3)))
+
+    assert json.loads(results[0])["video_index"] == 1
+    assert results[1] is None  # 응답에 없음 -> 호출자가 단일 호출
+    assert json.loads(results[2])["video_index"] == 3
+
+
+def test_batch_output_tokens_clamped_to_model_limit(monkeypatch, fake_gemini):
+    calls, reply = fake_gemini
+    reply["videos"] = []
+    model = replace(get_model("text"), max_output_tokens=2048, output_token_limit=5000)
+    monkeypatch.setattr(app_main, "get_model", lambda kind: model)
+
+    asyncio.run(app_main._run_analysis_batch(_items(6)))
+    assert calls == [("batch", 5000)]
+
+
+@pytest.mark.parametrize("failure", ["missing", "error"])
+def test_analyze_video_falls_back_to_single_call(monkeypatch, fake_gemini, failure):
+    calls, reply = fake_gemini
+    if failure == "missing":
+        reply["videos"] = [{"ok": True, "video_index": 1}]
+    else:
+        reply["error"] = RuntimeError("batch rejected")
+    monkeypatch.setattr(app_main, "ANALYSIS_BATCH", True)
+    monkeypatch.setattr(
+        app_main,
+        "analysis_batcher",
+        MicroBatcher("test", app_main._run_analysis_batch, max_items=3, max_tokens=0, window_sec=10),
+    )
+
+    async def go():
+        return await asyncio.gather(
+            *(
+                app_main._analyze_video(i, {"title": f"t{i}"}, f"짧은 영상 {i}", structured_output=False, force_refresh=True)
+                for i in (1, 2, 3)
+            )
+        )
+
+    outs = asyncio.run(go())
+    assert all(o["ok"] for o in outs)
+    assert [c[0] for c in calls].count("batch") == 1
+    if failure == "missing":
+        assert outs[0].get("batched") and not outs[1].get("batched")
+        assert [c[0] for c in calls].count("single") == 2
+    else:
+        assert not any(o.get("batched") for o in outs)
+        assert [c[0] for c in calls].count("single") == 3
@@ -0,0 +1,60 @@
+import asyncio
+
+from app.cache import MemoryLRUCache, TieredCache
+
+
+class BrokenDisk:
+    """잠기거나 깨진 SQLite tier 흉내: 모든 연산이 예외."""
+
+    def get(self, key):
+        raise RuntimeError("database is locked")
+
+    def set(self, key, value):
+        raise RuntimeError("database is locked")
+
+    def delete(self, key):
+        raise RuntimeError("database is locked")
+
+
+def _cache() -> TieredCache:
+    return TieredCache("t", memory=MemoryLRUCache(max_items=8, ttl_sec=60), disk=BrokenDisk())
+
+
+def test_broken_disk_tier_degrades_to_memory():
+    cache = _cache()
+
+    async def go():
+        await cache.set("k", {"v": 1})
+        hit = await cache.get("k")
+        await cache.delete("k")
+        return hit, await cache.get("k")
+
+    assert asyncio.run(go()) == ({"v": 1}, None)
+
+
+def test_single_flight_task_does_not_inherit_caller_context():
+    import contextvars
+
+    from app import resilience
+    from app.cache import SingleFlight
+
+    var = contextvars.ContextVar("caller", default="none")
+    flight = SingleFlight("t")
+    seen = []
+
+    async def work():
+        seen.append((var.get(), resilience.remaining_sec()))
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def caller(name, budget):
+        var.set(name)
+        resilience.start_deadline(budget)
+        return await flight.do("k", work)
+
+    async def go():
+        return await asyncio.gather(caller("first", 0.001), caller("second", 60))
+
+    assert asyncio.run(go()) == ["ok", "ok"]
+    assert seen == [("none", None)]
+    assert flight.stats()["coalesced"] == 1
@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+import app.main as app_main
+from app.channels import MemoryChannelStore
+
+
+def _video(analysis: dict, url: str = "https://www.youtube.com/watch?v=abcdefghijk") -> dict:
+    return {
+        "ok": True,
+        "index": 1,
+        "url": url,
+        "meta": {"title": "t", "channel": "채널 A"},
+        "videoAnalysis": {"ok": True, "text": json.dumps(analysis, ensure_ascii=False)},
+    }
+
+
+def _state(remember_dna: bool) -> dict:
+    analysis = {"ok": True, "video_index": 1, "hook": {"summary": "질문"}}
+    st = app_main._video_state(
+        1, "https://www.youtube.com/watch?v=abcdefghijk", ["ko"], False, "sequential", 2, True, remember_dna
+    )
+    st.update(
+        analysis={"ok": True, "text": json.dumps(analysis)},
+        transcript_text="질문으로 시작합니다",
+        stt=None,
+        compaction=None,
+        segments=None,
+        meta={"title": "t", "channel": "채널 A"},
+        transcript_source="apify_transcript",
+    )
+    return st
+
+
+def test_slim_analysis_tolerates_non_dict_sections():
+    slim = app_main._slim_analysis(_video({"ok": True, "hook": "질문으로 시작", "quotes": ["a"], "retention": None}))
+    assert slim["dna"]["hook"]["summary"] is None
+    assert slim["dna"]["quotes"] == {"items": []}
+
+
+def test_dna_saved_only_when_profile_requested(monkeypatch):
+    store = MemoryChannelStore()
+    monkeypatch.setattr(app_main, "channel_store", store)
+
+    asyncio.run(app_main._stage_validate(_state(remember_dna=False)))
+    assert store.dna("채널 A") == {}
+
+    asyncio.run(app_main._stage_validate(_state(remember_dna=True)))
+    assert list(store.dna("채널 A")) == ["abcdefghijk"]
+
+
+def test_store_error_does_not_fail_video(monkeypatch):
+    class BrokenStore(MemoryChannelStore):
+        def put_dna(self, channel, video_id, item):
+            raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(app_main, "channel_store", BrokenStore())
+    st = _state(remember_dna=True)
+    assert asyncio.run(app_main._stage_validate(st)) is None
+    assert st["result"]["ok"] is True
@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+import pytest
+
+import app.main as app_main
+
+
+def _analysis(i: int) -> dict:
+    return {
+        "index": i + 1,
+        "url": f"https://www.youtube.com/watch?v=vid{i:08d}",
+        "meta": {"title": f"영상 {i}", "channel": "채널", "published_at": "", "language": "ko"},
+        "dna": {
+            "video_index": i + 1,
+            "hook": {"summary": f"첫 5초에 질문을 던지는 방식 {i} " * 20, "techniques": ["질문", "숫자"]},
+            "structure": {"template": "문제-근거-반전", "beats": ["도입", "근거", "반전"]},
+            "style_tone": {"persona": "해설자", "tone_keywords": ["빠른", "친근한"]},
+        },
+    }
+
+
+@pytest.fixture
+def gemini_calls(monkeypatch):
+    calls = []
+
+    async def fake(prompt, max_output_tokens=None, response_schema=None):
+        calls.append(prompt)
+        return {"ok": True, "model": "fake", "text": json.dumps({"ok": True, "one_sentence_concept": f"p{len(calls)}"})}
+
+    monkeypatch.setattr(app_main, "analyze_with_gemini_async", fake)
+    return calls
+
+
+def test_map_reduce_runs_with_aggregation(monkeypatch, gemini_calls):
+    monkeypatch.setattr(app_main, "CHANNEL_DNA_AGGREGATE", True)
+    monkeypatch.setattr(app_main, "CHANNEL_PROFILE_GROUP_SIZE", 10)
+    monkeypatch.setattr(app_main, "CHANNEL_PROFILE_REDUCE_FANOUT", 3)
+    analyses = [_analysis(i) for i in range(25)]
+
+    _, report = app_main._channel_dna_input(analyses)
+    assert report["input_tokens_est"] < report["raw_tokens_est"]
+    monkeypatch.setattr(app_main, "CHANNEL_PROFILE_MAP_REDUCE_TOKENS", report["input_tokens_est"] + 1)
+
+    out = asyncio.run(app_main._profile_from_analyses(analyses, True))
+
+    assert out["ok"]
+    assert out["input"]["map_reduce"]["groups"] == 3
+    assert out["input"]["map_reduce"]["calls"] == 4  # map 3 + reduce 1
+    assert len(gemini_calls) == 4
+
+
+def test_small_channel_uses_single_call(gemini_calls):
+    out = asyncio.run(app_main._profile_from_analyses([_analysis(i) for i in range(3)], True))
+    assert out["ok"]
+    assert "map_reduce" not in out["input"]
+    assert len(gemini_calls) == 1
+
+
+def test_map_reduce_when_prompt_exceeds_model_input_limit(monkeypatch, gemini_calls):
+    from dataclasses import replace
+
+    from app.gemini_client import get_model
+
+    small = replace(get_model("text"), input_token_limit=200)
+    monkeypatch.setattr(app_main, "get_model", lambda kind: small if kind == "text" else get_model(kind))
+    monkeypatch.setattr(app_main, "CHANNEL_PROFILE_MAP_REDUCE_TOKENS", 10**9)
+    monkeypatch.setattr(app_main, "CHANNEL_PROFILE_GROUP_SIZE", 10)
+
+    out = asyncio.run(app_main._profile_from_analyses([_analysis(i) for i in range(15)], True))
+    assert out["input"]["map_reduce"]["groups"] == 2
@@ -0,0 +1,40 @@
+from app.utils import compact_transcript, estimate_tokens
+
+
+def _long_transcript(n: int = 3000) -> str:
+    lines = [f"이번 문장은 {i}번째 자막 줄입니다" for i in range(n)]
+    lines.append("구독과 좋아요 부탁드립니다 다음 편에서 만나요")
+    return "\n".join(lines)
+
+
+def test_short_transcript_is_kept():
+    out, report = compact_transcript("Hello there.\nThis is short.\nYes!", 1000)
+    assert out == "Hello there.\nThis is short.\nYes!"
+    assert not report["sampled"]
+
+
+def test_tags_fillers_and_duplicates_removed():
+    out, report = compact_transcript("[음악] 안녕하세요 여러분\n안녕하세요 여러분\n어 오늘은", 1000)
+    assert out == "안녕하세요 여러분\n오늘은"
+    assert report["removed_duplicate_lines"] == 1
+
+
+def test_budget_respected_and_cta_kept():
+    out, report = compact_transcript(_long_transcript(), 2000)
+    assert report["sampled"]
+    assert estimate_tokens(out) <= 2000
+    assert out.splitlines()[0] == "이번 문장은 0번째 자막 줄입니다"
+    assert out.rstrip().endswith("구독과 좋아요 부탁드립니다 다음 편에서 만나요")
+    assert "[…]" in out
+
+
+def test_single_giant_line_is_capped():
+    text = " ".join(f"단어{i}" for i in range(40000))
+    out, _ = compact_transcript(text, 1000)
+    assert 0 < estimate_tokens(out) <= 1000
+
+
+def test_tag_only_captions_are_not_emptied():
+    out, report = compact_transcript("[음악]\n[음악]\n[박수]", 1000)
+    assert out == "[음악]\n[박수]"
+    assert report["kept_tags"]
@@ -0,0 +1,73 @@
+from app.dna_aggregate import MAX_OPTIONS, aggregate_dna, cluster_values, core_min_videos
+
+
+def _dna(techniques=None, tones=None):
+    return {
+        "hook": {"techniques": techniques or []},
+        "style_tone": {"tone_keywords": tones or []},
+    }
+
+
+def test_core_min_videos():
+    assert core_min_videos(1) == 2
+    assert core_min_videos(2) == 2
+    assert core_min_videos(3) == 2
+    assert core_min_videos(5) == 3
+    assert core_min_videos(10) == 6
+
+
+def test_similar_phrases_share_a_cluster():
+    clusters = cluster_values([["질문으로 시작"], ["질문으로 시작함"], ["질문으로  시작!"]])
+    assert len(clusters) == 1
+    assert clusters[0].videos == {0, 1, 2}
+    assert clusters[0].label() == "질문으로 시작"
+
+
+def test_clustering_threshold():
+    # SequenceMatcher ratio 0.8 -> 묶음, 0.7 -> 분리
+    assert len(cluster_values([["abcdefghij"], ["abcdefghxy"]])) == 1
+    assert len(cluster_values([["abcdefghij"], ["abcdefgxyz"]])) == 2
+    # 포함 관계라도 길이 차이가 크면 분리
+    assert len(cluster_values([["반전"], ["반전으로 끝나는 결말"]])) == 2
+
+
+def test_repeats_in_one_video_count_once():
+    clusters = cluster_values([["숫자 강조", "숫자 강조"], []])
+    assert clusters[0].videos == {0}
+
+
+def test_core_option_split():
+    dnas = [
+        _dna(["질문으로 시작", "숫자 제시"]),
+        _dna(["질문으로 시작함", "숫자 제시"]),
+        _dna(["질문으로 시작", "반전"]),
+        _dna(["충격 발언"]),
+        _dna(["질문으로 시작"]),
+    ]
+    out = aggregate_dna(dnas)
+
+    assert out["video_count"] == 5
+    assert out["core_min_videos"] == 3
+    assert out["hook_techniques"]["core"] == [["질문으로 시작", 4]]
+    assert out["hook_techniques"]["options"] == [["숫자 제시", 2], ["반전", 1], ["충격 발언", 1]]
+
+
+def test_unparsed_and_string_values():
+    dnas = [
+        {"raw_text": "깨진 응답"},
+        {"style_tone": {"tone_keywords": "유쾌"}},
+        {"style_tone": {"tone_keywords": ["유쾌", "차분"]}},
+    ]
+    out = aggregate_dna(dnas)
+
+    assert out["video_count"] == 2
+    assert out["unparsed_videos"] == 1
+    assert out["tone_keywords"]["core"] == [["유쾌", 2]]
+    assert out["tone_keywords_top5"] == ["유쾌", "차분"]
+
+
+def test_options_are_capped():
+    dnas = [_dna([f"기법{chr(0xAC00 + i * 97)}"]) for i in range(MAX_OPTIONS + 4)]
+    out = aggregate_dna(dnas)
+    assert out["hook_techniques"]["core"] == []
+    assert len(out["hook_techniques"]["options"]) == MAX_OPTIONS
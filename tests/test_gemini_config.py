@@ -0,0 +1,6 @@
+from app.gemini_audio import _stt_config
+from app.gemini_client import get_model
+
+
+def test_stt_uses_audio_model_output_limit():
+    assert _stt_config().max_output_tokens == get_model("audio").max_output_tokens
@@ -0,0 +1,91 @@
+import pytest
+
+from app.jobs import TERMINAL_STATUSES, MemoryJobStore, SqliteJobStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryJobStore()
+    return SqliteJobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_update_skips_cancelled_job(store):
+    job = store.create({"urls": []}, total=1)
+    assert store.update(job["job_id"], status="cancelled", unless_status=TERMINAL_STATUSES)
+    assert not store.update(job["job_id"], status="succeeded", warnings=[], unless_status=("cancelled",))
+    assert store.get(job["job_id"])["status"] == "cancelled"
+
+
+def test_update_without_guard_overwrites(store):
+    job = store.create({"urls": []}, total=1)
+    assert store.update(job["job_id"], status="running", unless_status=("cancelled",))
+    assert store.update(job["job_id"], status="failed", error="boom")
+    got = store.get(job["job_id"])
+    assert (got["status"], got["error"]) == ("failed", "boom")
+
+
+def test_update_unknown_job(store):
+    assert not store.update("missing", status="running")
+
+
+def test_claim_is_exclusive_until_lease_expires(store):
+    job = store.create({"urls": []}, total=1)
+    assert store.claim(job["job_id"], "worker-a", lease_sec=60)
+    assert store.claim(job["job_id"], "worker-a", lease_sec=60)  # 연장
+    assert not store.claim(job["job_id"], "worker-b", lease_sec=60)
+    assert store.get(job["job_id"])["owner"] == "worker-a"
+
+    assert store.claim(job["job_id"], "worker-a", lease_sec=-1)  # 만료된 lease
+    assert store.claim(job["job_id"], "worker-b", lease_sec=60)
+
+
+def test_release_lets_another_worker_claim(store):
+    job = store.create({"urls": []}, total=1)
+    assert store.claim(job["job_id"], "worker-a", lease_sec=60)
+    store.release(job["job_id"], "worker-b")  # 남의 lease는 못 놓음
+    assert not store.claim(job["job_id"], "worker-b", lease_sec=60)
+    store.release(job["job_id"], "worker-a")
+    assert store.claim(job["job_id"], "worker-b", lease_sec=60)
+
+
+def test_terminal_job_cannot_be_claimed(store):
+    job = store.create({"urls": []}, total=1)
+    store.update(job["job_id"], status="cancelled")
+    assert not store.claim(job["job_id"], "worker-a", lease_sec=60)
+
+
+def test_sqlite_store_adds_lease_columns_to_old_db(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE jobs (job_id TEXT PRIMARY KEY, status TEXT NOT NULL, request TEXT NOT NULL, "
+        "total INTEGER NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+        "channel_profile TEXT, warnings TEXT, error TEXT)"
+    )
+    conn.commit()
+    conn.close()
+
+    store = SqliteJobStore(path)
+    job = store.create({"urls": []}, total=1)
+    assert store.claim(job["job_id"], "worker-a", lease_sec=60)
+
+
+def test_resume_skips_jobs_leased_by_another_worker(monkeypatch):
+    import asyncio
+
+    import app.main as app_main
+
+    store = MemoryJobStore()
+    monkeypatch.setattr(app_main, "job_store", store)
+    spawned = []
+    monkeypatch.setattr(app_main, "_spawn_job", lambda job_id, req: spawned.append(job_id))
+
+    leased = store.create({"urls": ["https://youtu.be/abcdefghijk"]}, total=1)
+    free = store.create({"urls": ["https://youtu.be/bbcdefghijk"]}, total=1)
+    assert store.claim(leased["job_id"], "other-worker", lease_sec=60)
+
+    asyncio.run(app_main._resume_unfinished_jobs())
+    assert spawned == [free["job_id"]]
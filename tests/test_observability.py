@@ -0,0 +1,19 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import app.main as app_main
+
+
+def test_stats_and_metrics_run_on_event_loop():
+    # threadpool에서 돌면 loop가 바꾸는 scheduler/pipeline 상태를 순회하다 깨질 수 있음
+    assert asyncio.iscoroutinefunction(app_main.stats)
+    assert asyncio.iscoroutinefunction(app_main.prometheus_metrics)
+
+
+def test_stats_and_metrics_respond():
+    with TestClient(app_main.app) as client:
+        stats = client.get("/stats").json()
+        assert stats["ok"] and "scheduler" in stats and "pipeline" in stats
+        body = client.get("/metrics").text
+        assert "# TYPE scheduler_in_flight gauge" in body
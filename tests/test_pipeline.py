@@ -0,0 +1,128 @@
+import asyncio
+import contextvars
+
+import pytest
+
+from app import pipeline as pipeline_mod
+from app.pipeline import Pipeline, Stage
+
+flow = contextvars.ContextVar("flow", default=None)
+
+
+def _pipeline(log, *, fail_on=None, slow_first=False):
+    async def fetch(st):
+        log.append(("fetch", st["i"]))
+        if slow_first and st["i"] == 0:
+            await asyncio.sleep(0.05)
+        return "skip" if st.get("cached") else "analyze"
+
+    async def analyze(st):
+        log.append(("analyze", st["i"]))
+        if st["i"] == fail_on:
+            raise ValueError(f"boom {st['i']}")
+        st["flow"] = flow.get()
+        return "validate"
+
+    async def validate(st):
+        log.append(("validate", st["i"]))
+        st["done"] = True
+        return None
+
+    async def skip(st):
+        log.append(("skip", st["i"]))
+        return None
+
+    return Pipeline(
+        "t",
+        [
+            Stage("fetch", fetch, workers=2, queue_size=1),
+            Stage("analyze", analyze, workers=2),
+            Stage("validate", validate, workers=1),
+            Stage("skip", skip, workers=1),
+        ],
+    )
+
+
+def test_stages_run_in_order_and_results_keep_input_order():
+    log = []
+    p = _pipeline(log, slow_first=True)
+
+    async def go():
+        return await asyncio.gather(*(p.run({"i": i}) for i in range(4)))
+
+    results = asyncio.run(go())
+
+    assert [r["i"] for r in results] == [0, 1, 2, 3]
+    assert all(r["done"] for r in results)
+    for i in range(4):
+        steps = [name for name, j in log if j == i]
+        assert steps == ["fetch", "analyze", "validate"]
+    # 느린 0번을 기다리지 않고 뒤 영상이 먼저 끝까지 진행
+    assert log.index(("validate", 1)) < log.index(("validate", 0))
+
+
+def test_stage_routing_skips_stages():
+    log = []
+    p = _pipeline(log)
+    out = asyncio.run(p.run({"i": 0, "cached": True}))
+    assert "done" not in out
+    assert log == [("fetch", 0), ("skip", 0)]
+
+
+def test_error_propagates_to_caller_only():
+    log = []
+    p = _pipeline(log, fail_on=1)
+
+    async def go():
+        return await asyncio.gather(*(p.run({"i": i}) for i in range(3)), return_exceptions=True)
+
+    results = asyncio.run(go())
+
+    assert isinstance(results[1], ValueError)
+    assert str(results[1]) == "boom 1"
+    assert results[0]["done"] and results[2]["done"]
+    assert ("validate", 1) not in log
+    assert p.stats()["stages"]["analyze"]["failed"] == 1
+
+
+def test_item_keeps_submitter_context_and_workers_stop():
+    p = _pipeline([])
+
+    async def submit(name):
+        flow.set(name)
+        return await p.run({"i": 0})
+
+    async def go():
+        return await asyncio.gather(submit("a"), submit("b"))
+
+    a, b = asyncio.run(go())
+
+    assert (a["flow"], b["flow"]) == ("a", "b")
+    assert p._workers == []
+    assert p not in pipeline_mod._live
+
+
+def test_cancelled_caller_cancels_running_stage():
+    cancelled = []
+
+    async def slow(st):
+        st["started"].set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return None
+
+    async def go():
+        p = Pipeline("t", [Stage("slow", slow, workers=1)])
+        ev = asyncio.Event()
+        task = asyncio.ensure_future(p.run({"started": ev}))
+        await ev.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+    asyncio.run(go())
+    assert cancelled == [True]
@@ -0,0 +1,46 @@
+from app.quotes import QuoteIndex, fill_quote_times, verify_quotes
+
+TRANSCRIPT = "오늘은 정말 중요한 이야기를 해볼게요.\n여러분, 이거 아세요? 결론부터 말하면 90%가 모릅니다."
+
+
+def _parsed(*items):
+    return {"quotes": {"items": list(items)}}
+
+
+def test_exact_and_normalized_matches():
+    parsed = _parsed({"text": "정말 중요한 이야기를"}, {"text": "여러분 이거 아세요"})
+    report = verify_quotes(parsed, QuoteIndex(TRANSCRIPT))
+    assert report["exact"] == 1
+    assert report["normalized"] == 1
+    kinds = [it["match"]["kind"] for it in parsed["quotes"]["items"]]
+    assert kinds == ["exact", "normalized"]
+
+
+def test_hallucinated_quote_is_dropped():
+    parsed = _parsed({"text": "transcript에 전혀 없는 문장입니다"})
+    report = verify_quotes(parsed, QuoteIndex(TRANSCRIPT))
+    assert report["dropped"] == 1
+    assert parsed["quotes"]["items"] == []
+
+
+def test_non_string_text_is_dropped():
+    parsed = _parsed({"text": 123}, {"text": ["a"]}, {"text": "결론부터 말하면"})
+    report = verify_quotes(parsed, QuoteIndex(TRANSCRIPT), mode="drop")
+    assert report["total"] == 3
+    assert report["unverified"] == 2
+    assert report["dropped"] == 2
+    assert [it["text"] for it in parsed["quotes"]["items"]] == ["결론부터 말하면"]
+
+
+def test_non_string_text_is_flagged():
+    parsed = _parsed({"text": 123}, {"text": ["a"]})
+    report = verify_quotes(parsed, QuoteIndex(TRANSCRIPT), mode="flag")
+    assert report["unverified"] == 2
+    assert [it["match"] for it in parsed["quotes"]["items"]] == [{"kind": "none"}, {"kind": "none"}]
+
+
+def test_fill_quote_times_skips_non_string_text():
+    parsed = _parsed({"text": 123}, {"text": ["a"]}, {"text": "결론부터 말하면"})
+    filled = fill_quote_times(parsed, QuoteIndex(TRANSCRIPT), lambda offset: 1.5)
+    assert filled == 1
+    assert parsed["quotes"]["items"][2]["evidence"]["approx_start_sec"] == 1.5
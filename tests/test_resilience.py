@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app import resilience
+from app.apify_client import ApifyError
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    b = resilience.CircuitBreaker("test", failure_threshold=2, reset_sec=60)
+    monkeypatch.setitem(resilience._breakers, "test", b)
+    monkeypatch.setattr(resilience, "RETRY_BASE_SEC", 0.001)
+    return b
+
+
+def _fail_with(exc):
+    async def fn():
+        raise exc
+
+    return fn
+
+
+def _call(fn, attempts=1):
+    return asyncio.run(resilience.call("test", fn, max_attempts=attempts))
+
+
+def test_client_error_counts_as_upstream_alive(breaker):
+    breaker.failures = 1
+    with pytest.raises(ApifyError):
+        _call(_fail_with(ApifyError("not found", status_code=404)))
+    assert breaker.failures == 0
+
+
+@pytest.mark.parametrize(
+    "exc",
+    [KeyError("x"), ValueError("bad json"), ApifyError("Converter run still RUNNING after 900s")],
+)
+def test_local_permanent_errors_leave_breaker_unchanged(breaker, exc):
+    breaker.failures = 1
+    with pytest.raises(type(exc)):
+        _call(_fail_with(exc))
+    assert breaker.failures == 1
+    assert breaker.state == "closed"
+
+
+def test_local_error_does_not_close_half_open_breaker(breaker):
+    breaker.state = "open"
+    breaker.opened_at = 0.0  # reset_sec 지남 -> 다음 호출은 half_open probe
+    with pytest.raises(KeyError):
+        _call(_fail_with(KeyError("x")))
+    assert breaker.state == "half_open"
+
+
+def test_server_errors_open_breaker(breaker):
+    with pytest.raises(ApifyError):
+        _call(_fail_with(ApifyError("down", status_code=502)), attempts=2)
+    assert breaker.state == "open"
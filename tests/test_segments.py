@@ -0,0 +1,78 @@
+import pytest
+
+from app.segments import Segments, _to_sec
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (12, 12.0),
+        (12.5, 12.5),
+        ("12.5", 12.5),
+        ("1:02", 62.0),
+        ("00:01:02.5", 62.5),
+        ("01:00:00", 3600.0),
+        ("", None),
+        ("abc", None),
+        ("1:xx", None),
+        (None, None),
+        (True, None),
+    ],
+)
+def test_to_sec_formats(value, expected):
+    assert _to_sec(value) == expected
+
+
+def test_from_apify_start_keys_and_durations():
+    segs = Segments.from_apify(
+        [
+            {"text": "hello", "start": "0:10", "dur": 4},
+            {"text": "  ", "start": 12},  # 빈 텍스트는 건너뜀
+            {"text": "world", "tStartMs": 20000, "dDurationMs": 2000},
+            {"caption": "bye", "startTime": "00:00:30", "endTime": "00:00:31.5"},
+            {"text": "no time"},
+        ]
+    )
+    assert segs.text == "hello\nworld\nbye"
+    assert list(segs.offsets) == [0, 6, 12]
+    assert list(segs.starts) == [10.0, 20.0, 30.0]
+    assert list(segs.ends) == [14.0, 22.0, 31.5]
+
+
+def test_from_apify_without_times_is_none():
+    assert Segments.from_apify([{"text": "a"}, {"text": "b"}]) is None
+    assert Segments.from_apify("not a list") is None
+
+
+def test_time_at_interpolates_within_segment():
+    segs = Segments.from_apify([{"text": "abcde", "start": 10, "end": 20}, {"text": "fgh", "start": 30, "end": 33}])
+    # "abcde\n" -> 세그먼트 0은 offset 0..6
+    assert segs.time_at(0) == 10.0
+    assert segs.time_at(3) == 15.0
+    assert segs.time_at(6) == 30.0
+    assert segs.time_at(7) == 31.0
+    # 텍스트 끝을 넘으면 마지막 세그먼트 끝으로 고정
+    assert segs.time_at(100) == 33.0
+    assert segs.time_at(-1) is None
+
+
+def test_missing_end_extends_to_next_start():
+    segs = Segments.from_apify([{"text": "ab", "start": 1}, {"text": "cd", "start": 5}])
+    assert list(segs.ends) == [5.0, 5.0]
+    assert segs.time_at(1) == 2.3
+
+
+def test_from_chunks():
+    text = "첫 창 텍스트 두 번째 창"
+    segs = Segments.from_chunks(
+        text,
+        [
+            {"char_start": 8, "start_sec": 60.0, "end_sec": 120.0},
+            {"char_start": 0, "start_sec": 0.0, "end_sec": 60.0},
+            {"start_sec": 999.0},
+        ],
+    )
+    assert list(segs.offsets) == [0, 8]
+    assert segs.time_at(4) == 30.0
+    assert segs.time_at(8) == 60.0
+    assert Segments.from_chunks(text, []) is None